@@ -12,13 +12,23 @@ class APIAuditLogAdmin(admin.ModelAdmin):
         "status_code",
     )
     list_filter = ("method", "status_code")
+    # Drilling down by date keeps queries on the matching time partitions
+    date_hierarchy = "timestamp"
     search_fields = ("endpoint", "user__username")
+    exclude = (
+        "request_body",
+        "response_body",
+        "request_body_zlib",
+        "response_body_zlib",
+    )
     readonly_fields = (
         "user",
         "endpoint",
         "method",
         "status_code",
-        "request_body",
-        "response_body",
+        "request_payload",
+        "response_payload",
+        "body_bytes",
+        "stored_bytes",
         "timestamp",
     )
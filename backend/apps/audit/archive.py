@@ -0,0 +1,322 @@
+import bisect
+import gzip
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import APIAuditLog
+from .payloads import unpack_payload
+
+"""
+Cold-tier audit archive.
+
+Expiring APIAuditLog rows are streamed, oldest first, into gzip-compressed
+JSONL segments of at most AUDIT_ARCHIVE_SEGMENT_ROWS rows:
+
+    audit-20260118T000012-104233.jsonl.gz   one JSON object per row
+    audit-20260118T000012-104233.idx        sidecar index
+
+A segment is written to a .partial file and renamed once complete, and is
+never modified afterwards. Its index is a small binary file:
+
+    header   magic, version, row count, min/max timestamp (µs since epoch),
+             id of the last row (resume point)
+    users    sorted, distinct user ids (0 = anonymous), int64 each
+
+AuditArchive memory-maps the indexes and only decompresses segments whose
+time range overlaps the query and whose user list contains the user.
+"""
+
+SEGMENT_PREFIX = "audit-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx"
+
+INDEX_MAGIC = b"CTAI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHIqqqI")
+USER_ID = struct.Struct("<q")
+
+ANONYMOUS = 0
+
+# search() default: rows of every user (None means anonymous requests)
+ANY_USER = object()
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+ARCHIVE_FIELDS = (
+    "id",
+    "timestamp",
+    "user_id",
+    "method",
+    "endpoint",
+    "status_code",
+    "request_body",
+    "request_body_zlib",
+    "response_body",
+    "response_body_zlib",
+)
+
+
+def get_archive_dir():
+    return settings.AUDIT_ARCHIVE_DIR or str(settings.BASE_DIR / "audit_archive")
+
+
+def _aware(timestamp):
+    # Naive datetimes are in the current time zone, as in ORM lookups
+    if timestamp is not None and timezone.is_naive(timestamp):
+        return timezone.make_aware(timestamp)
+    return timestamp
+
+
+def _micros(timestamp):
+    return (_aware(timestamp) - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class SegmentIndex:
+    """
+    Memory-mapped view of one segment's sidecar index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.segment_path = path[: -len(INDEX_SUFFIX)] + SEGMENT_SUFFIX
+
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.rows, self.min_ts, self.max_ts,
+         self.last_id, self.user_count) = INDEX_HEADER.unpack_from(self._mm, 0)
+
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Not an audit archive index: {path}")
+
+    def close(self):
+        self._mm.close()
+
+    def overlaps(self, since=None, until=None):
+        if since is not None and self.max_ts < _micros(since):
+            return False
+        if until is not None and self.min_ts >= _micros(until):
+            return False
+        return True
+
+    def has_user(self, user_id):
+        # Binary search straight on the mapped pages
+        key = ANONYMOUS if user_id is None else user_id
+        user_ids = _MappedUserIds(self._mm, self.user_count)
+        position = bisect.bisect_left(user_ids, key)
+        return position < len(user_ids) and user_ids[position] == key
+
+
+class _MappedUserIds:
+    """Sequence over the user ids of a mapped index, for bisect."""
+
+    def __init__(self, mm, count):
+        self._mm = mm
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        return USER_ID.unpack_from(self._mm, INDEX_HEADER.size + position * USER_ID.size)[0]
+
+
+class SegmentWriter:
+    """
+    Writes one segment (.partial until sealed) and collects its index.
+    """
+
+    def __init__(self, directory, first_row):
+        stem = (
+            f"{SEGMENT_PREFIX}"
+            f"{first_row['timestamp'].astimezone(dt_timezone.utc):%Y%m%dT%H%M%S}"
+            f"-{first_row['id']}"
+        )
+        self.segment_path = os.path.join(directory, stem + SEGMENT_SUFFIX)
+        self.index_path = os.path.join(directory, stem + INDEX_SUFFIX)
+
+        self._file = gzip.open(self.segment_path + ".partial", "wt", encoding="utf-8")
+        self.rows = 0
+        self.min_ts = None
+        self.max_ts = None
+        self.last_id = None
+        self.user_ids = set()
+
+    def write(self, row):
+        timestamp = _micros(row["timestamp"])
+
+        self._file.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(",", ":")))
+        self._file.write("\n")
+
+        self.rows += 1
+        self.min_ts = timestamp if self.min_ts is None else min(self.min_ts, timestamp)
+        self.max_ts = timestamp if self.max_ts is None else max(self.max_ts, timestamp)
+        self.last_id = row["id"]
+        self.user_ids.add(row["user_id"] or ANONYMOUS)
+
+    def seal(self):
+        self._file.close()
+
+        users = sorted(self.user_ids)
+        with open(self.index_path + ".partial", "wb") as f:
+            f.write(INDEX_HEADER.pack(
+                INDEX_MAGIC, INDEX_VERSION, self.rows,
+                self.min_ts, self.max_ts, self.last_id, len(users),
+            ))
+            for user_id in users:
+                f.write(USER_ID.pack(user_id))
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Segment first: an index never points at a missing segment
+        os.replace(self.segment_path + ".partial", self.segment_path)
+        os.replace(self.index_path + ".partial", self.index_path)
+
+
+class AuditArchive:
+    """
+    Reader (and writer) for an archive directory.
+
+        archive = AuditArchive()
+        for row in archive.search(user_id=3, since=..., until=...):
+            ...
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_archive_dir()
+
+    def indexes(self):
+        """
+        Segment indexes, oldest first. Mapped one at a time; callers close
+        each index when done with it.
+        """
+        if not os.path.isdir(self.directory):
+            return
+
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(INDEX_SUFFIX)
+        )
+        for name in names:
+            yield SegmentIndex(os.path.join(self.directory, name))
+
+    def last_archived(self):
+        """
+        ``(timestamp, id)`` of the newest archived row, or None.
+        """
+        last = None
+        for index in self.indexes():
+            if last is None or (index.max_ts, index.last_id) > last:
+                last = (index.max_ts, index.last_id)
+            index.close()
+
+        if last is None:
+            return None
+        return _from_micros(last[0]), last[1]
+
+    def search(self, user_id=ANY_USER, since=None, until=None, endpoint=None):
+        """
+        Yield archived rows (oldest first) matching every given filter.
+        ``user_id=None`` means anonymous requests.
+        """
+        since, until = _aware(since), _aware(until)
+
+        for index in self.indexes():
+            try:
+                if not index.overlaps(since, until):
+                    continue
+                if user_id is not ANY_USER and not index.has_user(user_id):
+                    continue
+                segment_path = index.segment_path
+            finally:
+                index.close()
+
+            yield from self._scan(segment_path, user_id, since, until, endpoint)
+
+    def _scan(self, segment_path, user_id, since, until, endpoint):
+        with gzip.open(segment_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+
+                if user_id is not ANY_USER and row["user_id"] != user_id:
+                    continue
+                if endpoint and not row["endpoint"].startswith(endpoint):
+                    continue
+
+                timestamp = parse_datetime(row["timestamp"])
+                if since is not None and timestamp < since:
+                    continue
+                if until is not None and timestamp >= until:
+                    continue
+
+                yield row
+
+    def archive_before(self, cutoff, segment_rows=None, chunk_size=2000):
+        """
+        Stream every row older than ``cutoff`` that is not archived yet into
+        new segments. Safe to re-run: it resumes after the newest archived
+        row. Returns the number of rows archived.
+        """
+        segment_rows = segment_rows or settings.AUDIT_ARCHIVE_SEGMENT_ROWS
+        os.makedirs(self.directory, exist_ok=True)
+
+        logs = APIAuditLog.objects.filter(timestamp__lt=cutoff)
+
+        last = self.last_archived()
+        if last is not None:
+            last_timestamp, last_id = last
+            logs = logs.filter(timestamp__gte=last_timestamp).filter(
+                Q(timestamp__gt=last_timestamp) | Q(id__gt=last_id)
+            )
+
+        rows = (
+            logs.order_by("timestamp", "id")
+            .values(*ARCHIVE_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+
+        archived = 0
+        writer = None
+
+        for row in rows:
+            row["request_body"] = unpack_payload(row.pop("request_body"), row.pop("request_body_zlib"))
+            row["response_body"] = unpack_payload(row.pop("response_body"), row.pop("response_body_zlib"))
+
+            if writer is None:
+                writer = SegmentWriter(self.directory, row)
+
+            writer.write(row)
+            archived += 1
+
+            if writer.rows >= segment_rows:
+                writer.seal()
+                writer = None
+
+        if writer is not None:
+            writer.seal()
+
+        return archived
+
+
+def archive_expired_logs(cutoff):
+    """
+    Archive rows about to be removed by retention, when AUDIT_ARCHIVE_DIR is
+    configured. Returns the number of rows archived.
+    """
+    if not settings.AUDIT_ARCHIVE_DIR:
+        return 0
+
+    return AuditArchive().archive_before(cutoff)
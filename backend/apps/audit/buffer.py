@@ -0,0 +1,342 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection
+from django.utils.dateparse import parse_datetime
+
+from .models import APIAuditLog
+from .payloads import build_audit_log
+
+"""
+Buffered audit writes.
+
+The middleware only appends a row (a dict of APIAuditLog fields) to a
+bounded in-process buffer. A daemon thread packs the bodies (payloads.py)
+and drains the buffer with bulk_create every AUDIT_FLUSH_INTERVAL seconds,
+or as soon as AUDIT_FLUSH_BATCH_SIZE rows are waiting, so responses never
+wait for an INSERT.
+
+When the buffer is full (database slow or down), AUDIT_BACKPRESSURE decides:
+
+    block       → wait up to AUDIT_BLOCK_TIMEOUT for room, then drop the row
+    drop_oldest → evict the oldest buffered row
+    spill       → append the row to AUDIT_SPILL_PATH (JSON lines); the file
+                  is replayed once the buffer has drained
+
+All worker processes share the spill file. Appends and the move to
+"<path>.replaying" hold an flock on "<path>.lock", and only the process
+holding "<path>.replay.lock" replays, so rows are neither written twice
+nor removed before they are written.
+
+Every lost row is counted (see AuditBuffer.stats). Remaining rows are
+flushed when the worker process exits.
+"""
+
+BACKPRESSURE_MODES = ("block", "drop_oldest", "spill")
+
+
+class AuditBuffer:
+
+    def __init__(self, max_size, batch_size, flush_interval,
+                 backpressure="block", block_timeout=0.5, spill_path=None):
+        if backpressure not in BACKPRESSURE_MODES:
+            raise ValueError(f"Unknown audit backpressure mode: {backpressure}")
+
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._spill_lock = threading.Lock()
+
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped_oldest": 0,
+            "dropped_full": 0,
+            "spilled": 0,
+            "failed": 0,
+        }
+
+    # -----------------------------------------------------
+    # Producer side (request threads)
+    # -----------------------------------------------------
+
+    def enqueue(self, row):
+        self._ensure_flusher()
+        spill = False
+
+        with self._lock:
+            if len(self._rows) >= self.max_size:
+                if self.backpressure == "drop_oldest":
+                    self._rows.popleft()
+                    self.counters["dropped_oldest"] += 1
+
+                elif self.backpressure == "block":
+                    self._not_empty.notify()
+                    if not self._not_full.wait_for(
+                        lambda: len(self._rows) < self.max_size,
+                        timeout=self.block_timeout,
+                    ):
+                        self.counters["dropped_full"] += 1
+                        return
+
+                else:
+                    self.counters["spilled"] += 1
+                    spill = True
+
+            if not spill:
+                self._rows.append(row)
+                self.counters["enqueued"] += 1
+
+                if len(self._rows) >= self.batch_size:
+                    self._not_empty.notify()
+
+        if spill:
+            self._spill([row])
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "pending": len(self._rows)}
+
+    # -----------------------------------------------------
+    # Flusher
+    # -----------------------------------------------------
+
+    def flush(self):
+        """
+        Write everything currently buffered. Returns the number of rows
+        written.
+        """
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def close(self, timeout=5.0):
+        """
+        Stop the flusher and write whatever is left (worker shutdown).
+        """
+        with self._lock:
+            self._stopping = True
+            self._not_empty.notify_all()
+
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+        self.flush()
+
+    def _ensure_flusher(self):
+        # Also restarts the thread in a worker forked after it was started
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="audit-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._not_empty.wait_for(
+                    lambda: self._stopping or len(self._rows) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                if self._stopping:
+                    return
+
+            try:
+                self.flush()
+                if self.spill_path:
+                    self._replay_spill()
+            except Exception as e:
+                print("Audit flush error:", e)
+            finally:
+                close_old_connections()
+
+    def _take(self, limit):
+        with self._lock:
+            batch = [
+                self._rows.popleft()
+                for _ in range(min(limit, len(self._rows)))
+            ]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def _write(self, rows):
+        try:
+            APIAuditLog.objects.bulk_create(
+                [build_audit_log(row) for row in rows]
+            )
+            written = len(rows)
+        except Exception as e:
+            print("Audit bulk write failed, retrying row by row:", e)
+            connection.close()
+            written = self._write_one_by_one(rows)
+
+        with self._lock:
+            self.counters["written"] += written
+            self.counters["failed"] += len(rows) - written
+        return written
+
+    def _write_one_by_one(self, rows):
+        written = 0
+        for row in rows:
+            try:
+                build_audit_log(row).save()
+                written += 1
+            except Exception:
+                # e.g. the user was deleted before the row was written
+                pass
+        return written
+
+    # -----------------------------------------------------
+    # Spill file
+    # -----------------------------------------------------
+
+    def _spill(self, rows):
+        with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+
+    def _replay_spill(self):
+        """
+        Move the spill file aside and write its rows, while the buffer has
+        room for new requests.
+        """
+        with self._lock:
+            if self._rows:
+                return
+
+        with _file_lock(f"{self.spill_path}.replay.lock", blocking=False) as locked:
+            if locked:
+                # Otherwise another worker is replaying
+                self._replay_locked()
+
+    def _replay_locked(self):
+        replaying = f"{self.spill_path}.replaying"
+        with self._spill_lock, _file_lock(f"{self.spill_path}.lock"):
+            if not os.path.exists(replaying):
+                if not os.path.exists(self.spill_path):
+                    return
+                os.replace(self.spill_path, replaying)
+
+        with open(replaying, encoding="utf-8") as f:
+            lines = f.readlines()
+
+        for start in range(0, len(lines), self.batch_size):
+            chunk = lines[start:start + self.batch_size]
+            rows = [json.loads(line) for line in chunk]
+            for row in rows:
+                row["timestamp"] = parse_datetime(row["timestamp"])
+
+            try:
+                APIAuditLog.objects.bulk_create(
+                    [build_audit_log(row) for row in rows]
+                )
+            except Exception as e:
+                # Keep what is left for the next attempt
+                print("Audit spill replay failed:", e)
+                with open(replaying, "w", encoding="utf-8") as f:
+                    f.writelines(lines[start:])
+                return
+
+            with self._lock:
+                self.counters["written"] += len(rows)
+
+        os.remove(replaying)
+
+
+@contextmanager
+def _file_lock(path, blocking=True):
+    """
+    Exclusive flock on ``path`` (shared by all worker processes). Yields
+    False instead of waiting when ``blocking`` is off and it is taken.
+    """
+    with open(path, "a") as f:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_audit_buffer():
+    global _buffer
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditBuffer(
+                    max_size=settings.AUDIT_BUFFER_SIZE,
+                    batch_size=settings.AUDIT_FLUSH_BATCH_SIZE,
+                    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+                    backpressure=settings.AUDIT_BACKPRESSURE,
+                    block_timeout=settings.AUDIT_BLOCK_TIMEOUT,
+                    spill_path=settings.AUDIT_SPILL_PATH,
+                )
+                atexit.register(_flush_on_exit)
+    return _buffer
+
+
+def write_audit_log(row):
+    """
+    Record one audit row: buffered, or written straight away when
+    AUDIT_BUFFER_SIZE is 0.
+    """
+    if settings.AUDIT_BUFFER_SIZE <= 0:
+        build_audit_log(row).save()
+        return
+
+    get_audit_buffer().enqueue(row)
+
+
+def _flush_on_exit():
+    buffer = _buffer
+    if buffer is None:
+        return
+
+    buffer.close()
+
+    stats = buffer.stats()
+    lost = stats["dropped_oldest"] + stats["dropped_full"] + stats["failed"]
+    if lost or stats["spilled"]:
+        print("Audit buffer stats on shutdown:", stats)
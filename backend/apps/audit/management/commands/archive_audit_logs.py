@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from datetime import timedelta
+
+from apps.audit.archive import AuditArchive
+
+
+class Command(BaseCommand):
+    help = "Archive old audit logs into compressed JSONL segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.AUDIT_RETENTION_DAYS,
+            help="Archive logs older than this many days",
+        )
+        parser.add_argument("--dir", default=None, help="Archive directory")
+        parser.add_argument(
+            "--segment-rows",
+            type=int,
+            default=settings.AUDIT_ARCHIVE_SEGMENT_ROWS,
+        )
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options["days"])
+        archive = AuditArchive(options["dir"])
+
+        archived = archive.archive_before(
+            cutoff, segment_rows=options["segment_rows"]
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} audit logs to {archive.directory}.")
+        )
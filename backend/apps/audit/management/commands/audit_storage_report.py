@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import now
+from datetime import timedelta
+
+from apps.audit.models import APIAuditLog
+
+
+class Command(BaseCommand):
+    help = "Report how much storage audit payload capping and compression save"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only include logs from the last N days",
+        )
+
+    def handle(self, *args, **options):
+        logs = APIAuditLog.objects.filter(body_bytes__gt=0)
+
+        if options["days"]:
+            logs = logs.filter(timestamp__gte=now() - timedelta(days=options["days"]))
+
+        report = logs.aggregate(
+            rows=Count("id"),
+            # Rows whose bodies could not be parsed stored nothing; their
+            # bytes were dropped, not saved by capping or compression
+            unparsed=Count("id", filter=Q(stored_bytes=0)),
+            unparsed_bytes=Sum("body_bytes", filter=Q(stored_bytes=0)),
+            body_bytes=Sum("body_bytes", filter=Q(stored_bytes__gt=0)),
+            stored_bytes=Sum("stored_bytes"),
+            compressed=Count(
+                "id",
+                filter=Q(request_body_zlib__isnull=False)
+                | Q(response_body_zlib__isnull=False),
+            ),
+            truncated=Count(
+                "id",
+                filter=Q(request_body__has_key="_truncated")
+                | Q(response_body__has_key="_truncated"),
+            ),
+        )
+
+        body_bytes = report["body_bytes"] or 0
+        stored_bytes = report["stored_bytes"] or 0
+        saved = body_bytes - stored_bytes
+        percent = (saved / body_bytes * 100) if body_bytes else 0
+
+        self.stdout.write(f"Logs with payloads: {report['rows']}")
+        self.stdout.write(f"  compressed:       {report['compressed']}")
+        self.stdout.write(f"  truncated:        {report['truncated']}")
+        self.stdout.write(
+            f"  unparsed:         {report['unparsed']} "
+            f"({report['unparsed_bytes'] or 0} bytes dropped, not counted below)"
+        )
+        self.stdout.write(f"Captured bytes:     {body_bytes}")
+        self.stdout.write(f"Stored bytes:       {stored_bytes}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Saved:              {saved} ({percent:.1f}%)")
+        )
@@ -1,15 +1,35 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils.timezone import now
 from datetime import timedelta
 
+from apps.audit.archive import archive_expired_logs
 from apps.audit.models import APIAuditLog
+from apps.audit.partitions import drop_expired_partitions, is_partitioned, split_default_partition
 
 
 class Command(BaseCommand):
     help = "Delete audit2 logs older than 30 days"
 
     def handle(self, *args, **options):
-        cutoff = now() - timedelta(days=30)
+        cutoff = now() - timedelta(days=settings.AUDIT_RETENTION_DAYS)
+
+        # Keep a cold copy first when AUDIT_ARCHIVE_DIR is configured
+        archived = archive_expired_logs(cutoff)
+        if archived:
+            self.stdout.write(f"Archived {archived} audit2 logs.")
+
+        # Partitioned table: drop whole partitions instead of DELETE-ing rows.
+        # Old rows still in the default partition get their own partition
+        # first, or they would never expire.
+        if is_partitioned():
+            split_default_partition()
+            dropped = drop_expired_partitions(cutoff)
+            self.stdout.write(
+                self.style.SUCCESS(f"Dropped {len(dropped)} old audit2 log partitions.")
+            )
+            return
+
         deleted, _ = APIAuditLog.objects.filter(
             timestamp__lt=cutoff
         ).delete()
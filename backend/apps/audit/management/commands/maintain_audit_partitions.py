@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from datetime import timedelta
+
+from apps.audit.archive import archive_expired_logs
+from apps.audit.partitions import (
+    create_future_partitions,
+    drop_expired_partitions,
+    is_partitioned,
+    split_default_partition,
+)
+
+
+class Command(BaseCommand):
+    help = "Create upcoming audit log partitions and drop expired ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.AUDIT_PARTITIONS_AHEAD,
+            help="Number of future partitions to keep ready",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.AUDIT_RETENTION_DAYS,
+            help="Drop partitions entirely older than this many days",
+        )
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            help="Detach expired partitions but keep them as plain tables",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write("Audit log table is not partitioned; nothing to do.")
+            return
+
+        cutoff = now() - timedelta(days=options["days"])
+
+        if options["dry_run"]:
+            expired = drop_expired_partitions(cutoff, dry_run=True)
+            self.stdout.write(f"Would remove {len(expired)} partitions: {', '.join(expired)}")
+            return
+
+        for name in split_default_partition():
+            self.stdout.write(f"Moved default partition rows into {name}")
+
+        for name in create_future_partitions(ahead=options["ahead"]):
+            self.stdout.write(f"Created {name}")
+
+        archived = archive_expired_logs(cutoff)
+        if archived:
+            self.stdout.write(f"Archived {archived} audit logs before dropping.")
+
+        expired = drop_expired_partitions(
+            cutoff, detach_only=options["detach_only"]
+        )
+        action = "Detached" if options["detach_only"] else "Dropped"
+
+        self.stdout.write(
+            self.style.SUCCESS(f"{action} {len(expired)} expired audit partitions.")
+        )
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.audit.archive import ANY_USER, AuditArchive
+
+
+class Command(BaseCommand):
+    help = "Search archived audit logs (prints JSON lines)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, default=None, help="User id")
+        parser.add_argument("--anonymous", action="store_true", help="Only anonymous requests")
+        parser.add_argument("--since", default=None, help="ISO 8601 datetime (default: TIME_ZONE)")
+        parser.add_argument("--until", default=None, help="ISO 8601 datetime (default: TIME_ZONE)")
+        parser.add_argument("--endpoint", default=None, help="Endpoint prefix")
+        parser.add_argument("--dir", default=None, help="Archive directory")
+
+    def handle(self, *args, **options):
+        user_id = ANY_USER
+        if options["anonymous"]:
+            user_id = None
+        elif options["user"] is not None:
+            user_id = options["user"]
+
+        rows = AuditArchive(options["dir"]).search(
+            user_id=user_id,
+            since=self.parse_timestamp(options["since"]),
+            until=self.parse_timestamp(options["until"]),
+            endpoint=options["endpoint"],
+        )
+
+        for row in rows:
+            self.stdout.write(json.dumps(row))
+
+    @staticmethod
+    def parse_timestamp(value):
+        if value is None:
+            return None
+
+        timestamp = parse_datetime(value)
+        if timestamp is None:
+            raise CommandError(f"Invalid datetime: {value}")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        return timestamp
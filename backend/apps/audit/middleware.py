@@ -1,55 +1,78 @@
-import json
-
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
+from django.utils import timezone
 
-from .models import APIAuditLog
-from .utils import mask_sensitive_data
+from .buffer import write_audit_log
+from .payloads import capture_body, truncation_marker
+from .policy import AuditPolicy
 
 
 class AuditLoggingMiddleware(MiddlewareMixin):
     """
-    Logs API requests & responses with masking and exclusions.
+    Logs API requests & responses with masking and per-endpoint sampling
+    (AUDIT_POLICY, see policy.py).
     """
 
-    EXCLUDED_PATHS = (
-        "/api/tasks/analytics/",
-    )
-
     WRITE_METHODS = ("POST", "PUT", "PATCH")
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        # Compiled once per process
+        self.policy = AuditPolicy.from_settings()
+
     def process_request(self, request):
         request._audit_request_body = None
+        request._audit_body_bytes = 0
 
         if request.method in self.WRITE_METHODS:
+            max_bytes = settings.AUDIT_REQUEST_BODY_MAX_BYTES
+
+            try:
+                length = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = 0
+
+            # Over the cap: stored as a marker, so don't even read the body
+            if length > max_bytes:
+                request._audit_request_body = truncation_marker(length)
+                request._audit_body_bytes = length
+                return
+
             try:
-                body = json.loads(request.body.decode())
-                request._audit_request_body = mask_sensitive_data(body)
+                body, size = capture_body(request.body, max_bytes)
+                request._audit_request_body = body
+                request._audit_body_bytes = size
             except Exception:
                 request._audit_request_body = None
 
     def process_response(self, request, response):
         path = request.path
+        user = request.user
 
-        if path.startswith(self.EXCLUDED_PATHS):
+        role = user.role if user.is_authenticated else "anonymous"
+        if not self.policy.should_log(path, request.method, response.status_code, role):
             return response
 
-        user = request.user if request.user.is_authenticated else None
+        user_id = user.pk if user.is_authenticated else None
 
         response_body = None
-        if response.status_code >= 400:
-            try:
-                response_body = json.loads(response.content.decode())
-            except Exception:
-                response_body = None
-
-        APIAuditLog.objects.create(
-            user=user,
-            endpoint=path,
-            method=request.method,
-            status_code=response.status_code,
-            request_body=request._audit_request_body,
-            response_body=response_body,
-        )
+        response_bytes = 0
+        if response.status_code >= 400 and not response.streaming:
+            response_body, response_bytes = capture_body(
+                response.content, settings.AUDIT_RESPONSE_BODY_MAX_BYTES
+            )
+
+        # Buffered: written in bulk by the audit flusher, off the request path
+        write_audit_log({
+            "user_id": user_id,
+            "endpoint": path,
+            "method": request.method,
+            "status_code": response.status_code,
+            "request_body": request._audit_request_body,
+            "response_body": response_body,
+            "body_bytes": request._audit_body_bytes + response_bytes,
+            "timestamp": timezone.now(),
+        })
 
         return response
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db import migrations
+
+"""
+Turn audit_apiauditlog into a table range-partitioned by "timestamp"
+(PostgreSQL only; other databases keep the plain table).
+
+A partitioned table's primary key must include the partition key, so the
+key becomes (id, "timestamp"); id keeps coming from its own sequence and
+stays unique. Existing rows are copied into the default partition, which
+the maintain_audit_partitions command then splits into time partitions.
+"""
+
+TABLE = "audit_apiauditlog"
+LEGACY_TABLE = "audit_apiauditlog_legacy"
+
+COLUMNS = (
+    'id, endpoint, method, status_code, request_body, response_body, '
+    '"timestamp", user_id'
+)
+
+
+def create_table(schema_editor, user_table, partitioned):
+    primary_key = '(id, "timestamp")' if partitioned else "(id)"
+    partition_by = 'PARTITION BY RANGE ("timestamp")' if partitioned else ""
+
+    schema_editor.execute(f"""
+        CREATE TABLE {TABLE} (
+            id bigint NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            endpoint varchar(255) NOT NULL,
+            method varchar(10) NOT NULL,
+            status_code integer NOT NULL CHECK (status_code >= 0),
+            request_body jsonb NULL,
+            response_body jsonb NULL,
+            "timestamp" timestamp with time zone NOT NULL,
+            user_id bigint NULL
+                REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED,
+            CONSTRAINT {TABLE}_pkey PRIMARY KEY {primary_key}
+        ) {partition_by}
+    """)
+    schema_editor.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    schema_editor.execute(f"CREATE INDEX {TABLE}_user_id_idx ON {TABLE} (user_id)")
+
+
+def move_aside(schema_editor):
+    """
+    Rename the current table and the names it holds (primary key, user
+    index, id sequence) so the new table can take them over.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+
+    schema_editor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}")
+    schema_editor.execute(
+        f"ALTER TABLE {LEGACY_TABLE} "
+        f"RENAME CONSTRAINT {TABLE}_pkey TO {LEGACY_TABLE}_pkey"
+    )
+    schema_editor.execute(
+        f"ALTER INDEX IF EXISTS {TABLE}_user_id_idx "
+        f"RENAME TO {LEGACY_TABLE}_user_id_idx"
+    )
+    schema_editor.execute(f"ALTER SEQUENCE {sequence} RENAME TO {LEGACY_TABLE}_id_seq")
+    schema_editor.execute(f"CREATE SEQUENCE {TABLE}_id_seq")
+
+
+def copy_rows_and_drop_legacy(schema_editor):
+    schema_editor.execute(
+        f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {LEGACY_TABLE}"
+    )
+    schema_editor.execute(
+        f"SELECT setval('{TABLE}_id_seq', COALESCE(MAX(id), 0) + 1, false) "
+        f"FROM {LEGACY_TABLE}"
+    )
+    schema_editor.execute(f"DROP TABLE {LEGACY_TABLE}")
+
+
+def partition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+    move_aside(schema_editor)
+    create_table(schema_editor, user_table, partitioned=True)
+    schema_editor.execute(
+        f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"
+    )
+    copy_rows_and_drop_legacy(schema_editor)
+
+
+def unpartition_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+
+    move_aside(schema_editor)
+    create_table(schema_editor, user_table, partitioned=False)
+    copy_rows_and_drop_legacy(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_timestamp_default_now'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_partition_apiauditlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apiauditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='audit_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apiauditlog',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='audit_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='apiauditlog',
+            index=models.Index(fields=['endpoint', 'timestamp', 'id'], name='audit_endpoint_ts_idx', opclasses=['varchar_pattern_ops', 'timestamptz_ops', 'int8_ops']),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_audit_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiauditlog',
+            name='body_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='apiauditlog',
+            name='request_body_zlib',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='apiauditlog',
+            name='response_body_zlib',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='apiauditlog',
+            name='stored_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
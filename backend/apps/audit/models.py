@@ -1,10 +1,14 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
 
 class APIAuditLog(models.Model):
+    # On PostgreSQL the table is range-partitioned by timestamp
+    # (migration 0003, see apps/audit/partitions.py)
+
     user = models.ForeignKey(
         User,
         null=True,
@@ -19,7 +23,46 @@ class APIAuditLog(models.Model):
     request_body = models.JSONField(null=True, blank=True)
     response_body = models.JSONField(null=True, blank=True)
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Large bodies are stored zlib-compressed here instead (see payloads.py)
+    request_body_zlib = models.BinaryField(null=True, blank=True)
+    response_body_zlib = models.BinaryField(null=True, blank=True)
+
+    # Raw size of the captured bodies vs. bytes actually stored
+    body_bytes = models.PositiveIntegerField(default=0)
+    stored_bytes = models.PositiveIntegerField(default=0)
+
+    # Set when the request is handled, not when the buffered row is written
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Composite indexes for the audit API filters (apps/audit/views.py);
+        # the trailing (timestamp, id) serves the keyset ordering.
+        indexes = [
+            models.Index(
+                fields=["timestamp", "id"],
+                name="audit_ts_id_idx",
+            ),
+            models.Index(
+                fields=["user", "timestamp", "id"],
+                name="audit_user_ts_idx",
+            ),
+            # varchar_pattern_ops lets "endpoint LIKE 'prefix%'" use the index
+            models.Index(
+                fields=["endpoint", "timestamp", "id"],
+                name="audit_endpoint_ts_idx",
+                opclasses=["varchar_pattern_ops", "timestamptz_ops", "int8_ops"],
+            ),
+        ]
+
+    @property
+    def request_payload(self):
+        from .payloads import unpack_payload
+        return unpack_payload(self.request_body, self.request_body_zlib)
+
+    @property
+    def response_payload(self):
+        from .payloads import unpack_payload
+        return unpack_payload(self.response_body, self.response_body_zlib)
 
     def __str__(self):
         return f"{self.method} {self.endpoint} [{self.status_code}]"
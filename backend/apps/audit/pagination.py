@@ -0,0 +1,92 @@
+import base64
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class AuditLogKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (timestamp, id), newest first.
+
+    The cursor is the (timestamp, id) of the last row of the previous page,
+    so every page is one index range scan no matter how deep the client
+    pages, and rows written meanwhile never shift the pages.
+
+        GET /api/audit/logs/?page_size=50
+        GET /api/audit/logs/?cursor=<next_cursor>
+    """
+
+    page_size = 50
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            timestamp, last_id = self.decode_cursor(cursor)
+            # "timestamp <= ts" is the index range; the OR breaks ties
+            queryset = queryset.filter(timestamp__lte=timestamp).filter(
+                Q(timestamp__lt=timestamp) | Q(id__lt=last_id)
+            )
+
+        rows = list(queryset.order_by("-timestamp", "-id")[:self.page_size + 1])
+
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        next_cursor = None
+        if self.has_next:
+            last = self.page[-1]
+            next_cursor = self.encode_cursor(last.timestamp, last.id)
+
+        return Response({
+            "next": self.get_next_link(next_cursor),
+            "next_cursor": next_cursor,
+            "results": data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get("page_size", self.page_size))
+        except ValueError:
+            raise ValidationError({"page_size": "Must be an integer."})
+
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self, next_cursor):
+        if next_cursor is None:
+            return None
+
+        params = self.request.query_params.copy()
+        params["cursor"] = next_cursor
+        return self.request.build_absolute_uri(
+            f"{self.request.path}?{urlencode(params, doseq=True)}"
+        )
+
+    @staticmethod
+    def encode_cursor(timestamp, last_id):
+        raw = f"{timestamp.isoformat()}|{last_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            timestamp, last_id = raw.split("|")
+            timestamp = parse_datetime(timestamp)
+            last_id = int(last_id)
+        except Exception:
+            timestamp = None
+
+        if timestamp is None:
+            raise ValidationError({"cursor": "Invalid cursor."})
+
+        return timestamp, last_id
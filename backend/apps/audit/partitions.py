@@ -0,0 +1,203 @@
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import APIAuditLog
+
+"""
+Time partitioning of APIAuditLog (PostgreSQL only).
+
+audit_apiauditlog is declared PARTITION BY RANGE ("timestamp") with one
+partition per day or month (AUDIT_PARTITION_INTERVAL):
+
+    audit_apiauditlog_p20260118   [2026-01-18, 2026-01-19)
+    audit_apiauditlog_p202601     [2026-01-01, 2026-02-01)
+    audit_apiauditlog_default     rows no partition was created for
+
+Bounds are in UTC. Retention detaches and drops whole partitions (constant
+time, no dead tuples) instead of DELETE-ing rows, and queries filtered on
+timestamp only touch the partitions in their range.
+
+On other databases the table stays a plain table; callers check
+is_partitioned() first.
+"""
+
+TABLE = APIAuditLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+PARTITION_FORMATS = {
+    "day": "%Y%m%d",
+    "month": "%Y%m",
+}
+
+PARTITION_NAME_RE = re.compile(rf"^{TABLE}_p(\d{{6}}|\d{{8}})$")
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_start(moment, interval=None):
+    """
+    Start (UTC midnight) of the partition holding ``moment``.
+    """
+    interval = interval or settings.AUDIT_PARTITION_INTERVAL
+    day = moment.astimezone(dt_timezone.utc).date()
+
+    if interval == "month":
+        day = day.replace(day=1)
+
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def next_partition_start(start, interval=None):
+    interval = interval or settings.AUDIT_PARTITION_INTERVAL
+
+    if interval == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+
+    return start + timedelta(days=1)
+
+
+def partition_name(start, interval=None):
+    interval = interval or settings.AUDIT_PARTITION_INTERVAL
+    return f"{TABLE}_p{start.strftime(PARTITION_FORMATS[interval])}"
+
+
+def list_partitions():
+    """
+    Returns ``[(name, start, end), ...]`` for every range partition, oldest
+    first. The default partition is not included.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if not match:
+            continue
+
+        suffix = match.group(1)
+        interval = "day" if len(suffix) == 8 else "month"
+        start = datetime.strptime(suffix, PARTITION_FORMATS[interval]).replace(
+            tzinfo=dt_timezone.utc
+        )
+        partitions.append((name, start, next_partition_start(start, interval)))
+
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(start, interval=None):
+    """
+    Create the partition starting at ``start``. Rows that already landed in
+    the default partition for that range are moved into it first, so the
+    ATTACH does not fail.
+    """
+    end = next_partition_start(start, interval)
+    name = partition_name(start, interval)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE "{name}" '
+            f'(LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM "{DEFAULT_PARTITION}"
+                WHERE "timestamp" >= %s AND "timestamp" < %s
+                RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+    return name
+
+
+def create_future_partitions(ahead=None, now=None, interval=None):
+    """
+    Make sure partitions exist from the current period through ``ahead``
+    periods into the future. Returns the names of the partitions created.
+    """
+    ahead = settings.AUDIT_PARTITIONS_AHEAD if ahead is None else ahead
+    now = now or datetime.now(dt_timezone.utc)
+
+    existing = {start for _, start, _ in list_partitions()}
+
+    created = []
+    start = partition_start(now, interval)
+    for _ in range(ahead + 1):
+        if start not in existing:
+            created.append(create_partition(start, interval))
+        start = next_partition_start(start, interval)
+
+    return created
+
+
+def split_default_partition(interval=None):
+    """
+    Move rows out of the default partition into proper time partitions
+    (rows copied from the unpartitioned table, or written while no partition
+    existed yet), so retention can drop them. Returns the partitions created.
+    """
+    interval = interval or settings.AUDIT_PARTITION_INTERVAL
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT date_trunc(%s, "timestamp" AT TIME ZONE 'UTC')
+            FROM "{DEFAULT_PARTITION}"
+            """,
+            [interval],
+        )
+        starts = sorted(
+            row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall()
+        )
+
+    return [create_partition(start, interval) for start in starts]
+
+
+def drop_expired_partitions(cutoff, detach_only=False, dry_run=False):
+    """
+    Detach (and unless ``detach_only``, drop) every partition whose whole
+    range is older than ``cutoff``. Returns the affected partition names.
+    """
+    expired = [name for name, _, end in list_partitions() if end <= cutoff]
+
+    if dry_run:
+        return expired
+
+    for name in expired:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            if not detach_only:
+                cursor.execute(f'DROP TABLE "{name}"')
+
+    return expired
@@ -0,0 +1,93 @@
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import APIAuditLog
+from .utils import mask_sensitive_data
+
+"""
+Audit payload storage.
+
+Capture (request path):
+- a body above its byte cap is replaced by {"_truncated": true, "bytes": n}
+  without being parsed or masked, since it is dropped anyway
+- other bodies are parsed and masked; bodies that are not JSON are dropped
+
+Packing (flusher, off the request path):
+- bodies of at least AUDIT_COMPRESS_MIN_BYTES are stored zlib-compressed in
+  the *_zlib binary column instead of the JSON column, when that is smaller
+
+body_bytes / stored_bytes on every row feed audit_storage_report.
+"""
+
+COMPRESSION_LEVEL = 6
+
+PAYLOAD_FIELDS = ("request_body", "response_body")
+
+
+def truncation_marker(size):
+    return {"_truncated": True, "bytes": size}
+
+
+def capture_body(raw, max_bytes):
+    """
+    Returns ``(body, raw_size)`` for a raw request/response body.
+    ``raw_size`` is 0 for a body that is not JSON: it is not stored, so it
+    must not count as captured (and "saved") bytes either.
+    """
+    if not raw:
+        return None, 0
+
+    size = len(raw)
+
+    if size > max_bytes:
+        return truncation_marker(size), size
+
+    try:
+        return mask_sensitive_data(json.loads(raw.decode())), size
+    except Exception:
+        return None, 0
+
+
+def pack_payload(body):
+    """
+    Returns ``(json_value, compressed, stored_size)``; exactly one of
+    ``json_value`` and ``compressed`` is set for a non-empty body.
+    """
+    if body is None:
+        return None, None, 0
+
+    encoded = json.dumps(body, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    min_bytes = settings.AUDIT_COMPRESS_MIN_BYTES
+
+    if min_bytes and len(encoded) >= min_bytes:
+        compressed = zlib.compress(encoded, COMPRESSION_LEVEL)
+        if len(compressed) < len(encoded):
+            return None, compressed, len(compressed)
+
+    return body, None, len(encoded)
+
+
+def unpack_payload(body, compressed):
+    if compressed is not None:
+        return json.loads(zlib.decompress(bytes(compressed)))
+    return body
+
+
+def build_audit_log(row):
+    """
+    APIAuditLog instance for a captured row, with its bodies packed.
+    """
+    row = dict(row)
+    stored = 0
+
+    for field in PAYLOAD_FIELDS:
+        body, compressed, size = pack_payload(row.get(field))
+        row[field] = body
+        row[f"{field}_zlib"] = compressed
+        stored += size
+
+    row["stored_bytes"] = stored
+    return APIAuditLog(**row)
@@ -0,0 +1,100 @@
+import random
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+"""
+Per-endpoint audit sampling.
+
+AUDIT_POLICY (settings) is compiled once into per-method rule lists, and
+the (path, method) → rule lookup is memoised, so the per-request cost is a
+dict lookup and at most one random draw:
+
+    error response and always_log_errors  → logged
+    write method and always_log_writes    → logged
+    otherwise                             → logged with probability
+                                            role_rates[role] or sample_rate
+"""
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+ANY_METHOD = "*"
+
+
+class AuditRule:
+    __slots__ = ("sample_rate", "role_rates", "always_log_writes", "always_log_errors")
+
+    def __init__(self, spec, defaults):
+        self.sample_rate = float(spec.get("sample_rate", 1.0))
+        self.role_rates = {
+            role: float(rate) for role, rate in spec.get("role_rates", {}).items()
+        }
+        self.always_log_writes = spec.get("always_log_writes", defaults["always_log_writes"])
+        self.always_log_errors = spec.get("always_log_errors", defaults["always_log_errors"])
+
+    def rate_for(self, role):
+        return self.role_rates.get(role, self.sample_rate)
+
+
+class AuditPolicy:
+
+    def __init__(self, policy):
+        defaults = {
+            "always_log_writes": policy.get("always_log_writes", True),
+            "always_log_errors": policy.get("always_log_errors", True),
+        }
+
+        self.default_rule = AuditRule(policy.get("default", {}), defaults)
+
+        # method → ordered ((compiled path, rule), ...); rules without
+        # "methods" appear in every list, keeping their relative order
+        rules = [
+            (
+                re.compile(spec["path"]),
+                frozenset(m.upper() for m in spec.get("methods", ())) or None,
+                AuditRule(spec, defaults),
+            )
+            for spec in policy.get("rules", ())
+        ]
+        methods = {m for _, rule_methods, _ in rules for m in rule_methods or ()}
+
+        self._rules_by_method = {
+            method: tuple(
+                (pattern, rule)
+                for pattern, rule_methods, rule in rules
+                if rule_methods is None or method in rule_methods
+            )
+            for method in methods | {ANY_METHOD}
+        }
+
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.AUDIT_POLICY)
+
+    def _resolve(self, path, method):
+        rules = self._rules_by_method.get(method, self._rules_by_method[ANY_METHOD])
+
+        for pattern, rule in rules:
+            if pattern.search(path):
+                return rule
+
+        return self.default_rule
+
+    def should_log(self, path, method, status_code, role):
+        rule = self.resolve(path, method)
+
+        if status_code >= 400 and rule.always_log_errors:
+            return True
+
+        if method in WRITE_METHODS and rule.always_log_writes:
+            return True
+
+        rate = rule.rate_for(role)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        return random.random() < rate
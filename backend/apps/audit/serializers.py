@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from .models import APIAuditLog
+
+
+class APIAuditLogSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(
+        source="user.username",
+        read_only=True,
+        default=None,
+    )
+    # Transparently decompressed (see apps/audit/payloads.py)
+    request_body = serializers.JSONField(source="request_payload", read_only=True)
+    response_body = serializers.JSONField(source="response_payload", read_only=True)
+
+    class Meta:
+        model = APIAuditLog
+        fields = [
+            "id",
+            "timestamp",
+            "user",
+            "username",
+            "method",
+            "endpoint",
+            "status_code",
+            "request_body",
+            "response_body",
+        ]
+        read_only_fields = fields
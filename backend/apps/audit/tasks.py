@@ -0,0 +1,36 @@
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+
+from .archive import archive_expired_logs
+from .partitions import (
+    create_future_partitions,
+    drop_expired_partitions,
+    is_partitioned,
+    split_default_partition,
+)
+
+
+@shared_task
+def maintain_audit_partitions():
+    """
+    Celery task keeping the audit log partitions in shape:
+    upcoming partitions are created ahead of time and partitions older
+    than AUDIT_RETENTION_DAYS are dropped whole (archived first when
+    AUDIT_ARCHIVE_DIR is set).
+    """
+    if not is_partitioned():
+        return "Audit log table is not partitioned"
+
+    split = split_default_partition()
+    created = create_future_partitions()
+
+    cutoff = timezone.now() - timedelta(days=settings.AUDIT_RETENTION_DAYS)
+    archived = archive_expired_logs(cutoff)
+    dropped = drop_expired_partitions(cutoff)
+
+    return (
+        f"Split {len(split)}, created {len(created)}, "
+        f"archived {archived} logs, dropped {len(dropped)} audit partitions"
+    )
@@ -1,3 +1,805 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.security.ipstate import get_clean_ip_cache, get_ip_security_store
+from apps.users.models import User
+
+from . import payloads, policy
+from .archive import ANY_USER, AuditArchive, SegmentIndex, SegmentWriter, _micros
+from .buffer import AuditBuffer, _file_lock
+from .models import APIAuditLog
+from .payloads import build_audit_log, capture_body, pack_payload, unpack_payload
+from .policy import AuditPolicy
+from .partitions import (
+    DEFAULT_PARTITION,
+    TABLE,
+    create_partition,
+    drop_expired_partitions,
+    is_partitioned,
+    list_partitions,
+    split_default_partition,
+)
+
+START = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def archive_row(row_id, user_id, minutes, endpoint="/api/tasks/"):
+    return {
+        "id": row_id,
+        "timestamp": START + timedelta(minutes=minutes),
+        "user_id": user_id,
+        "method": "GET",
+        "endpoint": endpoint,
+        "status_code": 200,
+        "request_body": None,
+        "response_body": {"ok": True},
+    }
+
+
+def buffered_row(n):
+    return {
+        "user_id": None,
+        "endpoint": f"/api/tasks/{n}/",
+        "method": "GET",
+        "status_code": 200,
+        "request_body": None,
+        "response_body": {"n": n},
+        "body_bytes": 8,
+        "timestamp": START + timedelta(seconds=n),
+    }
+
+
+class AuditBufferTests(TestCase):
+    """
+    Backpressure modes, drop counters, flush triggers and the spill file
+    shared by worker processes.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spill_path = os.path.join(directory.name, "spill.jsonl")
+
+    def make_buffer(self, backpressure="block", flusher=False, **kwargs):
+        options = {
+            "max_size": 2,
+            "batch_size": 10,
+            "flush_interval": 60,
+            "block_timeout": 0.01,
+            "spill_path": self.spill_path,
+            **kwargs,
+        }
+        buffer = AuditBuffer(backpressure=backpressure, **options)
+
+        # Rows written by the flusher thread are recorded instead of being
+        # inserted over another connection
+        self.batches = []
+        written = threading.Event()
+
+        def write(rows):
+            self.batches.append([row["response_body"]["n"] for row in rows])
+            written.set()
+            return len(rows)
+
+        buffer._write = write
+        buffer.written = written
+        if not flusher:
+            buffer._ensure_flusher = lambda: None
+        self.addCleanup(buffer.close, timeout=1)
+        return buffer
+
+    def spilled(self):
+        with open(self.spill_path, encoding="utf-8") as f:
+            return [json.loads(line)["response_body"]["n"] for line in f]
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            AuditBuffer(2, 10, 60, backpressure="ignore")
+
+    def test_block_drops_after_timeout(self):
+        buffer = self.make_buffer("block")
+        for n in range(3):
+            buffer.enqueue(buffered_row(n))
+
+        stats = buffer.stats()
+        self.assertEqual(stats["enqueued"], 2)
+        self.assertEqual(stats["dropped_full"], 1)
+        self.assertEqual(stats["pending"], 2)
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.batches, [[0, 1]])
+
+    def test_block_waits_for_room(self):
+        buffer = self.make_buffer("block", block_timeout=5)
+        buffer.enqueue(buffered_row(0))
+        buffer.enqueue(buffered_row(1))
+
+        threading.Timer(0.05, buffer.flush).start()
+        buffer.enqueue(buffered_row(2))
+
+        self.assertEqual(buffer.stats()["dropped_full"], 0)
+        buffer.flush()
+        self.assertEqual(self.batches, [[0, 1], [2]])
+
+    def test_drop_oldest(self):
+        buffer = self.make_buffer("drop_oldest")
+        for n in range(5):
+            buffer.enqueue(buffered_row(n))
+
+        self.assertEqual(buffer.stats()["dropped_oldest"], 3)
+        buffer.flush()
+        self.assertEqual(self.batches, [[3, 4]])
+
+    def test_spill_and_replay(self):
+        buffer = self.make_buffer("spill")
+        for n in range(4):
+            buffer.enqueue(buffered_row(n))
+
+        self.assertEqual(buffer.stats()["spilled"], 2)
+        self.assertEqual(self.spilled(), [2, 3])
+
+        # Not while rows are waiting in the buffer
+        buffer._replay_spill()
+        self.assertTrue(os.path.exists(self.spill_path))
+
+        buffer.flush()
+        buffer._replay_spill()
+
+        self.assertFalse(os.path.exists(self.spill_path))
+        self.assertFalse(os.path.exists(f"{self.spill_path}.replaying"))
+        self.assertEqual(
+            list(APIAuditLog.objects.order_by("timestamp").values_list("response_body", flat=True)),
+            [{"n": 2}, {"n": 3}],
+        )
+        # The buffered rows went through the recording _write
+        self.assertEqual(self.batches, [[0, 1]])
+        self.assertEqual(buffer.stats()["written"], 2)
+
+    def test_replay_skipped_while_another_worker_replays(self):
+        # A second worker process sharing the spill file
+        buffer = self.make_buffer("spill")
+        other = self.make_buffer("spill")
+        buffer._spill([buffered_row(0)])
+
+        with _file_lock(f"{self.spill_path}.replay.lock") as locked:
+            self.assertTrue(locked)
+            other._replay_spill()
+
+        self.assertEqual(self.spilled(), [0])
+        self.assertFalse(APIAuditLog.objects.exists())
+
+        other._replay_spill()
+        self.assertEqual(APIAuditLog.objects.count(), 1)
+
+    def test_failed_replay_keeps_rows(self):
+        buffer = self.make_buffer("spill", batch_size=1)
+        buffer._spill([buffered_row(0), buffered_row(1)])
+        # New rows spilled meanwhile wait for the next replay
+        with mock.patch.object(
+            APIAuditLog.objects, "bulk_create", side_effect=[None, Exception("down")]
+        ):
+            buffer._replay_spill()
+        buffer._spill([buffered_row(2)])
+
+        with open(f"{self.spill_path}.replaying", encoding="utf-8") as f:
+            self.assertEqual([json.loads(line)["response_body"]["n"] for line in f], [1])
+        self.assertEqual(self.spilled(), [2])
+
+        buffer._replay_spill()
+        self.assertFalse(os.path.exists(f"{self.spill_path}.replaying"))
+        self.assertEqual(APIAuditLog.objects.count(), 1)
+        buffer._replay_spill()
+        self.assertEqual(APIAuditLog.objects.count(), 2)
+
+    def test_flush_when_batch_is_full(self):
+        buffer = self.make_buffer(flusher=True, max_size=10, batch_size=3)
+        for n in range(3):
+            buffer.enqueue(buffered_row(n))
+
+        self.assertTrue(buffer.written.wait(2))
+        self.assertEqual(self.batches, [[0, 1, 2]])
+
+    def test_flush_after_interval(self):
+        buffer = self.make_buffer(flusher=True, max_size=10, flush_interval=0.05)
+        buffer.enqueue(buffered_row(0))
+
+        self.assertTrue(buffer.written.wait(2))
+        self.assertEqual(self.batches, [[0]])
+
+    def test_close_flushes_remaining_rows(self):
+        buffer = self.make_buffer(flusher=True, max_size=10)
+        buffer.enqueue(buffered_row(0))
+        buffer.enqueue(buffered_row(1))
+        self.assertEqual(self.batches, [])
+
+        start = time.monotonic()
+        buffer.close()
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertFalse(buffer._thread.is_alive())
+        self.assertEqual(self.batches, [[0, 1]])
+        self.assertEqual(buffer.stats()["pending"], 0)
+
+
+@override_settings(AUDIT_COMPRESS_MIN_BYTES=256)
+class AuditPayloadTests(TestCase):
+    """
+    Capture caps and masks bodies; packing compresses large ones.
+    """
+
+    def test_capture_parses_and_masks(self):
+        raw = json.dumps({"username": "a", "password": "p", "nested": [{"token": "t"}]}).encode()
+
+        self.assertEqual(
+            capture_body(raw, 1024),
+            ({"username": "a", "password": "******", "nested": [{"token": "******"}]}, len(raw)),
+        )
+        self.assertEqual(capture_body(b"", 1024), (None, 0))
+
+    def test_body_over_cap_is_not_parsed_or_masked(self):
+        raw = json.dumps({"password": "p" * 100}).encode()
+
+        with mock.patch.object(payloads, "mask_sensitive_data") as mask:
+            body, size = capture_body(raw, 50)
+            capture_body(b"{}", 50)
+
+        self.assertEqual(body, {"_truncated": True, "bytes": len(raw)})
+        self.assertEqual(size, len(raw))
+        self.assertEqual(mask.call_count, 1)
+
+    def test_unparsed_body_counts_no_bytes(self):
+        self.assertEqual(capture_body(b"<html>not json</html>", 1024), (None, 0))
+
+    def test_pack_round_trip(self):
+        small = {"ok": True}
+        self.assertEqual(pack_payload(small), (small, None, len(b'{"ok":true}')))
+        self.assertEqual(pack_payload(None), (None, None, 0))
+
+        large = {"rows": [{"title": "Task", "status": "pending"}] * 50}
+        body, compressed, size = pack_payload(large)
+        self.assertIsNone(body)
+        self.assertEqual(size, len(compressed))
+        self.assertLess(size, len(json.dumps(large)))
+        self.assertEqual(unpack_payload(body, compressed), large)
+
+        # Not smaller once compressed: kept as JSON
+        with override_settings(AUDIT_COMPRESS_MIN_BYTES=10):
+            self.assertEqual(pack_payload({"id": "a1b2c3"})[:2], ({"id": "a1b2c3"}, None))
+
+        with override_settings(AUDIT_COMPRESS_MIN_BYTES=0):
+            self.assertEqual(pack_payload(large)[:2], (large, None))
+
+    def test_build_audit_log_sums_stored_bytes(self):
+        large = {"rows": ["x" * 20] * 50}
+        log = build_audit_log({
+            **buffered_row(0),
+            "request_body": large,
+            "response_body": {"ok": True},
+        })
+        log.save()
+        log.refresh_from_db()
+
+        self.assertIsNone(log.request_body)
+        self.assertEqual(unpack_payload(log.request_body, log.request_body_zlib), large)
+        self.assertEqual(log.response_body, {"ok": True})
+        self.assertEqual(
+            log.stored_bytes, len(log.request_body_zlib) + len(b'{"ok":true}')
+        )
+
+    def test_storage_report(self):
+        APIAuditLog.objects.bulk_create([
+            APIAuditLog(
+                endpoint="/api/tasks/", method="POST", status_code=201, timestamp=START,
+                request_body={"_truncated": True, "bytes": 900}, body_bytes=900, stored_bytes=100,
+            ),
+            # Nothing stored: not counted as saved
+            APIAuditLog(
+                endpoint="/api/tasks/", method="POST", status_code=201, timestamp=START,
+                body_bytes=500, stored_bytes=0,
+            ),
+        ])
+
+        out = StringIO()
+        call_command("audit_storage_report", stdout=out)
+        report = out.getvalue()
+
+        self.assertIn("truncated:        1", report)
+        self.assertIn("unparsed:         1 (500 bytes dropped", report)
+        self.assertIn("Captured bytes:     900", report)
+        self.assertIn("Saved:              800 (88.9%)", report)
+
+
+TEST_POLICY = {
+    "default": {"sample_rate": 1.0},
+    "always_log_writes": True,
+    "always_log_errors": True,
+    "rules": [
+        {"path": r"^/api/tasks/analytics/", "sample_rate": 0.0},
+        {"path": r"^/api/tasks/", "methods": ["get"], "sample_rate": 0.5,
+         "role_rates": {"auditor": 1.0, "anonymous": 0.0}},
+        {"path": r"^/api/tasks/", "sample_rate": 0.0, "always_log_writes": False},
+        {"path": r"^/api/health/", "sample_rate": 0.0, "always_log_errors": False},
+    ],
+}
+
+
+class AuditPolicyTests(TestCase):
+    """
+    The first matching rule decides; writes and errors bypass sampling
+    unless the rule turns that off.
+    """
+
+    def setUp(self):
+        self.policy = AuditPolicy(TEST_POLICY)
+        self.draws = []
+        patcher = mock.patch.object(policy.random, "random", side_effect=self.next_draw)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.draw = 0.0
+
+    def next_draw(self):
+        self.draws.append(self.draw)
+        return self.draw
+
+    def test_first_matching_rule_wins(self):
+        # Both the analytics and the GET /api/tasks/ rule match
+        self.assertEqual(self.policy.resolve("/api/tasks/analytics/", "GET").sample_rate, 0.0)
+        self.assertEqual(self.policy.resolve("/api/tasks/1/", "GET").sample_rate, 0.5)
+        self.assertIs(self.policy.resolve("/api/users/", "GET"), self.policy.default_rule)
+
+    def test_methods_filter(self):
+        # "methods" are matched case-insensitively; other methods fall
+        # through to the next rule without a method filter
+        self.assertEqual(self.policy.resolve("/api/tasks/1/", "GET").sample_rate, 0.5)
+        for method in ("POST", "DELETE", "OPTIONS"):
+            rule = self.policy.resolve("/api/tasks/1/", method)
+            self.assertEqual(rule.sample_rate, 0.0)
+            self.assertFalse(rule.always_log_writes)
+
+    def test_sampling(self):
+        self.draw = 0.49
+        self.assertTrue(self.policy.should_log("/api/tasks/1/", "GET", 200, "developer"))
+        self.draw = 0.5
+        self.assertFalse(self.policy.should_log("/api/tasks/1/", "GET", 200, "developer"))
+
+        # Rates of 0 and 1 need no draw
+        self.draws.clear()
+        self.assertTrue(self.policy.should_log("/api/users/", "GET", 200, "developer"))
+        self.assertFalse(self.policy.should_log("/api/tasks/analytics/", "GET", 200, "manager"))
+        self.assertEqual(self.draws, [])
+
+    def test_role_rates(self):
+        self.draw = 0.99
+        self.assertTrue(self.policy.should_log("/api/tasks/1/", "GET", 200, "auditor"))
+        self.draw = 0.0
+        self.assertFalse(self.policy.should_log("/api/tasks/1/", "GET", 200, "anonymous"))
+        # Roles without their own rate use sample_rate
+        self.assertTrue(self.policy.should_log("/api/tasks/1/", "GET", 200, "manager"))
+
+    def test_writes_and_errors_logged_at_rate_zero(self):
+        self.assertTrue(self.policy.should_log("/api/tasks/analytics/", "POST", 200, "developer"))
+        self.assertTrue(self.policy.should_log("/api/tasks/analytics/", "GET", 500, "developer"))
+        self.assertTrue(self.policy.should_log("/api/tasks/1/", "GET", 404, "anonymous"))
+
+    def test_rule_turns_off_overrides(self):
+        # always_log_writes off: a write is sampled like a read (rate 0)
+        self.assertFalse(self.policy.should_log("/api/tasks/1/", "DELETE", 204, "developer"))
+        # ... but its errors are still logged
+        self.assertTrue(self.policy.should_log("/api/tasks/1/", "DELETE", 409, "developer"))
+
+        self.assertFalse(self.policy.should_log("/api/health/", "GET", 503, "developer"))
+        self.assertTrue(self.policy.should_log("/api/health/", "POST", 503, "developer"))
+
+    @override_settings(AUDIT_BUFFER_SIZE=0, AUDIT_POLICY={
+        "rules": [{"path": r"^/api/", "role_rates": {"anonymous": 0.0}, "always_log_errors": False}],
+    })
+    def test_middleware_passes_anonymous_role(self):
+        for state in (get_ip_security_store(), get_clean_ip_cache()):
+            state.clear()
+            self.addCleanup(state.clear)
+
+        self.client.get("/api/tasks/", HTTP_HOST="localhost")
+        self.assertFalse(APIAuditLog.objects.exists())
+
+        user = User.objects.create_user(username="sampled", password="x", email_verified=True)
+        self.client.get(
+            "/api/tasks/", HTTP_HOST="localhost",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+        )
+        self.assertEqual(APIAuditLog.objects.get().user, user)
+
+
+class SegmentTests(TestCase):
+    """
+    A sealed segment and its memory-mapped index.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_segment(self, rows):
+        writer = SegmentWriter(self.directory, rows[0])
+        for row in rows:
+            writer.write(row)
+        writer.seal()
+        return writer
+
+    def test_index_round_trip(self):
+        writer = self.write_segment([
+            archive_row(1, 7, 0),
+            archive_row(2, None, 5),
+            archive_row(3, 3, 10),
+        ])
+
+        index = SegmentIndex(writer.index_path)
+        self.addCleanup(index.close)
+
+        self.assertEqual(index.segment_path, writer.segment_path)
+        self.assertEqual(index.rows, 3)
+        self.assertEqual(index.min_ts, _micros(START))
+        self.assertEqual(index.max_ts, _micros(START + timedelta(minutes=10)))
+        self.assertEqual(index.last_id, 3)
+
+        self.assertTrue(index.has_user(3))
+        self.assertTrue(index.has_user(7))
+        self.assertTrue(index.has_user(None))
+        self.assertFalse(index.has_user(5))
+
+    def test_overlaps_is_half_open(self):
+        writer = self.write_segment([archive_row(1, 1, 0), archive_row(2, 1, 10)])
+        index = SegmentIndex(writer.index_path)
+        self.addCleanup(index.close)
+
+        self.assertTrue(index.overlaps())
+        self.assertTrue(index.overlaps(since=START + timedelta(minutes=10)))
+        self.assertFalse(index.overlaps(since=START + timedelta(minutes=11)))
+        self.assertFalse(index.overlaps(until=START))
+        self.assertTrue(index.overlaps(until=START + timedelta(microseconds=1)))
+
+
+class AuditArchiveTests(TestCase):
+    """
+    archive_before() → segments on disk → search().
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+
+        for minutes, user, endpoint in [
+            (0, cls.alice, "/api/tasks/"),
+            (10, cls.bob, "/api/tasks/1/"),
+            (20, None, "/api/auth/login/"),
+            (30, cls.alice, "/api/auth/logout/"),
+            (40, cls.bob, "/api/tasks/"),
+        ]:
+            APIAuditLog.objects.create(
+                user=user,
+                endpoint=endpoint,
+                method="GET",
+                status_code=200,
+                response_body={"minute": minutes},
+                timestamp=START + timedelta(minutes=minutes),
+            )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = AuditArchive(directory.name)
+
+    def minutes(self, rows):
+        return [row["response_body"]["minute"] for row in rows]
+
+    def test_archive_and_search(self):
+        archived = self.archive.archive_before(START + timedelta(hours=1), segment_rows=2)
+
+        self.assertEqual(archived, 5)
+        indexes = list(self.archive.indexes())
+        for index in indexes:
+            index.close()
+        self.assertEqual([index.rows for index in indexes], [2, 2, 1])
+        self.assertEqual(self.minutes(self.archive.search()), [0, 10, 20, 30, 40])
+        self.assertEqual(self.minutes(self.archive.search(user_id=self.alice.id)), [0, 30])
+        self.assertEqual(self.minutes(self.archive.search(user_id=None)), [20])
+        self.assertEqual(self.minutes(self.archive.search(endpoint="/api/auth/")), [20, 30])
+        self.assertEqual(
+            self.minutes(self.archive.search(
+                since=START + timedelta(minutes=10),
+                until=START + timedelta(minutes=30),
+            )),
+            [10, 20],
+        )
+
+    def test_archive_resumes_after_last_row(self):
+        self.archive.archive_before(START + timedelta(minutes=15))
+        self.assertEqual(self.archive.archive_before(START + timedelta(hours=1)), 3)
+
+        last_timestamp, last_id = self.archive.last_archived()
+        self.assertEqual(last_timestamp, START + timedelta(minutes=40))
+        self.assertEqual(last_id, APIAuditLog.objects.latest("timestamp").id)
+        self.assertEqual(self.minutes(self.archive.search()), [0, 10, 20, 30, 40])
+
+    @override_settings(TIME_ZONE="UTC")
+    def test_naive_bounds_use_current_time_zone(self):
+        self.archive.archive_before(START + timedelta(hours=1))
+
+        rows = self.archive.search(
+            user_id=ANY_USER,
+            since=datetime(2026, 1, 1, 0, 15),
+            until=datetime(2026, 1, 1, 0, 35),
+        )
+        self.assertEqual(self.minutes(rows), [20, 30])
+
+    @override_settings(TIME_ZONE="UTC")
+    def test_search_command_accepts_naive_timestamps(self):
+        self.archive.archive_before(START + timedelta(hours=1))
+
+        out = StringIO()
+        call_command(
+            "search_audit_archive",
+            "--dir", self.archive.directory,
+            "--user", str(self.bob.id),
+            "--since", "2026-01-01T00:05",
+            stdout=out,
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(self.minutes(rows), [10, 40])
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class AuditLogListViewTests(TestCase):
+    """
+    GET /api/audit/logs/: auditors only, keyset pages that neither skip
+    nor repeat rows sharing a timestamp.
+    """
+
+    URL = "/api/audit/logs/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            role: User.objects.create_user(
+                username=role, password="x", role=role, email_verified=True
+            )
+            for role in (User.Role.AUDITOR, User.Role.MANAGER, User.Role.DEVELOPER)
+        }
+
+        # Five rows on one timestamp between two others
+        for minutes in (0, 5, 5, 5, 5, 5, 10):
+            APIAuditLog.objects.create(
+                endpoint="/api/tasks/",
+                method="GET",
+                status_code=200,
+                timestamp=START + timedelta(minutes=minutes),
+            )
+
+    def setUp(self):
+        # Failed logins of earlier tests must not get this client blocked
+        for state in (get_ip_security_store(), get_clean_ip_cache()):
+            state.clear()
+            self.addCleanup(state.clear)
+
+    def get(self, role, **params):
+        # Leave out the rows these requests add to the audit trail
+        params.setdefault("until", (START + timedelta(days=1)).isoformat())
+        token = AccessToken.for_user(self.users[role])
+        return self.client.get(
+            self.URL, params, HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def test_only_auditors_may_list(self):
+        self.assertEqual(self.get(User.Role.AUDITOR).status_code, 200)
+        self.assertEqual(self.get(User.Role.MANAGER).status_code, 403)
+        self.assertEqual(self.get(User.Role.DEVELOPER).status_code, 403)
+        self.assertEqual(self.client.get(self.URL, HTTP_HOST="localhost").status_code, 401)
+
+    def test_pages_with_equal_timestamps(self):
+        expected = list(
+            APIAuditLog.objects.filter(timestamp__lt=START + timedelta(days=1))
+            .order_by("-timestamp", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(len(expected), 7)
+
+        seen = []
+        cursor = None
+        for _ in range(len(expected)):
+            params = {"page_size": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.get(User.Role.AUDITOR, **params).json()
+
+            seen.extend(row["id"] for row in body["results"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.get(User.Role.AUDITOR, cursor="not-a-cursor")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("cursor", response.json())
+
+
+def count_rows(table):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+def table_exists(table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [table])
+        return cursor.fetchone()[0] is not None
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+class AuditPartitionTests(TestCase):
+    """
+    Partition maintenance on the table migration 0003 partitioned: rows in
+    the default partition move into the time partitions created for them,
+    and retention drops whole partitions.
+    """
+
+    DAY = datetime(2026, 1, 18, tzinfo=dt_timezone.utc)
+
+    def log(self, *moments):
+        APIAuditLog.objects.bulk_create([
+            APIAuditLog(endpoint="/api/tasks/", method="GET", status_code=200, timestamp=moment)
+            for moment in moments
+        ])
+
+    def test_table_is_partitioned(self):
+        self.assertTrue(is_partitioned())
+        self.assertTrue(table_exists(DEFAULT_PARTITION))
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        self.log(
+            self.DAY,
+            self.DAY + timedelta(hours=23, minutes=59),
+            self.DAY + timedelta(days=1),
+        )
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 3)
+
+        name = create_partition(self.DAY, "day")
+
+        self.assertEqual(name, f"{TABLE}_p20260118")
+        self.assertEqual(list_partitions(), [(name, self.DAY, self.DAY + timedelta(days=1))])
+        self.assertEqual(count_rows(name), 2)
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 1)
+        self.assertEqual(APIAuditLog.objects.count(), 3)
+
+        # New rows for that day are routed to the partition
+        self.log(self.DAY + timedelta(hours=12))
+        self.assertEqual(count_rows(name), 3)
+
+    def test_split_default_partition(self):
+        self.log(
+            self.DAY + timedelta(hours=1),
+            self.DAY + timedelta(days=2, hours=3),
+            self.DAY + timedelta(days=2, hours=4),
+        )
+
+        created = split_default_partition("day")
+
+        self.assertEqual(created, [f"{TABLE}_p20260118", f"{TABLE}_p20260120"])
+        self.assertEqual([count_rows(name) for name in created], [1, 2])
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 0)
+        self.assertEqual(split_default_partition("day"), [])
+
+    def test_split_default_partition_by_month(self):
+        self.log(self.DAY, self.DAY + timedelta(days=10), self.DAY + timedelta(days=20))
+
+        self.assertEqual(
+            split_default_partition("month"),
+            [f"{TABLE}_p202601", f"{TABLE}_p202602"],
+        )
+        self.assertEqual(count_rows(f"{TABLE}_p202601"), 2)
+
+    def test_drop_expired_partitions(self):
+        for offset in range(3):
+            create_partition(self.DAY + timedelta(days=offset), "day")
+        self.log(self.DAY, self.DAY + timedelta(days=1), self.DAY + timedelta(days=2))
+
+        # Only partitions whose whole range is before the cutoff
+        cutoff = self.DAY + timedelta(days=2, hours=12)
+        expired = [f"{TABLE}_p20260118", f"{TABLE}_p20260119"]
+
+        self.assertEqual(drop_expired_partitions(cutoff, dry_run=True), expired)
+        self.assertEqual(APIAuditLog.objects.count(), 3)
+
+        self.assertEqual(drop_expired_partitions(cutoff, detach_only=True), expired)
+        self.assertEqual(APIAuditLog.objects.count(), 1)
+        # Detached partitions stay as plain tables
+        self.assertTrue(table_exists(expired[0]))
+        self.assertEqual([name for name, _, _ in list_partitions()], [f"{TABLE}_p20260120"])
+
+    def test_drop_expired_partitions_drops_tables(self):
+        name = create_partition(self.DAY, "day")
+        self.log(self.DAY)
+
+        self.assertEqual(drop_expired_partitions(self.DAY + timedelta(days=1)), [name])
+        self.assertFalse(table_exists(name))
+        self.assertFalse(APIAuditLog.objects.exists())
+
+    @override_settings(AUDIT_ARCHIVE_DIR="", AUDIT_RETENTION_DAYS=30)
+    def test_cleanup_command_expires_rows_in_default_partition(self):
+        old = timezone.now() - timedelta(days=40)
+        self.log(old, timezone.now())
+
+        call_command("cleanup_audit_logs", stdout=StringIO())
+
+        self.assertEqual(APIAuditLog.objects.count(), 1)
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 0)
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+class PartitionMigrationTests(TransactionTestCase):
+    """
+    Migration 0003 converts a table that already has rows: they keep
+    their ids, land in the default partition, and the id sequence goes on
+    after them.
+    """
+
+    BEFORE = [("audit", "0002_timestamp_default_now")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes("audit"))
+
+    def test_existing_rows_are_kept(self):
+        self.migrate(self.BEFORE)
+        self.assertFalse(is_partitioned())
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {TABLE} (id, endpoint, method, status_code, "timestamp")
+                VALUES (10, '/api/tasks/', 'GET', 200, %s),
+                       (11, '/api/tasks/', 'POST', 201, %s)
+                """,
+                [START, START + timedelta(days=1)],
+            )
+
+        self.migrate([("audit", "0003_partition_apiauditlog")])
+
+        self.assertTrue(is_partitioned())
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 2)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id, method FROM {TABLE} ORDER BY id')
+            self.assertEqual(cursor.fetchall(), [(10, "GET"), (11, "POST")])
+
+            cursor.execute(
+                f"""
+                INSERT INTO {TABLE} (endpoint, method, status_code, "timestamp")
+                VALUES ('/api/tasks/', 'GET', 200, %s) RETURNING id
+                """,
+                [START],
+            )
+            self.assertEqual(cursor.fetchone()[0], 12)
+
+        self.assertEqual(len(split_default_partition("day")), 2)
+        self.assertEqual(count_rows(DEFAULT_PARTITION), 0)
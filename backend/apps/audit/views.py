@@ -1,3 +1,80 @@
-from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
 
-# Create your views here.
+from apps.users.permissions import IsAuditor
+
+from .models import APIAuditLog
+from .pagination import AuditLogKeysetPagination
+from .serializers import APIAuditLogSerializer
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+class AuditLogListView(ListAPIView):
+    """
+    GET /api/audit/logs/ - Browse the API audit trail (auditors only)
+
+    Filters (all optional, combined with AND):
+    - user: user id
+    - endpoint: endpoint prefix, e.g. /api/tasks/
+    - method: GET, POST, ...
+    - status: status class (2xx, 4xx, ...) or exact code
+    - since / until: ISO 8601 datetimes, [since, until)
+
+    Results are newest first and keyset-paginated (see
+    AuditLogKeysetPagination). Every filter combination is served by one of
+    the composite (…, timestamp, id) indexes on APIAuditLog, and a time
+    range keeps the query on the matching partitions.
+    """
+
+    serializer_class = APIAuditLogSerializer
+    permission_classes = [IsAuditor]
+    pagination_class = AuditLogKeysetPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = APIAuditLog.objects.select_related("user")
+
+        if params.get("user"):
+            qs = qs.filter(user_id=self.parse_int("user", params["user"]))
+
+        if params.get("endpoint"):
+            qs = qs.filter(endpoint__startswith=params["endpoint"])
+
+        if params.get("method"):
+            qs = qs.filter(method=params["method"].upper())
+
+        if params.get("status"):
+            qs = self.filter_status(qs, params["status"])
+
+        if params.get("since"):
+            qs = qs.filter(timestamp__gte=self.parse_timestamp("since", params["since"]))
+
+        if params.get("until"):
+            qs = qs.filter(timestamp__lt=self.parse_timestamp("until", params["until"]))
+
+        return qs
+
+    def filter_status(self, qs, value):
+        value = value.lower()
+
+        if value in STATUS_CLASSES:
+            low = int(value[0]) * 100
+            return qs.filter(status_code__gte=low, status_code__lt=low + 100)
+
+        return qs.filter(status_code=self.parse_int("status", value))
+
+    @staticmethod
+    def parse_int(name, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "Must be an integer."})
+
+    @staticmethod
+    def parse_timestamp(name, value):
+        timestamp = parse_datetime(value)
+        if timestamp is None:
+            raise ValidationError({name: "Must be an ISO 8601 datetime."})
+        return timestamp
@@ -0,0 +1,16 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+"""
+Helpers for state kept in Django's cache framework.
+"""
+
+
+def default_cache_is_shared():
+    """
+    False when the default cache lives inside each process (LocMemCache,
+    DummyCache): a value written there is invisible to other workers, so
+    it can't carry invalidations or counters between them.
+    """
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
@@ -1,7 +1,8 @@
 import time
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import AccessToken
-from rest_framework_simplejwt.exceptions import TokenError
+
+from apps.users.authentication import get_auth_context
 
 AUTO_REFRESH_THRESHOLD = 120  # seconds (2 minutes)
 
@@ -14,28 +15,23 @@ class JWTAutoRefreshMiddleware:
 
     def __init__(self, get_response):
         self.get_response = get_response
-        self.auth = JWTAuthentication()
 
     def __call__(self, request):
         request._new_access_token = None
 
-        header = self.auth.get_header(request)
-        if header:
-            raw_token = self.auth.get_raw_token(header)
-            if raw_token:
-                try:
-                    validated_token = self.auth.get_validated_token(raw_token)
-
-                    exp_timestamp = validated_token["exp"]
-                    current_timestamp = int(time.time())
-                    remaining_seconds = exp_timestamp - current_timestamp
+        # Shared with rate limiting and DRF: the token is verified only once
+        validated_token = get_auth_context(request).validated_token
+        if validated_token is not None:
+            exp_timestamp = validated_token["exp"]
+            current_timestamp = int(time.time())
+            remaining_seconds = exp_timestamp - current_timestamp
 
-                    if 0 < remaining_seconds <= AUTO_REFRESH_THRESHOLD:
-                        user = self.auth.get_user(validated_token)
-                        new_access = AccessToken.for_user(user)
-                        request._new_access_token = str(new_access)
-
-                except TokenError:
+            if 0 < remaining_seconds <= AUTO_REFRESH_THRESHOLD:
+                try:
+                    user = get_auth_context(request).get_user()
+                    new_access = AccessToken.for_user(user)
+                    request._new_access_token = str(new_access)
+                except AuthenticationFailed:
                     pass  # Let DRF handle invalid/expired token
 
         response = self.get_response(request)
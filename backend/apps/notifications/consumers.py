@@ -1,13 +1,19 @@
+import asyncio
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 from .models import Notification
+from .counters import get_unread_count, notifications_read
 
 User = get_user_model()
 
+# Rows fetched per round-trip when replaying the offline backlog
+PENDING_CHUNK_SIZE = 100
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     """
@@ -63,32 +69,79 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         await self.accept()
         
         # Send any pending undelivered notifications
-        pending_notifications = await self.get_pending_notifications()
-        for notification in pending_notifications:
-            await self.send(text_data=json.dumps({
-                'type': 'notification',
-                'notification': notification
-            }))
-            # Mark as delivered
-            await self.mark_notification_delivered(notification['id'])
+        await self.send_pending_notifications()
+
+        # Seed the client's unread badge; later changes are pushed
+        count = await database_sync_to_async(get_unread_count)(self.user.id)
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'count': count
+        }))
+
+    async def send_pending_notifications(self):
+        """
+        Replay the full undelivered backlog in keyset-ordered chunks.
+
+        Each chunk is marked delivered in a single UPDATE and the loop
+        yields to the event loop between chunks, so a long offline period
+        neither blows up memory nor starves other consumers.
+        """
+        cursor = None
+
+        while True:
+            chunk = await self.get_pending_notifications(cursor)
+            if not chunk:
+                break
+
+            for notification in chunk:
+                await self.send(text_data=json.dumps({
+                    'type': 'notification',
+                    'notification': notification
+                }))
+
+            await self.mark_notifications_delivered([n['id'] for n in chunk])
+
+            if len(chunk) < PENDING_CHUNK_SIZE:
+                break
+
+            last = chunk[-1]
+            cursor = (last['created_at'], last['id'])
+            await asyncio.sleep(0)
 
     @database_sync_to_async
-    def get_pending_notifications(self):
-        """Get undelivered notifications as a list of dictionaries."""
-        notifications = Notification.objects.filter(
+    def get_pending_notifications(self, cursor=None):
+        """
+        Get the next chunk of undelivered notifications after ``cursor``.
+
+        ``cursor`` is the ``(created_at, id)`` of the last row already sent;
+        ordering on the same pair keeps the scan on the partial
+        ``notif_user_undelivered_idx`` index.
+        """
+        queryset = Notification.objects.filter(
             user=self.user,
             is_delivered=False
-        ).order_by('created_at')[:50]
-        
+        )
+
+        if cursor is not None:
+            created_at, last_id = cursor
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) |
+                Q(created_at=created_at, id__gt=last_id)
+            )
+
+        rows = queryset.order_by('created_at', 'id').values(
+            'id', 'message', 'notification_type', 'task_id', 'created_at', 'read'
+        )[:PENDING_CHUNK_SIZE]
+
         results = []
-        for n in notifications:
+        for row in rows:
             results.append({
-                'id': n.id,
-                'message': n.message,
-                'notification_type': n.notification_type,
-                'task_id': n.task_id,
-                'created_at': n.created_at.isoformat(),
-                'read': n.read,
+                'id': row['id'],
+                'message': row['message'],
+                'notification_type': row['notification_type'],
+                'task_id': row['task_id'],
+                'created_at': row['created_at'].isoformat(),
+                'read': row['read'],
             })
         return results
     
@@ -144,6 +197,16 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         notification_id = event['notification'].get('id')
         if notification_id:
             await self.mark_notification_delivered(notification_id)
+
+    async def unread_count_message(self, event):
+        """
+        Handle unread counter change from channel layer.
+        Send the new count to WebSocket.
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'count': event['count']
+        }))
     
     @database_sync_to_async
     def get_user(self, user_id):
@@ -158,23 +221,21 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def mark_notification_read(self, notification_id):
         """Mark a notification as read."""
-        try:
-            notification = Notification.objects.get(
-                id=notification_id,
-                user=self.user
-            )
-            notification.read = True
-            notification.save()
-        except Notification.DoesNotExist:
-            pass
+        updated = Notification.objects.filter(
+            id=notification_id,
+            user=self.user,
+            read=False
+        ).update(read=True)
+        notifications_read(self.user.id, updated)
     
     @database_sync_to_async
     def mark_all_notifications_read(self):
         """Mark all notifications as read for the user."""
-        Notification.objects.filter(
+        updated = Notification.objects.filter(
             user=self.user,
             read=False
         ).update(read=True)
+        notifications_read(self.user.id, updated)
     
     @database_sync_to_async
     def mark_notification_delivered(self, notification_id):
@@ -185,3 +246,11 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             notification.save()
         except Notification.DoesNotExist:
             pass
+    
+    @database_sync_to_async
+    def mark_notifications_delivered(self, notification_ids):
+        """Mark a batch of notifications as delivered in one statement."""
+        Notification.objects.filter(
+            id__in=notification_ids,
+            user=self.user
+        ).update(is_delivered=True)
@@ -0,0 +1,153 @@
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from apps.common.cache import default_cache_is_shared
+
+from .models import Notification
+
+"""
+Per-user unread notification counters.
+
+The count lives in the cache under ``unread-notifications:<user_id>`` and is
+adjusted with atomic ``incr``/``decr`` wherever notifications are created
+or read, so the bell never has to run COUNT(*). A missing key is rebuilt
+from the database, and ``reconcile_unread_counts`` periodically corrects
+any drift (cache eviction, rolled-back transactions).
+
+Notifications are created by web workers and by the Celery worker alike,
+so the counters need a cache they all share. With a per-process default
+cache (LocMemCache) each worker would only see its own adjustments: the
+count is then always the COUNT(*) itself (served by the (user, read)
+index) and there is nothing to reconcile.
+
+Every change is pushed to the user's WebSocket group as an
+``unread_count`` event.
+"""
+
+UNREAD_COUNT_TTL = 24 * 60 * 60  # 24 hours
+
+
+def get_unread_count_key(user_id):
+    return f"unread-notifications:{user_id}"
+
+
+def get_unread_count(user_id):
+    """
+    Return the cached unread count, rebuilding it from the DB on a miss.
+    """
+    if not default_cache_is_shared():
+        return _count_unread(user_id)
+
+    count = cache.get(get_unread_count_key(user_id))
+    if count is None:
+        count = _count_unread(user_id)
+        cache.set(get_unread_count_key(user_id), count, UNREAD_COUNT_TTL)
+    return max(count, 0)
+
+
+def notifications_created(user_ids):
+    """
+    Bump unread counters for newly created notifications.
+
+    ``user_ids`` holds one entry per notification, so a batch created with
+    ``bulk_create`` costs one ``incr`` per distinct user.
+    """
+    for user_id, created in Counter(user_ids).items():
+        _adjust_on_commit(user_id, created)
+
+
+def notifications_read(user_id, count=1):
+    """Lower the unread counter after ``count`` notifications were read."""
+    if count:
+        _adjust_on_commit(user_id, -count)
+
+
+def reconcile_unread_counts():
+    """
+    Recompute every user's unread count in one grouped query.
+
+    Cached values that drifted are overwritten and the corrected count is
+    pushed to the user. Returns the number of corrected counters.
+    """
+    if not default_cache_is_shared():
+        return 0
+
+    User = get_user_model()
+
+    counts = dict(
+        User.objects.annotate(
+            unread=Count("notifications", filter=Q(notifications__read=False))
+        ).values_list("id", "unread")
+    )
+
+    keys = {get_unread_count_key(user_id): user_id for user_id in counts}
+    cached = cache.get_many(keys.keys())
+
+    cache.set_many(
+        {key: counts[user_id] for key, user_id in keys.items()},
+        UNREAD_COUNT_TTL,
+    )
+
+    corrected = 0
+    for key, value in cached.items():
+        user_id = keys[key]
+        if value != counts[user_id]:
+            send_unread_count_to_user(user_id, counts[user_id])
+            corrected += 1
+
+    return corrected
+
+
+def send_unread_count_to_user(user_id, count):
+    """
+    Push the current unread count to the user's WebSocket group.
+    """
+    channel_layer = get_channel_layer()
+
+    try:
+        async_to_sync(channel_layer.group_send)(
+            f"notifications_{user_id}",
+            {
+                "type": "unread_count_message",
+                "count": max(count, 0),
+            }
+        )
+    except Exception as e:
+        print(f"Failed to send unread count to user {user_id}: {e}")
+
+
+# -----------------------------------------------------
+# Helpers
+# -----------------------------------------------------
+
+def _count_unread(user_id):
+    return Notification.objects.filter(user_id=user_id, read=False).count()
+
+
+def _adjust_on_commit(user_id, delta):
+    # Apply after commit so a rebuild on cache miss sees the new rows
+    # and a rolled-back transaction never touches the counter.
+    transaction.on_commit(lambda: _adjust(user_id, delta))
+
+
+def _adjust(user_id, delta):
+    if not default_cache_is_shared():
+        send_unread_count_to_user(user_id, _count_unread(user_id))
+        return
+
+    key = get_unread_count_key(user_id)
+
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        # Key missing or evicted → rebuild from the database
+        count = _count_unread(user_id)
+        cache.set(key, count, UNREAD_COUNT_TTL)
+
+    send_unread_count_to_user(user_id, count)
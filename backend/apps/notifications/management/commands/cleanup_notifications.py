@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from datetime import timedelta
+
+from apps.notifications.services import purge_read_notifications
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications older than 30 days in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.5)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options["days"])
+
+        def report(batch_number, rows, seconds):
+            self.stdout.write(
+                f"Batch {batch_number}: deleted {rows} rows in {seconds:.3f}s"
+            )
+
+        deleted = purge_read_notifications(
+            cutoff,
+            batch_size=options["batch_size"],
+            sleep_seconds=options["sleep"],
+            dry_run=options["dry_run"],
+            on_batch=report,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would delete {deleted} old notifications.")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} old notifications.")
+        )
@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.notifications.scheduler import (
+    get_deadline_scheduler,
+    process_due_events,
+    rebuild_deadline_schedule,
+)
+
+
+class Command(BaseCommand):
+    help = "Fire deadline warnings and priority escalation at their exact time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-idle",
+            type=float,
+            default=1.0,
+            help="Longest sleep between checks, in seconds",
+        )
+        parser.add_argument(
+            "--no-rebuild",
+            action="store_true",
+            help="Skip re-seeding timers from the task table on start-up",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process due events once and exit",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = get_deadline_scheduler()
+
+        if not settings.DEADLINE_SCHEDULER_URL:
+            self.stderr.write(
+                "DEADLINE_SCHEDULER_URL is not set: timers scheduled by other "
+                "processes won't reach this worker (Celery Beat sweeps every "
+                "10 minutes instead)."
+            )
+
+        if not options["no_rebuild"]:
+            count = rebuild_deadline_schedule()
+            self.stdout.write(f"Scheduled deadline timers for {count} tasks.")
+
+        while True:
+            close_old_connections()
+
+            warnings, escalated = process_due_events()
+            if warnings or escalated:
+                self.stdout.write(
+                    f"Sent {warnings} deadline warnings, escalated {escalated} tasks."
+                )
+
+            if options["once"]:
+                return
+
+            # Sleep until the next timer, but wake up regularly to pick up
+            # timers scheduled by other processes
+            next_fire_time = scheduler.next_fire_time()
+            idle = options["max_idle"]
+            if next_fire_time is not None:
+                idle = min(max(next_fire_time - time.time(), 0), idle)
+
+            time.sleep(idle)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_alter_notification_notification_type'),
+        ('tasks', '0002_task_tasks_task_deadlin_ab25e9_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_delivered', False)), fields=['user', 'created_at'], name='notif_user_undelivered_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_undelivered_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='update_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_update_count'),
+        ('tasks', '0002_task_tasks_task_deadlin_ab25e9_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('notification_type', 'deadline_warning')), fields=['task', 'created_at'], name='notif_deadline_warning_idx'),
+        ),
+    ]
@@ -19,12 +19,31 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
     is_delivered = models.BooleanField(default=False)  # Track if sent via WebSocket
+    update_count = models.PositiveIntegerField(default=1)  # Events coalesced into this row
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'read']),
+            # Replay of the offline backlog on WebSocket connect
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=models.Q(is_delivered=False),
+                name='notif_user_undelivered_idx',
+            ),
+            # "Already warned recently?" anti-join in check_deadline_warnings
+            models.Index(
+                fields=['task', 'created_at'],
+                condition=models.Q(notification_type='deadline_warning'),
+                name='notif_deadline_warning_idx',
+            ),
+            # Retention cleanup of old read notifications
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(read=True),
+                name='notif_read_created_idx',
+            ),
         ]
 
     def __str__(self):
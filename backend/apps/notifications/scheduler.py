@@ -0,0 +1,221 @@
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+"""
+Exact-time deadline events.
+
+Instead of polling the task table, every active task keeps two timers in a
+sorted set keyed by fire time (unix seconds):
+
+    warn:<task_id>      deadline - 1 hour   → deadline warning
+    escalate:<task_id>  deadline - 24 hours → priority escalation
+
+Timers are (re)scheduled whenever a task's deadline or status changes and
+cancelled when it is completed or deleted. The run_deadline_scheduler worker
+pops only the events that are due, so timing is accurate to the second and
+no table is scanned.
+
+Backends:
+- RedisDeadlineScheduler: shared ZSET, used when DEADLINE_SCHEDULER_URL is set
+- InMemoryDeadlineScheduler: per-process stand-in for local dev and tests
+"""
+
+WARNING_LEAD = timedelta(hours=1)
+ESCALATION_LEAD = timedelta(hours=24)
+
+ACTIVE_STATUSES = ("pending", "in_progress", "blocked")
+
+
+class InMemoryDeadlineScheduler:
+    """
+    Heap-backed sorted set. Rescheduling leaves a stale heap entry behind
+    which is skipped when popped.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, member, fire_at):
+        with self._lock:
+            self._scores[member] = fire_at
+            heapq.heappush(self._heap, (fire_at, member))
+
+    def cancel(self, *members):
+        with self._lock:
+            for member in members:
+                self._scores.pop(member, None)
+
+    def next_fire_time(self):
+        with self._lock:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now, limit=500):
+        due = []
+        with self._lock:
+            while self._heap and len(due) < limit:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                fire_at, member = heapq.heappop(self._heap)
+                del self._scores[member]
+                due.append(member)
+        return due
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._scores.clear()
+
+    def _discard_stale(self):
+        while self._heap:
+            fire_at, member = self._heap[0]
+            if self._scores.get(member) == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+
+class RedisDeadlineScheduler:
+    """
+    Redis ZSET shared by web and worker processes. Popping due events is
+    one Lua script, so concurrent workers never fire the same event twice.
+    """
+
+    KEY = "deadline-events"
+
+    POP_DUE_SCRIPT = """
+        local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+        if #due > 0 then
+            redis.call('ZREM', KEYS[1], unpack(due))
+        end
+        return due
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._pop_due = self._redis.register_script(self.POP_DUE_SCRIPT)
+
+    def schedule(self, member, fire_at):
+        self._redis.zadd(self.KEY, {member: fire_at})
+
+    def cancel(self, *members):
+        if members:
+            self._redis.zrem(self.KEY, *members)
+
+    def next_fire_time(self):
+        head = self._redis.zrange(self.KEY, 0, 0, withscores=True)
+        return head[0][1] if head else None
+
+    def pop_due(self, now, limit=500):
+        return self._pop_due(keys=[self.KEY], args=[now, limit])
+
+    def clear(self):
+        self._redis.delete(self.KEY)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_deadline_scheduler():
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                url = settings.DEADLINE_SCHEDULER_URL
+                _scheduler = (
+                    RedisDeadlineScheduler(url) if url else InMemoryDeadlineScheduler()
+                )
+    return _scheduler
+
+
+# -----------------------------------------------------
+# Task timers
+# -----------------------------------------------------
+
+def schedule_task_deadline(task):
+    """
+    Schedule (or move) both timers of a task, or cancel them once they no
+    longer apply. A timer whose fire time already passed fires right away,
+    matching the old polling behaviour.
+    """
+    scheduler = get_deadline_scheduler()
+    warn, escalate = _members(task.id)
+
+    if task.status not in ACTIVE_STATUSES:
+        scheduler.cancel(warn, escalate)
+        return
+
+    now = time.time()
+    deadline = task.deadline.timestamp()
+
+    # Warn only while the deadline is still ahead
+    if deadline >= now:
+        scheduler.schedule(warn, max(deadline - WARNING_LEAD.total_seconds(), now))
+    else:
+        scheduler.cancel(warn)
+
+    # Escalate once, and never past critical
+    if task.priority_escalated or task.priority == "critical":
+        scheduler.cancel(escalate)
+    else:
+        scheduler.schedule(escalate, max(deadline - ESCALATION_LEAD.total_seconds(), now))
+
+
+def cancel_task_deadline(task_id):
+    get_deadline_scheduler().cancel(*_members(task_id))
+
+
+def rebuild_deadline_schedule():
+    """
+    Re-seed the timers of every active task
+    (worker start-up, or after the Redis set was flushed).
+    Returns the number of tasks scheduled.
+    """
+    from apps.tasks.models import Task
+
+    tasks = Task.objects.filter(
+        status__in=ACTIVE_STATUSES,
+    ).only("id", "status", "priority", "priority_escalated", "deadline")
+
+    count = 0
+    for task in tasks.iterator():
+        schedule_task_deadline(task)
+        count += 1
+    return count
+
+
+def process_due_events(now=None):
+    """
+    Pop every due event and fire it. Each event type is handled with one
+    set-based call that re-validates the tasks against the database.
+    Returns ``(warnings_sent, tasks_escalated)``.
+    """
+    from apps.tasks.services_escalation import escalate_due_tasks
+    from .services import send_deadline_warnings
+
+    now = now or time.time()
+    due = get_deadline_scheduler().pop_due(now)
+
+    warn_ids, escalate_ids = [], []
+    for member in due:
+        kind, task_id = member.split(":")
+        (warn_ids if kind == "warn" else escalate_ids).append(int(task_id))
+
+    warnings = send_deadline_warnings(task_ids=warn_ids) if warn_ids else []
+    escalated = escalate_due_tasks(task_ids=escalate_ids) if escalate_ids else []
+
+    return len(warnings), len(escalated)
+
+
+def _members(task_id):
+    return f"warn:{task_id}", f"escalate:{task_id}"
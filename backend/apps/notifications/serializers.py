@@ -19,6 +19,7 @@ class NotificationSerializer(serializers.ModelSerializer):
             'task_status',
             'created_at',
             'read',
-            'is_delivered'
+            'is_delivered',
+            'update_count'
         ]
-        read_only_fields = ['id', 'created_at', 'is_delivered']
+        read_only_fields = ['id', 'created_at', 'is_delivered', 'update_count']
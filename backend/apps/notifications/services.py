@@ -0,0 +1,196 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Notification
+from .counters import notifications_created
+
+"""
+Coalescing of bursty notifications.
+
+Dragging a card across several Kanban columns, or a parent/child cascade,
+fires one status change per intermediate state. Within
+NOTIFICATION_COALESCE_WINDOW seconds, a still-undelivered notification for
+the same (user, task, type) is updated in place:
+
+    "Task 'X' status changed to Completed (3 updates)"
+
+instead of inserting a new row and pushing a new WebSocket message.
+"""
+
+
+def create_or_coalesce_notification(user, task, notification_type, message):
+    """
+    Create a notification, or fold it into a pending one.
+
+    Returns ``(notification, created)``. When ``created`` is False the
+    existing row was updated and no new delivery is needed: it is still
+    undelivered, so the consumer replays it on the next connect.
+    """
+    window = settings.NOTIFICATION_COALESCE_WINDOW
+
+    if window <= 0:
+        return _create_notification(user, task, notification_type, message), True
+
+    from apps.tasks.models import Task
+
+    with transaction.atomic():
+        # Concurrent events for the task queue up on its row lock, so the
+        # later one finds the row the first one inserted instead of both
+        # inserting (locking a pending row alone can't cover the first event)
+        list(Task.objects.select_for_update().filter(pk=task.pk).values_list("pk"))
+
+        pending = (
+            Notification.objects
+            .select_for_update()
+            .filter(
+                user=user,
+                task=task,
+                notification_type=notification_type,
+                is_delivered=False,
+                read=False,
+                created_at__gte=timezone.now() - timedelta(seconds=window),
+            )
+            .order_by("-created_at")
+            .first()
+        )
+
+        if pending:
+            pending.update_count += 1
+            pending.message = f"{message} ({pending.update_count} updates)"
+            pending.save(update_fields=["message", "update_count"])
+            return pending, False
+
+        return _create_notification(user, task, notification_type, message), True
+
+
+def _create_notification(user, task, notification_type, message):
+    return Notification.objects.create(
+        user=user,
+        task=task,
+        message=message,
+        notification_type=notification_type,
+    )
+
+
+def purge_read_notifications(cutoff, batch_size=1000, sleep_seconds=0.5,
+                             dry_run=False, on_batch=None):
+    """
+    Delete read notifications created before ``cutoff`` in id-range batches.
+
+    Each batch is one short ``DELETE ... WHERE id > lo AND id <= hi AND read
+    AND created_at < cutoff`` so no statement holds locks or generates WAL
+    for long, and ``sleep_seconds`` between batches leaves room for the
+    notification bell. Candidates are found through the partial
+    ``notif_read_created_idx`` index.
+
+    ``on_batch(batch_number, rows, seconds)`` is called after every batch.
+    With ``dry_run`` nothing is deleted and only the matching count is
+    returned. Returns the total number of rows (to be) deleted.
+    """
+    expired = Notification.objects.filter(read=True, created_at__lt=cutoff)
+
+    if dry_run:
+        return expired.count()
+
+    total = 0
+    batch_number = 0
+    last_id = 0
+
+    while True:
+        ids = list(
+            expired.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        started = time.monotonic()
+        deleted, _ = expired.filter(id__gt=last_id, id__lte=ids[-1]).delete()
+        elapsed = time.monotonic() - started
+
+        batch_number += 1
+        total += deleted
+        last_id = ids[-1]
+
+        if on_batch:
+            on_batch(batch_number, deleted, elapsed)
+
+        if len(ids) < batch_size:
+            break
+
+        time.sleep(sleep_seconds)
+
+    return total
+
+
+def deadline_warning_candidates(now=None):
+    """
+    Active tasks due within the next hour that have not been warned in the
+    last 2 hours. Tasks are found through the partial
+    ``task_active_deadline_idx`` index, recent warnings through
+    ``notif_deadline_warning_idx``.
+    """
+    from apps.tasks.models import Task
+
+    now = now or timezone.now()
+    one_hour_later = now + timedelta(hours=1)
+
+    # Don't spam if a warning was already sent recently
+    recent_warning = Notification.objects.filter(
+        task=OuterRef('pk'),
+        notification_type='deadline_warning',
+        created_at__gte=now - timedelta(hours=2)
+    )
+
+    return Task.objects.filter(
+        deadline__gte=now,
+        deadline__lte=one_hour_later,
+        status__in=('pending', 'in_progress', 'blocked')
+    ).filter(
+        ~Exists(recent_warning)
+    ).only('id', 'title', 'deadline', 'assigned_to_id')
+
+
+def send_deadline_warnings(task_ids=None, now=None):
+    """
+    Warn the assignees of active tasks due within the next hour that have
+    not been warned in the last 2 hours.
+
+    Selection is one anti-join query (see ``deadline_warning_candidates``);
+    warnings are created with one ``bulk_create`` and sent in one batch.
+    ``task_ids`` restricts the check to those tasks (exact-time scheduler).
+    Returns the created warnings.
+    """
+    from .signals import send_notifications_to_users
+
+    now = now or timezone.now()
+    due_tasks = deadline_warning_candidates(now)
+
+    if task_ids is not None:
+        due_tasks = due_tasks.filter(id__in=task_ids)
+
+    warnings = []
+    for task in due_tasks:
+        # Calculate time remaining
+        time_remaining = task.deadline - now
+        minutes_remaining = int(time_remaining.total_seconds() / 60)
+
+        warnings.append(Notification(
+            user_id=task.assigned_to_id,
+            task_id=task.id,
+            message=f"⚠️ Task '{task.title}' deadline approaching in {minutes_remaining} minutes!",
+            notification_type='deadline_warning'
+        ))
+
+    # Create all warnings in one INSERT and send them in one batch
+    warnings = Notification.objects.bulk_create(warnings)
+    notifications_created([warning.user_id for warning in warnings])
+    send_notifications_to_users(warnings)
+
+    return warnings
@@ -1,9 +1,14 @@
-from django.db.models.signals import post_save, pre_save
+import asyncio
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from apps.tasks.models import Task
 from .models import Notification
+from .counters import notifications_created
+from .services import create_or_coalesce_notification
+from .scheduler import cancel_task_deadline, schedule_task_deadline
 
 
 @receiver(pre_save, sender=Task)
@@ -16,12 +21,15 @@ def track_state_change(sender, instance, **kwargs):
             previous = Task.objects.get(pk=instance.pk)
             instance._previous_status = previous.status
             instance._previous_assigned_to = previous.assigned_to
+            instance._previous_deadline = previous.deadline
         except Task.DoesNotExist:
             instance._previous_status = None
             instance._previous_assigned_to = None
+            instance._previous_deadline = None
     else:
         instance._previous_status = None
         instance._previous_assigned_to = None
+        instance._previous_deadline = None
 
 
 @receiver(post_save, sender=Task)
@@ -42,6 +50,7 @@ def send_task_notification(sender, instance, created, **kwargs):
             message=f"You have been assigned a new task: {instance.title}",
             notification_type='task_assigned'
         )
+        notifications_created([instance.assigned_to.id])
         send_notification_to_user(instance.assigned_to.id, notification)
         return
     
@@ -55,6 +64,7 @@ def send_task_notification(sender, instance, created, **kwargs):
             message=f"You have been unassigned from task: {instance.title}",
             notification_type='task_unassigned'
         )
+        notifications_created([previous_assigned_to.id])
         send_notification_to_user(previous_assigned_to.id, notification_unassigned)
         notified_users.add(previous_assigned_to.id)
 
@@ -66,6 +76,7 @@ def send_task_notification(sender, instance, created, **kwargs):
                 message=f"You have been assigned a task: {instance.title}",
                 notification_type='task_assigned'
             )
+            notifications_created([instance.assigned_to.id])
             send_notification_to_user(instance.assigned_to.id, notification_assigned)
             notified_users.add(instance.assigned_to.id)
     
@@ -77,13 +88,38 @@ def send_task_notification(sender, instance, created, **kwargs):
         if instance.assigned_to and instance.assigned_to.id not in notified_users:
             status_display = dict(Task.STATUS_CHOICES).get(instance.status, instance.status)
             
-            notification = Notification.objects.create(
+            notification, created = create_or_coalesce_notification(
                 user=instance.assigned_to,
                 task=instance,
+                notification_type='status_change',
                 message=f"Task '{instance.title}' status changed to {status_display}",
-                notification_type='status_change'
             )
-            send_notification_to_user(instance.assigned_to.id, notification)
+
+            # Coalesced into a pending undelivered row → nothing new to push
+            if created:
+                notifications_created([instance.assigned_to.id])
+                send_notification_to_user(instance.assigned_to.id, notification)
+
+
+@receiver(post_save, sender=Task)
+def schedule_deadline_events(sender, instance, created, **kwargs):
+    """
+    Keep the task's exact-time deadline timers in sync when it is created
+    or its deadline or status changes.
+    """
+    if (
+        created
+        or getattr(instance, '_previous_deadline', None) != instance.deadline
+        or getattr(instance, '_previous_status', None) != instance.status
+    ):
+        transaction.on_commit(lambda: schedule_task_deadline(instance))
+
+
+@receiver(post_delete, sender=Task)
+def cancel_deadline_events(sender, instance, **kwargs):
+    """Drop the timers of a deleted task."""
+    task_id = instance.id
+    transaction.on_commit(lambda: cancel_task_deadline(task_id))
 
 
 def send_notification_to_user(user_id, notification):
@@ -93,23 +129,13 @@ def send_notification_to_user(user_id, notification):
     """
     channel_layer = get_channel_layer()
     
-    # Prepare notification data
-    notification_data = {
-        'id': notification.id,
-        'message': notification.message,
-        'notification_type': notification.notification_type,
-        'task_id': notification.task_id,
-        'created_at': notification.created_at.isoformat(),
-        'read': notification.read,
-    }
-    
     # Send to user's notification group
     try:
         async_to_sync(channel_layer.group_send)(
             f'notifications_{user_id}',
             {
                 'type': 'notification_message',
-                'notification': notification_data
+                'notification': serialize_notification(notification)
             }
         )
         # Note: We do NOT mark as delivered here. 
@@ -117,3 +143,43 @@ def send_notification_to_user(user_id, notification):
     except Exception as e:
         # If sending fails, it remains in DB with is_delivered=False
         print(f"Failed to send notification to user {user_id}: {e}")
+
+
+def send_notifications_to_users(notifications):
+    """
+    Send a batch of notifications via WebSocket in one event-loop round-trip.
+    Undelivered ones stay queued in the database, as with a single send.
+    """
+    if not notifications:
+        return
+
+    channel_layer = get_channel_layer()
+
+    async def send_all():
+        await asyncio.gather(*(
+            channel_layer.group_send(
+                f'notifications_{notification.user_id}',
+                {
+                    'type': 'notification_message',
+                    'notification': serialize_notification(notification)
+                }
+            )
+            for notification in notifications
+        ))
+
+    try:
+        async_to_sync(send_all)()
+    except Exception as e:
+        print(f"Failed to send {len(notifications)} notifications: {e}")
+
+
+def serialize_notification(notification):
+    """Prepare notification data for the WebSocket payload."""
+    return {
+        'id': notification.id,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'task_id': notification.task_id,
+        'created_at': notification.created_at.isoformat(),
+        'read': notification.read,
+    }
@@ -1,9 +1,8 @@
 from celery import shared_task
 from django.utils import timezone
 from datetime import timedelta
-from apps.tasks.models import Task
-from .models import Notification
-from .signals import send_notification_to_user
+from .counters import reconcile_unread_counts
+from .services import purge_read_notifications, send_deadline_warnings
 
 
 @shared_task
@@ -11,59 +10,55 @@ def check_deadline_warnings():
     """
     Celery task to check for tasks approaching deadline.
     Sends notification 1 hour before deadline.
-    
-    This should be scheduled to run every 5-10 minutes via Celery Beat.
+
+    Warnings normally fire on time from the run_deadline_scheduler worker;
+    this sweep is an hourly safety net (e.g. after the timer set was lost),
+    or the only trigger (every 10 minutes) when DEADLINE_SCHEDULER_URL is
+    not set.
     """
-    now = timezone.now()
-    one_hour_later = now + timedelta(hours=1)
-    
-    # Find tasks with deadline within the next hour that are not completed
-    upcoming_tasks = Task.objects.filter(
-        deadline__gte=now,
-        deadline__lte=one_hour_later,
-        status__in=['pending', 'in_progress', 'blocked']
-    ).select_related('assigned_to')
-    
-    for task in upcoming_tasks:
-        # Check if we already sent a warning for this task
-        existing_notification = Notification.objects.filter(
-            task=task,
-            notification_type='deadline_warning',
-            created_at__gte=now - timedelta(hours=2)  # Don't spam if already sent recently
-        ).exists()
-        
-        if not existing_notification:
-            # Calculate time remaining
-            time_remaining = task.deadline - now
-            minutes_remaining = int(time_remaining.total_seconds() / 60)
-            
-            # Create notification
-            notification = Notification.objects.create(
-                user=task.assigned_to,
-                task=task,
-                message=f"⚠️ Task '{task.title}' deadline approaching in {minutes_remaining} minutes!",
-                notification_type='deadline_warning'
-            )
-            
-            # Send via WebSocket
-            send_notification_to_user(task.assigned_to.id, notification)
-    
-    return f"Checked {upcoming_tasks.count()} tasks approaching deadline"
+    warnings = send_deadline_warnings()
+
+    return f"Sent {len(warnings)} deadline warnings"
 
 
 @shared_task
-def cleanup_old_notifications():
+def cleanup_old_notifications(batch_size=1000, sleep_seconds=0.5, dry_run=False):
     """
     Celery task to clean up old read notifications.
     Keeps unread notifications and recent read notifications (last 30 days).
+
+    Deletes in id-range batches of ``batch_size`` rows, sleeping
+    ``sleep_seconds`` between batches, so retention can run during
+    business hours. ``dry_run`` only counts the matching rows.
     
     This should be scheduled to run daily via Celery Beat.
     """
     thirty_days_ago = timezone.now() - timedelta(days=30)
-    
-    deleted_count, _ = Notification.objects.filter(
-        read=True,
-        created_at__lt=thirty_days_ago
-    ).delete()
-    
+
+    def report(batch_number, rows, seconds):
+        print(f"Notification cleanup batch {batch_number}: {rows} rows in {seconds:.3f}s")
+
+    deleted_count = purge_read_notifications(
+        thirty_days_ago,
+        batch_size=batch_size,
+        sleep_seconds=sleep_seconds,
+        dry_run=dry_run,
+        on_batch=report,
+    )
+
+    if dry_run:
+        return f"Would delete {deleted_count} old notifications"
+
     return f"Deleted {deleted_count} old notifications"
+
+
+@shared_task
+def reconcile_unread_notification_counts():
+    """
+    Celery task to correct drift in the cached per-user unread counters.
+
+    This should be scheduled to run hourly via Celery Beat.
+    """
+    corrected = reconcile_unread_counts()
+
+    return f"Corrected {corrected} unread notification counters"
@@ -1,3 +1,524 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.security.ipstate import get_clean_ip_cache, get_ip_security_store
+from apps.tasks.models import Task
+from apps.users.models import User
+
+from . import counters, services, signals
+from .counters import get_unread_count, get_unread_count_key, notifications_created, reconcile_unread_counts
+from .models import Notification
+from .scheduler import InMemoryDeadlineScheduler, get_deadline_scheduler, process_due_events
+from .services import (
+    create_or_coalesce_notification,
+    deadline_warning_candidates,
+    purge_read_notifications,
+    send_deadline_warnings,
+)
+
+
+class InMemoryDeadlineSchedulerTests(TestCase):
+    """
+    The per-process stand-in behaves like the Redis sorted set.
+    """
+
+    def test_pop_due_in_fire_time_order(self):
+        scheduler = InMemoryDeadlineScheduler()
+        scheduler.schedule("warn:1", 30)
+        scheduler.schedule("warn:2", 10)
+        scheduler.schedule("warn:3", 20)
+
+        self.assertEqual(scheduler.next_fire_time(), 10)
+        self.assertEqual(scheduler.pop_due(25), ["warn:2", "warn:3"])
+        self.assertEqual(scheduler.pop_due(25), [])
+        self.assertEqual(scheduler.pop_due(30), ["warn:1"])
+        self.assertIsNone(scheduler.next_fire_time())
+
+    def test_reschedule_and_cancel(self):
+        scheduler = InMemoryDeadlineScheduler()
+        scheduler.schedule("warn:1", 10)
+        scheduler.schedule("warn:1", 50)  # moved: the old entry is stale
+        scheduler.schedule("escalate:1", 20)
+        scheduler.cancel("escalate:1")
+
+        self.assertEqual(scheduler.pop_due(40), [])
+        self.assertEqual(scheduler.next_fire_time(), 50)
+        self.assertEqual(scheduler.pop_due(50), ["warn:1"])
+
+    def test_pop_due_limit(self):
+        scheduler = InMemoryDeadlineScheduler()
+        for i in range(5):
+            scheduler.schedule(f"warn:{i}", i)
+
+        self.assertEqual(len(scheduler.pop_due(10, limit=3)), 3)
+        self.assertEqual(len(scheduler.pop_due(10, limit=3)), 2)
+
+
+class ProcessDueEventsTests(TestCase):
+    """
+    Saving a task schedules its timers; process_due_events fires each once.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="deadline", password="x")
+
+    def setUp(self):
+        get_deadline_scheduler().clear()
+        self.addCleanup(get_deadline_scheduler().clear)
+
+    def create_task(self, deadline):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Task.objects.create(
+                title="Due soon",
+                priority="medium",
+                assigned_to=self.user,
+                created_by=self.user,
+                estimated_hours=1,
+                deadline=deadline,
+            )
+
+    def test_due_task_is_warned_and_escalated_once(self):
+        task = self.create_task(timezone.now() + timedelta(minutes=30))
+
+        self.assertEqual(process_due_events(time.time() + 1), (1, 1))
+        self.assertEqual(process_due_events(time.time() + 1), (0, 0))
+
+        task.refresh_from_db()
+        self.assertEqual(task.priority, "high")
+        self.assertTrue(task.priority_escalated)
+        self.assertEqual(
+            Notification.objects.filter(task=task, notification_type="deadline_warning").count(),
+            1,
+        )
+
+    def test_timers_wait_for_their_fire_time(self):
+        deadline = timezone.now() + timedelta(days=3)
+        self.create_task(deadline)
+
+        self.assertEqual(process_due_events(time.time() + 1), (0, 0))
+
+        # The escalation timer (24 hours ahead) is next, then the warning
+        escalate_at = (deadline - timedelta(hours=24)).timestamp()
+        self.assertAlmostEqual(get_deadline_scheduler().next_fire_time(), escalate_at, places=3)
+
+    def test_completed_task_timers_are_cancelled(self):
+        task = self.create_task(timezone.now() + timedelta(minutes=30))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = "completed"
+            task.save()
+
+        self.assertEqual(process_due_events(time.time() + 1), (0, 0))
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class UnreadCounterTests(TestCase):
+    """
+    Cached unread counters (as with a shared cache) follow creates and
+    reads, rebuild on a miss and are corrected by reconcile.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader", password="x", role=User.Role.DEVELOPER, email_verified=True
+        )
+        # bulk_create: no assignment notification from the signals
+        cls.task = Task.objects.bulk_create([Task(
+            title="Counted",
+            priority="low",
+            assigned_to=cls.user,
+            created_by=cls.user,
+            estimated_hours=1,
+            deadline=timezone.now() + timedelta(days=7),
+        )])[0]
+
+    def setUp(self):
+        self.pushed = []
+        for patcher in (
+            mock.patch.object(counters, "default_cache_is_shared", return_value=True),
+            mock.patch.object(
+                counters, "send_unread_count_to_user",
+                side_effect=lambda user_id, count: self.pushed.append(count),
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for state in (cache, get_ip_security_store(), get_clean_ip_cache()):
+            state.clear()
+            self.addCleanup(state.clear)
+
+        self.key = get_unread_count_key(self.user.pk)
+        self.auth = {
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}",
+        }
+
+    def notify(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.bulk_create([
+                Notification(user=self.user, task=self.task, message=f"n{i}")
+                for i in range(count)
+            ])
+            notifications_created([self.user.pk] * count)
+
+    def post(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, **self.auth)
+
+    def test_create_and_read_adjust_counter(self):
+        self.assertEqual(get_unread_count(self.user.pk), 0)
+
+        self.notify(3)
+        self.assertEqual(cache.get(self.key), 3)
+        self.assertEqual(self.pushed, [3])
+
+        notification = Notification.objects.filter(user=self.user).first()
+        self.post(f"/api/notifications/{notification.pk}/mark_read/")
+        # Reading it again doesn't count twice
+        self.post(f"/api/notifications/{notification.pk}/mark_read/")
+        self.assertEqual(cache.get(self.key), 2)
+
+        self.post("/api/notifications/mark_all_read/")
+        self.assertEqual(cache.get(self.key), 0)
+        self.assertEqual(self.pushed, [3, 2, 0])
+
+        response = self.client.get("/api/notifications/unread_count/", **self.auth)
+        self.assertEqual(response.json(), {"count": 0})
+
+    def test_counter_rebuilt_on_cache_miss(self):
+        self.notify(2)
+        cache.delete(self.key)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_unread_count(self.user.pk), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user.pk), 2)
+
+        # An adjustment of an evicted key counts again instead of going negative
+        cache.delete(self.key)
+        self.notify(1)
+        self.assertEqual(cache.get(self.key), 3)
+
+    def test_reconcile_corrects_drift(self):
+        self.notify(2)
+        cache.set(self.key, 7)
+        self.pushed.clear()
+
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(cache.get(self.key), 2)
+        self.assertEqual(self.pushed, [2])
+
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+    def test_per_process_cache_counts_in_database(self):
+        self.notify(2)
+        cache.set(self.key, 7)
+
+        with mock.patch.object(counters, "default_cache_is_shared", return_value=False):
+            self.assertEqual(get_unread_count(self.user.pk), 2)
+            self.assertEqual(reconcile_unread_counts(), 0)
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOW=60)
+class CoalesceNotificationTests(TestCase):
+    """
+    Repeated events for a (user, task, type) within the window update the
+    pending undelivered row instead of adding (and pushing) new ones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="dragger", password="x")
+        cls.task = Task.objects.bulk_create([Task(
+            title="Dragged",
+            status="pending",
+            priority="low",
+            assigned_to=cls.user,
+            created_by=cls.user,
+            estimated_hours=1,
+            deadline=timezone.now() + timedelta(days=7),
+        )])[0]
+
+    def setUp(self):
+        get_deadline_scheduler().clear()
+        self.addCleanup(get_deadline_scheduler().clear)
+
+    def coalesce(self, message="Task 'Dragged' status changed", notification_type="status_change"):
+        return create_or_coalesce_notification(self.user, self.task, notification_type, message)
+
+    def test_events_in_window_update_one_row(self):
+        first, created = self.coalesce("status changed to In Progress")
+        self.assertTrue(created)
+        self.assertEqual(first.update_count, 1)
+
+        self.coalesce("status changed to Blocked")
+        notification, created = self.coalesce("status changed to Completed")
+
+        self.assertFalse(created)
+        self.assertEqual(notification.pk, first.pk)
+        first.refresh_from_db()
+        self.assertEqual(first.update_count, 3)
+        self.assertEqual(first.message, "status changed to Completed (3 updates)")
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_event_after_window_creates_row(self):
+        first, _ = self.coalesce()
+        Notification.objects.filter(pk=first.pk).update(
+            created_at=timezone.now() - timedelta(seconds=61)
+        )
+
+        _, created = self.coalesce()
+
+        self.assertTrue(created)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_delivered_read_or_other_type_not_coalesced(self):
+        delivered, _ = self.coalesce()
+        Notification.objects.filter(pk=delivered.pk).update(is_delivered=True)
+        read, created = self.coalesce()
+        self.assertTrue(created)
+
+        Notification.objects.filter(pk=read.pk).update(read=True)
+        self.assertTrue(self.coalesce()[1])
+        self.assertTrue(self.coalesce(notification_type="task_assigned")[1])
+
+        self.assertEqual(Notification.objects.count(), 4)
+
+    @override_settings(NOTIFICATION_COALESCE_WINDOW=0)
+    def test_window_zero_disables_coalescing(self):
+        self.assertTrue(self.coalesce()[1])
+        self.assertTrue(self.coalesce()[1])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_coalesced_status_change_is_not_pushed_or_counted(self):
+        pushed = []
+        counted = []
+        for patcher in (
+            mock.patch.object(
+                signals, "send_notification_to_user",
+                side_effect=lambda user_id, notification: pushed.append(notification.pk),
+            ),
+            mock.patch.object(signals, "notifications_created", side_effect=counted.append),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for status in ("in_progress", "blocked", "completed"):
+            self.task.status = status
+            self.task.save()
+
+        notification = Notification.objects.get(task=self.task)
+        self.assertEqual(notification.update_count, 3)
+        self.assertEqual(pushed, [notification.pk])
+        self.assertEqual(counted, [[self.user.pk]])
+
+
+class DeadlineWarningTests(TestCase):
+    """
+    Active tasks due within the hour are warned once per 2 hours, with one
+    INSERT and one batched push.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+
+        def task(title, minutes, status="pending", user=cls.alice):
+            return Task(
+                title=title,
+                status=status,
+                priority="medium",
+                assigned_to=user,
+                created_by=user,
+                estimated_hours=1,
+                deadline=cls.now + timedelta(minutes=minutes),
+            )
+
+        cls.tasks = {
+            task.title: task
+            for task in Task.objects.bulk_create([
+                task("due", 30),
+                task("due_bob", 50, status="in_progress", user=cls.bob),
+                task("blocked", 10, status="blocked"),
+                task("completed", 30, status="completed"),
+                task("later", 90),
+                task("overdue", -5),
+                task("warned", 20),
+                task("warned_long_ago", 40),
+            ])
+        }
+
+        def warning(title, hours_ago):
+            notification = Notification.objects.create(
+                user=cls.alice,
+                task=cls.tasks[title],
+                message="warned",
+                notification_type="deadline_warning",
+            )
+            Notification.objects.filter(pk=notification.pk).update(
+                created_at=cls.now - timedelta(hours=hours_ago)
+            )
+
+        warning("warned", 1)
+        warning("warned_long_ago", 3)
+        # Other notification types don't count as a warning
+        Notification.objects.create(
+            user=cls.alice, task=cls.tasks["due"], message="assigned",
+            notification_type="task_assigned",
+        )
+
+    def setUp(self):
+        self.pushed = []
+        self.counted = []
+        for patcher in (
+            mock.patch.object(signals, "send_notifications_to_users", side_effect=self.pushed.append),
+            mock.patch.object(services, "notifications_created", side_effect=self.counted.append),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def titles(self, tasks):
+        return sorted(task.title for task in tasks)
+
+    def test_candidates(self):
+        self.assertEqual(
+            self.titles(deadline_warning_candidates(self.now)),
+            ["blocked", "due", "due_bob", "warned_long_ago"],
+        )
+
+    def test_warnings_are_batched_and_counted(self):
+        with CaptureQueriesContext(connection) as queries:
+            warnings = send_deadline_warnings(now=self.now)
+
+        self.assertEqual(len(warnings), 4)
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(len(self.pushed), 1)
+        self.assertEqual(self.pushed[0], warnings)
+        self.assertEqual(sorted(self.counted[0]), sorted([self.alice.pk] * 3 + [self.bob.pk]))
+
+        warning = Notification.objects.get(
+            task=self.tasks["due"], notification_type="deadline_warning"
+        )
+        self.assertEqual(warning.user, self.alice)
+        self.assertIn("deadline approaching in 30 minutes", warning.message)
+
+    def test_warned_tasks_are_skipped(self):
+        send_deadline_warnings(now=self.now)
+        self.assertEqual(send_deadline_warnings(now=self.now + timedelta(minutes=5)), [])
+        self.assertEqual(self.pushed[1], [])
+
+    def test_restricted_to_task_ids(self):
+        warnings = send_deadline_warnings(
+            task_ids=[self.tasks["due"].id, self.tasks["later"].id], now=self.now
+        )
+        self.assertEqual([warning.task_id for warning in warnings], [self.tasks["due"].id])
+
+
+class PurgeReadNotificationsTests(TestCase):
+    """
+    Only read notifications older than the cutoff go, in id-range batches
+    with a pause between them.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="purged", password="x")
+        task = Task.objects.bulk_create([Task(
+            title="Old",
+            priority="low",
+            assigned_to=user,
+            created_by=user,
+            estimated_hours=1,
+            deadline=timezone.now() + timedelta(days=7),
+        )])[0]
+
+        cls.cutoff = timezone.now() - timedelta(days=30)
+        old = cls.cutoff - timedelta(days=1)
+
+        # Rows to keep sit between the expired ones, inside the id ranges
+        kept = []
+        cls.expired = []
+        for i in range(7):
+            for read, created_at, bucket in (
+                (True, old, cls.expired),
+                (False, old, kept),
+                (True, cls.cutoff + timedelta(days=1), kept),
+            ):
+                notification = Notification.objects.create(
+                    user=user, task=task, message=f"n{i}", read=read
+                )
+                bucket.append(notification.pk)
+                Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        cls.kept = kept
+
+    def setUp(self):
+        self.sleeps = []
+        patcher = mock.patch.object(services.time, "sleep", side_effect=self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_deletes_expired_read_rows_in_batches(self):
+        batches = []
+        deleted = purge_read_notifications(
+            self.cutoff,
+            batch_size=3,
+            sleep_seconds=0.25,
+            on_batch=lambda number, rows, seconds: batches.append((number, rows)),
+        )
+
+        self.assertEqual(deleted, 7)
+        self.assertEqual(batches, [(1, 3), (2, 3), (3, 1)])
+        self.assertEqual(self.sleeps, [0.25, 0.25])
+        self.assertEqual(
+            sorted(Notification.objects.values_list("pk", flat=True)), sorted(self.kept)
+        )
+
+    def test_batches_follow_id_ranges(self):
+        with CaptureQueriesContext(connection) as queries:
+            purge_read_notifications(self.cutoff, batch_size=3)
+
+        deletes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 3)
+        for sql, (low, high) in zip(deletes, [
+            (0, self.expired[2]),
+            (self.expired[2], self.expired[5]),
+            (self.expired[5], self.expired[6]),
+        ]):
+            self.assertIn(f'"id" > {low}', sql)
+            self.assertIn(f'"id" <= {high}', sql)
+
+    def test_dry_run_only_counts(self):
+        batches = []
+        self.assertEqual(
+            purge_read_notifications(self.cutoff, dry_run=True, on_batch=batches.append),
+            7,
+        )
+        self.assertEqual(batches, [])
+        self.assertEqual(Notification.objects.count(), 21)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("cleanup_notifications", "--dry-run", stdout=out)
+        self.assertIn("Would delete 7 old notifications.", out.getvalue())
+
+        call_command("cleanup_notifications", "--batch-size", "5", stdout=out)
+        self.assertIn("Batch 2: deleted 2 rows", out.getvalue())
+        self.assertEqual(Notification.objects.count(), 14)
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Notification
 from .serializers import NotificationSerializer
+from .counters import get_unread_count, notifications_read
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -28,8 +29,12 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_read(self, request, pk=None):
         """Mark a specific notification as read."""
         notification = self.get_object()
-        notification.read = True
-        notification.save()
+        # Conditional UPDATE so concurrent reads decrement the counter once
+        updated = Notification.objects.filter(
+            pk=notification.pk,
+            read=False
+        ).update(read=True)
+        notifications_read(request.user.id, updated)
         return Response({'status': 'notification marked as read'})
     
     @action(detail=False, methods=['post'])
@@ -39,16 +44,18 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             user=request.user,
             read=False
         ).update(read=True)
+        notifications_read(request.user.id, updated)
         return Response({'status': f'{updated} notifications marked as read'})
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Get count of unread notifications."""
-        count = Notification.objects.filter(
-            user=request.user,
-            read=False
-        ).count()
-        return Response({'count': count})
+        """
+        Get count of unread notifications.
+
+        Served from the maintained per-user counter; connected clients also
+        receive every change as an ``unread_count`` WebSocket event.
+        """
+        return Response({'count': get_unread_count(request.user.id)})
 
 
 # Create your views here.
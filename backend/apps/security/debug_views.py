@@ -1,6 +1,4 @@
-import time
 from django.conf import settings
-from django.core.cache import cache
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -8,7 +6,9 @@ from rest_framework.permissions import IsAuthenticated
 from apps.security.middleware.smart_rate_limit import (
     RATE_LIMITS,
     WINDOW_SECONDS,
+    get_rate_key,
 )
+from apps.security.ratelimit import get_rate_limiter
 
 
 class DebugRateLimitViewSet(viewsets.ModelViewSet):
@@ -28,8 +28,6 @@ class DebugRateLimitViewSet(viewsets.ModelViewSet):
         user = request.user
         role = user.role
 
-        current_window = int(time.time() // WINDOW_SECONDS)
-
         data = {
             "user_id": user.id,
             "role": role,
@@ -38,8 +36,20 @@ class DebugRateLimitViewSet(viewsets.ModelViewSet):
             "current_usage": {},
         }
 
+        limits = RATE_LIMITS.get(role) or {}
         for action in ("read", "write"):
-            key = f"rate:{user.id}:{role}:{action}:{current_window}"
-            data["current_usage"][action] = cache.get(key, 0)
+            limit = limits.get(action)
+            if not limit:
+                continue
+
+            # peek: reads the state without taking another unit
+            result = get_rate_limiter().peek(
+                get_rate_key(user.id, role, action), limit, WINDOW_SECONDS
+            )
+            data["current_usage"][action] = {
+                "used": limit - result.remaining,
+                "remaining": result.remaining,
+                "reset_in": round(result.reset_after),
+            }
 
         return Response(data, status=status.HTTP_200_OK)
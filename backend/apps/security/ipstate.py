@@ -0,0 +1,287 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+"""
+Per-IP security state of IPSecurityMiddleware, one record per IP:
+
+    fails           failed auth responses in the current window
+    fail_until      end of that window (every failure restarts it)
+    blocked_until   end of the block (0 when not blocked)
+    answer          captcha answer that lifts the block
+    question        captcha shown to the blocked client
+
+get() reads the whole record in one round trip. record_failure() and
+unblock() each update it in one atomic step, so concurrent failures are
+all counted and an old captcha answer can't lift a newer block:
+
+- RedisIPSecurityStore: one hash per IP, one Lua script per call, clock
+  from Redis TIME, used when IP_SECURITY_REDIS_URL is set
+- InMemoryIPSecurityStore: per-process stand-in for local dev and tests
+
+CleanIPCache remembers IPs just seen unblocked, so their requests skip the
+store for IP_SECURITY_CLEAN_TTL seconds (a new block reaches other workers
+within that delay).
+"""
+
+
+class IPState:
+    __slots__ = ("fails", "blocked_for", "question")
+
+    def __init__(self, fails=0, blocked_for=0.0, question=None):
+        self.fails = fails
+        # Seconds left of the block (0 when not blocked)
+        self.blocked_for = blocked_for
+        self.question = question
+
+    @property
+    def blocked(self):
+        return self.blocked_for > 0
+
+    def __repr__(self):
+        return (
+            f"IPState(fails={self.fails}, blocked_for={self.blocked_for:.3f}, "
+            f"question={self.question!r})"
+        )
+
+
+class InMemoryIPSecurityStore:
+    """
+    Dict of IP → [fails, fail_until, blocked_until, answer, question]
+    behind a lock. Expired records are swept once the dict grows past
+    ``max_ips``.
+    """
+
+    def __init__(self, max_ips=10000):
+        self.max_ips = max_ips
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def get(self, ip):
+        with self._lock:
+            return self._state(self._records.get(ip), time.time())
+
+    def record_failure(self, ip, max_failures, window, block_duration, captcha):
+        """
+        Count one failure; the ``max_failures``-th within ``window`` seconds
+        blocks the IP for ``block_duration`` with ``captcha``.
+        """
+        with self._lock:
+            now = time.time()
+            record = self._records.get(ip)
+            if record is None:
+                record = self._records[ip] = [0, 0.0, 0.0, None, None]
+
+            if record[1] <= now:
+                record[0] = 0
+            record[0] += 1
+            record[1] = now + window
+
+            if record[0] >= max_failures:
+                record[2] = now + block_duration
+                record[3] = captcha["answer"]
+                record[4] = captcha["question"]
+
+            if len(self._records) > self.max_ips:
+                self._sweep(now)
+
+            return self._state(record, now)
+
+    def unblock(self, ip, answer):
+        """
+        Lift the block if ``answer`` solves its captcha. True when the IP
+        is no longer blocked.
+        """
+        with self._lock:
+            record = self._records.get(ip)
+            if record is None or record[2] <= time.time():
+                return True
+            if answer is None or answer != record[3]:
+                return False
+            record[2:] = [0.0, None, None]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def _state(self, record, now):
+        if record is None:
+            return IPState()
+        fails = record[0] if record[1] > now else 0
+        if record[2] > now:
+            return IPState(fails, record[2] - now, record[4])
+        return IPState(fails)
+
+    def _sweep(self, now):
+        for ip in [ip for ip, record in self._records.items() if max(record[1], record[2]) <= now]:
+            del self._records[ip]
+
+
+class RedisIPSecurityStore:
+    """
+    Shared store: a hash per IP (fields f, fu, bu, a, q; times in ms) that
+    expires once both its failure window and its block are over.
+    """
+
+    KEY = "ipsec:{}"
+
+    # Returns {fails, blocked_for (ms), question}
+    GET_SCRIPT = """
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+        local record = redis.call('HMGET', KEYS[1], 'f', 'fu', 'bu', 'q')
+        local fails = tonumber(record[1]) or 0
+        if (tonumber(record[2]) or 0) <= now then fails = 0 end
+
+        local blocked_until = tonumber(record[3]) or 0
+        if blocked_until <= now then return {fails, 0, false} end
+        return {fails, blocked_until - now, record[4]}
+    """
+
+    # ARGV: max_failures, window (ms), block_duration (ms), answer, question
+    # Returns {fails, blocked_for (ms), question}
+    FAILURE_SCRIPT = """
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+        local record = redis.call('HMGET', KEYS[1], 'f', 'fu', 'bu', 'q')
+        local fails = tonumber(record[1]) or 0
+        if (tonumber(record[2]) or 0) <= now then fails = 0 end
+        fails = fails + 1
+
+        local fail_until = now + tonumber(ARGV[2])
+        local blocked_until = tonumber(record[3]) or 0
+        local question = record[4]
+        redis.call('HSET', KEYS[1], 'f', fails, 'fu', fail_until)
+
+        if fails >= tonumber(ARGV[1]) then
+            blocked_until = now + tonumber(ARGV[3])
+            question = ARGV[5]
+            redis.call('HSET', KEYS[1], 'bu', blocked_until, 'a', ARGV[4], 'q', question)
+        end
+
+        redis.call('PEXPIRE', KEYS[1], math.max(fail_until, blocked_until) - now)
+
+        if blocked_until <= now then return {fails, 0, false} end
+        return {fails, blocked_until - now, question}
+    """
+
+    # ARGV: answer. Returns 1 when the IP is no longer blocked
+    UNBLOCK_SCRIPT = """
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+        local record = redis.call('HMGET', KEYS[1], 'bu', 'a')
+        if (tonumber(record[1]) or 0) <= now then return 1 end
+        if record[2] ~= ARGV[1] then return 0 end
+
+        redis.call('HSET', KEYS[1], 'bu', 0)
+        redis.call('HDEL', KEYS[1], 'a', 'q')
+        return 1
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._get = self._redis.register_script(self.GET_SCRIPT)
+        self._failure = self._redis.register_script(self.FAILURE_SCRIPT)
+        self._unblock = self._redis.register_script(self.UNBLOCK_SCRIPT)
+
+    def get(self, ip):
+        return self._state(self._get(keys=[self.KEY.format(ip)]))
+
+    def record_failure(self, ip, max_failures, window, block_duration, captcha):
+        return self._state(self._failure(
+            keys=[self.KEY.format(ip)],
+            args=[
+                max_failures,
+                int(window * 1000),
+                int(block_duration * 1000),
+                captcha["answer"],
+                captcha["question"],
+            ],
+        ))
+
+    def unblock(self, ip, answer):
+        if answer is None:
+            return not self.get(ip).blocked
+        return bool(self._unblock(keys=[self.KEY.format(ip)], args=[answer]))
+
+    def _state(self, reply):
+        fails, blocked_for, question = reply
+        if question is not None:
+            question = question.decode()
+        return IPState(fails, blocked_for / 1000, question)
+
+
+class CleanIPCache:
+    """
+    Thread-safe LRU of IP → time until which it is known to be unblocked.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_clean(self, ip):
+        with self._lock:
+            expires_at = self._entries.get(ip)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[ip]
+                return False
+            return True
+
+    def mark_clean(self, ip):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[ip] = time.monotonic() + self.ttl
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, ip):
+        with self._lock:
+            self._entries.pop(ip, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_store = None
+_clean_ips = None
+_lock = threading.Lock()
+
+
+def get_ip_security_store():
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                url = settings.IP_SECURITY_REDIS_URL
+                _store = RedisIPSecurityStore(url) if url else InMemoryIPSecurityStore()
+    return _store
+
+
+def get_clean_ip_cache():
+    global _clean_ips
+
+    if _clean_ips is None:
+        with _lock:
+            if _clean_ips is None:
+                _clean_ips = CleanIPCache(
+                    settings.IP_SECURITY_CLEAN_CACHE_SIZE,
+                    settings.IP_SECURITY_CLEAN_TTL,
+                )
+    return _clean_ips
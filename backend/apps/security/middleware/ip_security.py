@@ -1,7 +1,8 @@
 from django.conf import settings
-from django.core.cache import cache
 from django.http import JsonResponse
 
+from apps.security.ipstate import get_clean_ip_cache, get_ip_security_store
+
 
 FAILED_WINDOW = 10 * 60        # 10 minutes
 BLOCK_DURATION = 60 * 60       # 1 hour
@@ -54,27 +55,28 @@ class IPSecurityMiddleware:
 
         # -------------------------------------------------
         # 4️⃣ IP BLOCK CHECK
+        # (IPs recently seen unblocked skip the store)
         # -------------------------------------------------
-        block_key = f"ip-blocked:{ip}"
-        captcha_key = f"captcha:{ip}"
-
-        if cache.get(block_key):
-            expected_answer = cache.get(captcha_key)
-            provided_answer = request.headers.get("X-Captcha-Answer")
-
-            if not provided_answer or provided_answer != expected_answer:
-                return JsonResponse(
-                    {
-                        "detail": "IP blocked. Solve CAPTCHA.",
-                        "captcha": cache.get(f"captcha-question:{ip}"),
-                    },
-                    status=403,
-                )
-
-            # CAPTCHA solved → unblock
-            cache.delete(block_key)
-            cache.delete(captcha_key)
-            cache.delete(f"captcha-question:{ip}")
+        clean_ips = get_clean_ip_cache()
+
+        if not clean_ips.is_clean(ip):
+            store = get_ip_security_store()
+            state = store.get(ip)
+
+            if state.blocked:
+                provided_answer = request.headers.get("X-Captcha-Answer")
+
+                # CAPTCHA solved → unblock (compared and lifted atomically)
+                if not store.unblock(ip, provided_answer):
+                    return JsonResponse(
+                        {
+                            "detail": "IP blocked. Solve CAPTCHA.",
+                            "captcha": state.question,
+                        },
+                        status=403,
+                    )
+
+            clean_ips.mark_clean(ip)
 
         # -------------------------------------------------
         # 5️⃣ Continue request
@@ -94,23 +96,17 @@ class IPSecurityMiddleware:
     # -----------------------------------------------------
 
     def track_failure(self, ip):
-        fail_key = f"fail:{ip}"
-        count = cache.get(fail_key, 0) + 1
-        cache.set(fail_key, count, FAILED_WINDOW)
-
-        if count >= MAX_FAILURES:
-            self.block_ip(ip)
-
-    def block_ip(self, ip):
-        captcha = self.create_captcha()
-        cache.set(f"ip-blocked:{ip}", True, BLOCK_DURATION)
-        cache.set(f"captcha:{ip}", captcha["answer"], BLOCK_DURATION)
-        cache.set(
-            f"captcha-question:{ip}",
-            captcha["question"],
-            BLOCK_DURATION,
+        state = get_ip_security_store().record_failure(
+            ip,
+            max_failures=MAX_FAILURES,
+            window=FAILED_WINDOW,
+            block_duration=BLOCK_DURATION,
+            captcha=self.create_captcha(),
         )
 
+        if state.blocked:
+            get_clean_ip_cache().discard(ip)
+
     def create_captcha(self):
         from apps.security.utils import generate_captcha
         return generate_captcha()
@@ -1,15 +1,18 @@
-import time
+import math
 
-from django.core.cache import cache
 from django.http import JsonResponse
 
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from apps.security.ratelimit import get_rate_limiter
+from apps.users.authentication import get_auth_context
+
 
 READ_METHODS = ("GET", "HEAD", "OPTIONS")
 WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
 
+# Requests per WINDOW_SECONDS, enforced as a GCRA limit (apps.security.ratelimit):
+# the full budget can be used in a burst and then refills continuously
 RATE_LIMITS = {
     "developer": {"read": 100, "write": 20},
     "manager": {"read": 200, "write": 50},
@@ -19,26 +22,17 @@ RATE_LIMITS = {
 WINDOW_SECONDS = 60 * 60  # 1 hour
 
 
-def get_window_key(user_id, role, action):
-    """
-    Generates a rolling window key per user, role, and action.
-    """
-    window = int(time.time() // WINDOW_SECONDS)
-    return f"rate:{user_id}:{role}:{action}:{window}"
-
-
-def increment_counter(key):
+def get_rate_key(user_id, role, action):
     """
-    Increment request counter with TTL.
+    Limiter key per user, role, and action.
     """
-    if cache.get(key) is None:
-        cache.set(key, 1, WINDOW_SECONDS)
-    else:
-        cache.incr(key)
+    return f"rate:{user_id}:{role}:{action}"
 
 
-def get_counter(key):
-    return cache.get(key, 0)
+def set_rate_limit_headers(response, result):
+    response["X-RateLimit-Limit"] = result.limit
+    response["X-RateLimit-Remaining"] = max(result.remaining, 0)
+    response["X-RateLimit-Reset"] = math.ceil(result.reset_after)
 
 
 class SmartRateLimitMiddleware:
@@ -49,29 +43,30 @@ class SmartRateLimitMiddleware:
     - Developers: 100 READ / 20 WRITE per hour
     - Managers: 200 READ / 50 WRITE per hour
     - Auditors: Unlimited READ, 0 WRITE
-    - ONLY successful responses (<400) are counted
+    - ONLY successful responses (<400) are counted: every request takes
+      one unit up front (one atomic limiter call) and failed ones give it
+      back
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
-        self.jwt_auth = JWTAuthentication()
 
     def __call__(self, request):
         """
         IMPORTANT:
         JWT authentication does NOT populate request.user at middleware level.
-        We must authenticate manually here.
+        We must authenticate manually here (via the request's shared auth
+        context, which DRF reuses instead of decoding the token again).
         """
 
         try:
-            auth_result = self.jwt_auth.authenticate(request)
+            user = get_auth_context(request).get_user()
         except AuthenticationFailed:
             return self.get_response(request)
 
-        if auth_result is None:
+        if user is None:
             return self.get_response(request)
 
-        user, token = auth_result
         request.user = user  # make user available downstream
 
         method = request.method
@@ -98,11 +93,14 @@ class SmartRateLimitMiddleware:
         if limits[action] is None:
             return self.get_response(request)
 
-        key = get_window_key(user.id, role, action)
-        current_count = get_counter(key)
+        limiter = get_rate_limiter()
+        limit = limits[action]
+        key = get_rate_key(user.id, role, action)
+
+        result = limiter.hit(key, limit, WINDOW_SECONDS)
 
         # Rate limit exceeded
-        if current_count >= limits[action]:
+        if not result.allowed:
             response = JsonResponse(
                 {"detail": f"{action.capitalize()} rate limit exceeded."},
                 status=429,
@@ -110,15 +108,18 @@ class SmartRateLimitMiddleware:
 
             # Required by spec
             if action == "write":
-                response["X-Write-Available-In"] = cache.ttl(key) or WINDOW_SECONDS
+                response["X-Write-Available-In"] = math.ceil(result.retry_after)
 
+            response["Retry-After"] = math.ceil(result.retry_after)
+            set_rate_limit_headers(response, result)
             return response
 
         # Allow request to proceed
         response = self.get_response(request)
 
         # Count ONLY successful responses
-        if response.status_code < 400:
-            increment_counter(key)
+        if response.status_code >= 400:
+            result = limiter.refund(key, limit, WINDOW_SECONDS)
 
+        set_rate_limit_headers(response, result)
         return response
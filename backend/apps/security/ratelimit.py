@@ -0,0 +1,481 @@
+import atexit
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+"""
+GCRA rate limiting (generic cell rate algorithm).
+
+A limit of ``limit`` requests per ``period`` seconds spaces requests
+``interval = period / limit`` apart and lets up to ``limit`` of them arrive
+at once. Each key stores a single number, its theoretical arrival time
+(TAT): a request is allowed when TAT - now <= period - interval, and then
+pushes TAT forward by one interval. Unlike fixed windows there is no edge
+where 2× the limit gets through, and the key expires by itself once TAT
+has passed.
+
+Each call is one atomic operation that answers allowed, remaining budget,
+reset time (until the budget is full again) and retry time (until the
+next request is allowed):
+
+- RedisRateLimiter: one Lua script (EVALSHA) per call, clock from Redis
+  TIME, used when RATE_LIMIT_REDIS_URL is set
+- InMemoryRateLimiter: per-process stand-in for local dev and tests
+
+With RATE_LIMIT_LEASE_FRACTION > 0, LeasedRateLimiter sits in front of the
+shared limiter: each worker takes a batch of units at once (take(), a
+partial GCRA hit), admits requests from it in-process, and tops it up or
+hands leftovers back from a background thread, so most requests cost no
+round-trip at all.
+"""
+
+# Absorbs float rounding when counting whole intervals
+EPSILON = 1e-9
+
+
+class RateLimitResult:
+    __slots__ = ("allowed", "limit", "remaining", "reset_after", "retry_after", "granted")
+
+    def __init__(self, allowed, limit, remaining, reset_after, retry_after, granted=0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Seconds until the whole budget is available again
+        self.reset_after = reset_after
+        # Seconds until the next request would be allowed (0 when allowed)
+        self.retry_after = retry_after
+        # Units taken by this call (take() may get fewer than it asked for)
+        self.granted = granted
+
+    def __repr__(self):
+        return (
+            f"RateLimitResult(allowed={self.allowed}, remaining={self.remaining}, "
+            f"reset_after={self.reset_after:.3f}, retry_after={self.retry_after:.3f})"
+        )
+
+
+def gcra(tat, now, interval, period, cost, partial=False):
+    """
+    One GCRA step. ``cost`` is 1 to count a request, 0 to only look and -1
+    to give one back (n / -n for n units at once). With ``partial``, a cost
+    that doesn't fit takes whatever is left instead, if at least one unit.
+    Returns ``(new_tat, allowed, granted, remaining, reset_after,
+    retry_after)``; ``new_tat`` is None when nothing needs storing.
+
+    Kept step for step in sync with RedisRateLimiter.SCRIPT.
+    """
+    tat = max(tat if tat is not None else now, now)
+
+    if partial and cost > 1:
+        available = math.floor((now + period - tat) / interval + EPSILON)
+        if 1 <= available < cost:
+            cost = available
+
+    new_tat = max(now, tat + cost * interval)
+
+    if cost > 0 and new_tat - period > now:
+        remaining = math.floor((now + period - tat) / interval + EPSILON)
+        # Until a single unit fits, whatever was asked for
+        return None, False, 0, remaining, tat - now, tat + interval - period - now
+
+    remaining = math.floor((now + period - new_tat) / interval + EPSILON)
+    return (new_tat if cost else None), True, max(cost, 0), remaining, new_tat - now, 0.0
+
+
+class InMemoryRateLimiter:
+    """
+    Dict of key → TAT behind a lock. Expired keys are swept once the dict
+    grows past ``max_keys``.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._tats = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, period, cost=1, partial=False):
+        if limit <= 0:
+            return RateLimitResult(False, limit, 0, 0.0, float(period))
+
+        interval = period / limit
+        with self._lock:
+            now = time.time()
+            new_tat, allowed, granted, remaining, reset_after, retry_after = gcra(
+                self._tats.get(key), now, interval, period, cost, partial
+            )
+            if new_tat is not None:
+                if new_tat > now:
+                    self._tats[key] = new_tat
+                else:
+                    self._tats.pop(key, None)
+
+                if len(self._tats) > self.max_keys:
+                    self._sweep(now)
+
+        return RateLimitResult(allowed, limit, remaining, reset_after, retry_after, granted)
+
+    def take(self, key, limit, period, count):
+        """
+        Up to ``count`` units at once: ``granted`` says how many.
+        """
+        return self.hit(key, limit, period, cost=count, partial=True)
+
+    def peek(self, key, limit, period):
+        return self.hit(key, limit, period, cost=0)
+
+    def refund(self, key, limit, period, count=1):
+        return self.hit(key, limit, period, cost=-count)
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+    def _sweep(self, now):
+        for key in [key for key, tat in self._tats.items() if tat <= now]:
+            del self._tats[key]
+
+
+class RedisRateLimiter:
+    """
+    Shared limiter: the whole GCRA step runs inside Redis, so concurrent
+    workers can never both take the last unit of budget.
+    """
+
+    # ARGV: interval (ms), period (ms), cost, partial (0/1)
+    # Returns {allowed, granted, remaining, reset_after (ms), retry_after (ms)}
+    SCRIPT = """
+        local interval = tonumber(ARGV[1])
+        local period = tonumber(ARGV[2])
+        local cost = tonumber(ARGV[3])
+        local partial = tonumber(ARGV[4])
+
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+        local tat = tonumber(redis.call('GET', KEYS[1])) or now
+        if tat < now then tat = now end
+
+        if partial == 1 and cost > 1 then
+            local available = math.floor((now + period - tat) / interval + 1e-9)
+            if available >= 1 and available < cost then cost = available end
+        end
+
+        local new_tat = math.max(now, tat + cost * interval)
+
+        if cost > 0 and new_tat - period > now then
+            return {0, 0, math.floor((now + period - tat) / interval + 1e-9),
+                    math.ceil(tat - now), math.ceil(tat + interval - period - now)}
+        end
+
+        if cost ~= 0 then
+            if new_tat > now then
+                redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+            else
+                redis.call('DEL', KEYS[1])
+            end
+        end
+
+        return {1, math.max(cost, 0), math.floor((now + period - new_tat) / interval + 1e-9),
+                math.ceil(new_tat - now), 0}
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    def hit(self, key, limit, period, cost=1, partial=False):
+        if limit <= 0:
+            return RateLimitResult(False, limit, 0, 0.0, float(period))
+
+        period_ms = period * 1000
+        allowed, granted, remaining, reset_after, retry_after = self._script(
+            keys=[key], args=[period_ms / limit, period_ms, cost, int(partial)]
+        )
+        return RateLimitResult(
+            bool(allowed), limit, remaining, reset_after / 1000, retry_after / 1000, granted
+        )
+
+    def take(self, key, limit, period, count):
+        """
+        Up to ``count`` units at once: ``granted`` says how many.
+        """
+        return self.hit(key, limit, period, cost=count, partial=True)
+
+    def peek(self, key, limit, period):
+        return self.hit(key, limit, period, cost=0)
+
+    def refund(self, key, limit, period, count=1):
+        return self.hit(key, limit, period, cost=-count)
+
+
+class _Lease:
+    __slots__ = ("limit", "period", "size", "tokens", "expires_at",
+                 "remaining", "reset_at", "denied_until", "refilling")
+
+    def __init__(self, limit, period, size):
+        self.limit = limit
+        self.period = period
+        self.size = size
+        # Units this worker may still admit on its own
+        self.tokens = 0
+        # Handed back to the shared store once unused until then
+        self.expires_at = 0.0
+        # Shared state as of the last take()
+        self.remaining = 0
+        self.reset_at = 0.0
+        # Shared budget was empty: deny locally until then
+        self.denied_until = 0.0
+        self.refilling = False
+
+
+class LeasedRateLimiter:
+    """
+    Per-process leases of a shared limiter's budget.
+
+    hit() spends a unit of the key's lease under a local lock. Only an
+    empty lease (first request, or spent before its refill arrived) calls
+    the shared limiter during the request. Once a lease is down to half,
+    the sync thread tops it up with one take(); a lease left unused for
+    ``lease_seconds`` is handed back with one refund(count=n).
+
+    Units are counted in the shared store when they are leased, so workers
+    together never admit more than the limit. They may admit less: each
+    worker holds at most one lease (``max(1, limit × lease_fraction)``
+    units) per key, so N workers stay within N × lease_fraction of the
+    limit, and an idle worker's units return after ``lease_seconds``.
+    """
+
+    def __init__(self, shared, lease_fraction, lease_seconds=5.0):
+        self.shared = shared
+        self.lease_fraction = lease_fraction
+        self.lease_seconds = lease_seconds
+
+        self._leases = {}
+        self._refills = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._next_sweep = 0.0
+
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+
+        # Decisions made in-process vs. calls to the shared limiter
+        self.counters = {"local": 0, "shared": 0}
+
+    def lease_size(self, limit):
+        return max(1, int(limit * self.lease_fraction))
+
+    def hit(self, key, limit, period):
+        self._ensure_syncer()
+
+        with self._lock:
+            now = time.time()
+            lease = self._leases.get(key)
+
+            if lease is not None and lease.tokens > 0:
+                lease.tokens -= 1
+                lease.expires_at = now + self.lease_seconds
+                self.counters["local"] += 1
+
+                if lease.tokens <= lease.size // 2 and not lease.refilling:
+                    lease.refilling = True
+                    self._refills.add(key)
+                    self._wakeup.notify()
+
+                return self._result(lease, now, True)
+
+            if lease is not None and lease.denied_until > now:
+                self.counters["local"] += 1
+                return self._result(lease, now, False)
+
+        return self._take(key, limit, period, consume=True)
+
+    def peek(self, key, limit, period):
+        result = self.shared.peek(key, limit, period)
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None:
+                result.remaining += lease.tokens
+        return result
+
+    def refund(self, key, limit, period):
+        with self._lock:
+            now = time.time()
+            lease = self._leases.get(key)
+            if lease is not None:
+                lease.tokens += 1
+                self.counters["local"] += 1
+                return self._result(lease, now, True)
+
+        return self.shared.refund(key, limit, period)
+
+    def close(self, timeout=5.0):
+        """
+        Stop the sync thread and hand every unspent unit back.
+        """
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+        self._return_leases(everything=True)
+
+    def _result(self, lease, now, allowed):
+        return RateLimitResult(
+            allowed,
+            lease.limit,
+            lease.remaining + lease.tokens,
+            max(lease.reset_at - now, 0.0),
+            0.0 if allowed else max(lease.denied_until - now, 0.0),
+        )
+
+    def _take(self, key, limit, period, consume=False):
+        size = self.lease_size(limit)
+        with self._lock:
+            lease = self._leases.get(key)
+            wanted = max(size - (lease.tokens if lease is not None else 0), 1)
+
+        try:
+            result = self.shared.take(key, limit, period, wanted)
+        except Exception:
+            with self._lock:
+                if lease is not None:
+                    lease.refilling = False
+            raise
+
+        with self._lock:
+            now = time.time()
+            self.counters["shared"] += 1
+
+            lease = self._leases.get(key)
+            if lease is None:
+                lease = self._leases[key] = _Lease(limit, period, size)
+
+            lease.tokens += result.granted
+            lease.remaining = result.remaining
+            lease.reset_at = now + result.reset_after
+            lease.expires_at = now + self.lease_seconds
+            lease.denied_until = 0.0 if result.allowed else now + result.retry_after
+            lease.refilling = False
+
+            # A request that found the lease empty takes in parallel with
+            # its background refill: never keep more than one lease
+            excess = max(lease.tokens - lease.size, 0)
+            if excess:
+                lease.tokens -= excess
+                lease.remaining += excess
+                self.counters["shared"] += 1
+
+            outcome = None
+            if consume:
+                allowed = lease.tokens > 0
+                if allowed:
+                    lease.tokens -= 1
+                outcome = self._result(lease, now, allowed)
+
+        if excess:
+            try:
+                self.shared.refund(key, limit, period, count=excess)
+            except Exception as e:
+                print("Rate limit lease return failed:", e)
+
+        return outcome
+
+    def _return_leases(self, everything=False):
+        with self._lock:
+            now = time.time()
+            returned = []
+            for key, lease in list(self._leases.items()):
+                if everything or (lease.expires_at <= now and not lease.refilling):
+                    del self._leases[key]
+                    if lease.tokens > 0:
+                        returned.append((key, lease))
+
+        for key, lease in returned:
+            try:
+                self.shared.refund(key, lease.limit, lease.period, count=lease.tokens)
+            except Exception as e:
+                print("Rate limit lease return failed:", e)
+
+        with self._lock:
+            self.counters["shared"] += len(returned)
+
+    def _ensure_syncer(self):
+        # Also restarts the thread in a worker forked after it was started
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+
+            if self._pid != os.getpid():
+                # Units leased by the parent are the parent's to spend
+                self._leases.clear()
+                self._refills.clear()
+
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="rate-limit-sync", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(
+                    lambda: self._stopping or self._refills,
+                    timeout=self.lease_seconds,
+                )
+                if self._stopping:
+                    return
+
+                refills = [
+                    (key, self._leases[key]) for key in self._refills
+                    if key in self._leases
+                ]
+                self._refills.clear()
+
+            for key, lease in refills:
+                try:
+                    self._take(key, lease.limit, lease.period)
+                except Exception as e:
+                    print("Rate limit lease refill failed:", e)
+
+            if time.time() >= self._next_sweep:
+                self._next_sweep = time.time() + self.lease_seconds
+                self._return_leases()
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                url = settings.RATE_LIMIT_REDIS_URL
+                if not url:
+                    _limiter = InMemoryRateLimiter()
+                elif settings.RATE_LIMIT_LEASE_FRACTION > 0:
+                    _limiter = LeasedRateLimiter(
+                        RedisRateLimiter(url),
+                        lease_fraction=settings.RATE_LIMIT_LEASE_FRACTION,
+                        lease_seconds=settings.RATE_LIMIT_LEASE_SECONDS,
+                    )
+                    atexit.register(_limiter.close)
+                else:
+                    _limiter = RedisRateLimiter(url)
+    return _limiter
@@ -0,0 +1,421 @@
+import threading
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.security import ratelimit
+from apps.security.ipstate import InMemoryIPSecurityStore, get_clean_ip_cache, get_ip_security_store
+from apps.security.middleware.ip_security import MAX_FAILURES
+from apps.security.middleware import smart_rate_limit
+from apps.security.middleware.smart_rate_limit import SmartRateLimitMiddleware
+from apps.security.ratelimit import InMemoryRateLimiter, LeasedRateLimiter, gcra
+from apps.users.models import User
+
+NOW = 1_000_000.0
+
+
+class GCRATests(TestCase):
+    """
+    gcra() and InMemoryRateLimiter: 5 requests per 60 s, one every 12 s.
+    """
+
+    LIMIT = 5
+    PERIOD = 60
+
+    def setUp(self):
+        self.now = NOW
+        patcher = mock.patch.object(ratelimit, "time", mock.Mock(time=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = InMemoryRateLimiter()
+
+    def hit(self, key="k"):
+        return self.limiter.hit(key, self.LIMIT, self.PERIOD)
+
+    def test_burst_up_to_limit_then_denied(self):
+        remaining = [self.hit().remaining for _ in range(self.LIMIT)]
+        self.assertEqual(remaining, [4, 3, 2, 1, 0])
+
+        result = self.hit()
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.remaining, 0)
+        self.assertAlmostEqual(result.retry_after, 12)
+        self.assertAlmostEqual(result.reset_after, 60)
+
+        # One interval later exactly one more request fits
+        self.now += 12
+        self.assertTrue(self.hit().allowed)
+        self.assertFalse(self.hit().allowed)
+
+    def test_keys_are_independent(self):
+        for _ in range(self.LIMIT):
+            self.hit("a")
+
+        self.assertFalse(self.hit("a").allowed)
+        self.assertTrue(self.hit("b").allowed)
+
+    def test_refund_gives_a_unit_back(self):
+        for _ in range(self.LIMIT):
+            self.hit()
+
+        result = self.limiter.refund("k", self.LIMIT, self.PERIOD)
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.remaining, 1)
+        self.assertTrue(self.hit().allowed)
+        self.assertFalse(self.hit().allowed)
+
+    def test_refund_never_exceeds_full_budget(self):
+        self.limiter.refund("k", self.LIMIT, self.PERIOD, count=3)
+
+        self.assertEqual(self.limiter.peek("k", self.LIMIT, self.PERIOD).remaining, self.LIMIT)
+
+    def test_partial_take(self):
+        self.hit()
+        self.hit()
+
+        result = self.limiter.take("k", self.LIMIT, self.PERIOD, 10)
+        self.assertTrue(result.allowed)
+        self.assertEqual(result.granted, 3)
+        self.assertEqual(result.remaining, 0)
+
+        result = self.limiter.take("k", self.LIMIT, self.PERIOD, 10)
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.granted, 0)
+
+    def test_cost_without_partial_is_all_or_nothing(self):
+        new_tat, allowed, granted, remaining, _, _ = gcra(
+            NOW + 12, NOW, 12, self.PERIOD, cost=5
+        )
+        self.assertIsNone(new_tat)
+        self.assertFalse(allowed)
+        self.assertEqual((granted, remaining), (0, 4))
+
+    def test_peek_does_not_consume(self):
+        self.hit()
+
+        for _ in range(3):
+            result = self.limiter.peek("k", self.LIMIT, self.PERIOD)
+            self.assertTrue(result.allowed)
+            self.assertEqual(result.remaining, 4)
+
+        self.assertEqual(self.hit().remaining, 3)
+
+
+class FakeSharedLimiter(InMemoryRateLimiter):
+    """
+    InMemoryRateLimiter standing in for Redis, recording every call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        # Run once inside the next take(), while it is "in flight"
+        self.during_take = None
+
+    def take(self, key, limit, period, count):
+        self.calls.append(("take", count))
+        if self.during_take is not None:
+            during_take, self.during_take = self.during_take, None
+            during_take()
+        return super().take(key, limit, period, count)
+
+    def refund(self, key, limit, period, count=1):
+        self.calls.append(("refund", count))
+        return super().refund(key, limit, period, count)
+
+
+class LeasedRateLimiterTests(TestCase):
+    """
+    Leases of 10 units (10% of 100 per hour) from a fake shared limiter.
+    """
+
+    LIMIT = 100
+    PERIOD = 3600
+
+    def setUp(self):
+        self.now = NOW
+        patcher = mock.patch.object(ratelimit, "time", mock.Mock(time=lambda: self.now))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.shared = FakeSharedLimiter()
+        self.limiter = LeasedRateLimiter(self.shared, lease_fraction=0.1, lease_seconds=5)
+        # Refills and returns are driven by hand, not by the sync thread
+        patcher = mock.patch.object(self.limiter, "_ensure_syncer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def hit(self):
+        return self.limiter.hit("k", self.LIMIT, self.PERIOD)
+
+    def shared_remaining(self):
+        return self.shared.peek("k", self.LIMIT, self.PERIOD).remaining
+
+    def test_requests_are_admitted_from_the_lease(self):
+        results = [self.hit() for _ in range(5)]
+
+        self.assertTrue(all(result.allowed for result in results))
+        self.assertEqual([result.remaining for result in results], [99, 98, 97, 96, 95])
+        self.assertEqual(self.shared.calls, [("take", 10)])
+        self.assertEqual(self.limiter.counters, {"local": 4, "shared": 1})
+        self.assertEqual(self.shared_remaining(), 90)
+
+        # Down to half: queued for the sync thread, topped back up to 10
+        self.assertEqual(self.limiter._refills, {"k"})
+        self.limiter._take("k", self.LIMIT, self.PERIOD)
+        self.assertEqual(self.shared.calls[-1], ("take", 5))
+        self.assertEqual(self.limiter._leases["k"].tokens, 10)
+
+    def test_empty_shared_budget_denies_locally(self):
+        self.limiter = LeasedRateLimiter(self.shared, lease_fraction=0.5)
+        self.limiter._ensure_syncer = mock.Mock()
+
+        for _ in range(2):
+            self.limiter.hit("k", 2, 60)
+        self.limiter._leases["k"].tokens = 0
+
+        result = self.limiter.hit("k", 2, 60)
+        self.assertFalse(result.allowed)
+        self.assertAlmostEqual(result.retry_after, 30)
+
+        calls = len(self.shared.calls)
+        self.assertFalse(self.limiter.hit("k", 2, 60).allowed)
+        self.assertEqual(len(self.shared.calls), calls)
+
+    def test_refill_in_flight_does_not_grow_the_lease(self):
+        for _ in range(10):
+            self.hit()
+        lease = self.limiter._leases["k"]
+        self.assertEqual(lease.tokens, 0)
+        self.assertTrue(lease.refilling)
+
+        # A request finds the lease empty while the refill is in flight
+        results = []
+        self.shared.during_take = lambda: results.append(self.hit())
+        self.limiter._take("k", self.LIMIT, self.PERIOD)
+
+        self.assertTrue(results[0].allowed)
+        self.assertEqual(lease.tokens, 10)
+        self.assertEqual(self.shared.calls[-1], ("refund", 9))
+        # Units counted in the shared store: 11 admitted + 10 leased
+        self.assertEqual(self.shared_remaining(), 100 - 11 - 10)
+
+    def test_idle_lease_is_returned(self):
+        self.hit()
+        self.hit()
+
+        self.now += 4
+        self.limiter._return_leases()
+        self.assertIn("k", self.limiter._leases)
+
+        self.now += 2
+        self.limiter._return_leases()
+        self.assertNotIn("k", self.limiter._leases)
+        self.assertEqual(self.shared.calls[-1], ("refund", 8))
+        self.assertEqual(self.shared_remaining(), 98)
+
+    def test_refund_goes_back_into_the_lease(self):
+        self.hit()
+
+        result = self.limiter.refund("k", self.LIMIT, self.PERIOD)
+        self.assertTrue(result.allowed)
+        self.assertEqual(self.limiter._leases["k"].tokens, 10)
+        self.assertEqual(self.shared.calls, [("take", 10)])
+
+    def test_close_returns_every_lease(self):
+        self.hit()
+        self.limiter.hit("other", self.LIMIT, self.PERIOD)
+
+        self.limiter.close()
+
+        self.assertEqual(self.limiter._leases, {})
+        self.assertEqual(self.shared.calls[-2:], [("refund", 9), ("refund", 9)])
+        self.assertEqual(self.shared_remaining(), 99)
+
+
+class LeasedRateLimiterForkTests(TestCase):
+    """
+    A worker forked after the sync thread started drops the parent's
+    leases and starts its own thread.
+    """
+
+    def test_forked_worker_drops_parent_leases(self):
+        shared = FakeSharedLimiter()
+        limiter = LeasedRateLimiter(shared, lease_fraction=0.1, lease_seconds=5)
+        self.addCleanup(limiter.close)
+
+        limiter.hit("k", 100, 3600)
+        parent_thread = limiter._thread
+        self.assertTrue(parent_thread.is_alive())
+        self.assertIn("k", limiter._leases)
+
+        with mock.patch.object(ratelimit.os, "getpid", return_value=limiter._pid + 1):
+            limiter.hit("other", 100, 3600)
+
+            self.assertNotIn("k", limiter._leases)
+            self.assertIn("other", limiter._leases)
+            self.assertIsNot(limiter._thread, parent_thread)
+            self.assertEqual(limiter._pid, ratelimit.os.getpid())
+
+        # The parent's units stay taken: only the parent may return them
+        self.assertEqual(shared.calls, [("take", 10), ("take", 10)])
+
+
+class SmartRateLimitMiddlewareTests(TestCase):
+    """
+    Headers of allowed and denied requests; failed responses don't count.
+    """
+
+    LIMITS = {"developer": {"read": 3, "write": 2}}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="dev",
+            password="x",
+            role=User.Role.DEVELOPER,
+            email_verified=True,
+        )
+
+    def setUp(self):
+        self.limiter = InMemoryRateLimiter()
+        for patcher in (
+            mock.patch.object(ratelimit, "time", mock.Mock(time=lambda: NOW)),
+            mock.patch.object(smart_rate_limit, "get_rate_limiter", lambda: self.limiter),
+            mock.patch.dict(smart_rate_limit.RATE_LIMITS, self.LIMITS),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.factory = RequestFactory()
+        self.token = str(AccessToken.for_user(self.user))
+        self.status = 200
+        self.middleware = SmartRateLimitMiddleware(lambda request: HttpResponse(status=self.status))
+
+    def request(self, method="get"):
+        request = getattr(self.factory, method)("/api/tasks/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return self.middleware(request)
+
+    def test_headers_on_allowed_requests(self):
+        response = self.request()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-RateLimit-Limit"], "3")
+        self.assertEqual(response["X-RateLimit-Remaining"], "2")
+        self.assertEqual(response["X-RateLimit-Reset"], "1200")
+
+    def test_read_limit_returns_429(self):
+        for _ in range(3):
+            self.request()
+
+        response = self.request()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1200")
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        self.assertNotIn("X-Write-Available-In", response)
+
+    def test_write_limit_reports_when_writes_are_available(self):
+        for _ in range(2):
+            self.assertEqual(self.request("post").status_code, 200)
+
+        response = self.request("post")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["X-Write-Available-In"], "1800")
+        self.assertEqual(response["Retry-After"], "1800")
+
+        # Reads have their own budget
+        self.assertEqual(self.request().status_code, 200)
+
+    def test_failed_responses_are_refunded(self):
+        self.status = 400
+        for _ in range(5):
+            response = self.request("post")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response["X-RateLimit-Remaining"], "2")
+
+        self.status = 201
+        self.assertEqual(self.request("post").status_code, 201)
+        self.assertEqual(self.request("post").status_code, 201)
+        self.assertEqual(self.request("post").status_code, 429)
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class IPSecurityTests(TestCase):
+    """
+    IPSecurityMiddleware: one atomic record per IP, no store call for
+    known-clean IPs.
+    """
+
+    LOGIN_URL = "/api/auth/login/"
+
+    def setUp(self):
+        for state in (get_ip_security_store(), get_clean_ip_cache()):
+            state.clear()
+            self.addCleanup(state.clear)
+
+    def fail_login(self, **headers):
+        return self.client.post(
+            self.LOGIN_URL,
+            {"username": "nobody", "password": "wrong"},
+            content_type="application/json",
+            HTTP_HOST="localhost",
+            **headers,
+        )
+
+    def test_failures_block_until_captcha_solved(self):
+        for _ in range(MAX_FAILURES):
+            self.assertEqual(self.fail_login().status_code, 400)
+
+        response = self.fail_login()
+        self.assertEqual(response.status_code, 403)
+        question = response.json()["captcha"]
+
+        a, b = (int(part) for part in question.split(" + "))
+        self.assertEqual(self.fail_login(HTTP_X_CAPTCHA_ANSWER=str(a + b + 1)).status_code, 403)
+        self.assertEqual(self.fail_login(HTTP_X_CAPTCHA_ANSWER=str(a + b)).status_code, 400)
+
+    def test_clean_ip_skips_store(self):
+        self.client.get("/api/notifications/", HTTP_HOST="localhost")
+
+        with mock.patch.object(get_ip_security_store(), "get") as get:
+            self.client.get("/api/notifications/", HTTP_HOST="localhost")
+
+        get.assert_not_called()
+
+
+class InMemoryIPSecurityStoreTests(TestCase):
+    """
+    record_failure() counts every concurrent failure exactly once.
+    """
+
+    THREADS = 8
+    FAILURES = 250
+
+    def test_concurrent_failures_are_all_counted(self):
+        store = InMemoryIPSecurityStore()
+        total = self.THREADS * self.FAILURES
+        captcha = {"question": "1 + 1", "answer": "2"}
+        start = threading.Barrier(self.THREADS)
+        blocked_at = []
+
+        def fail():
+            start.wait()
+            for _ in range(self.FAILURES):
+                state = store.record_failure("10.0.0.1", total, 60, 60, captcha)
+                if state.blocked:
+                    blocked_at.append(state.fails)
+
+        threads = [threading.Thread(target=fail) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        state = store.get("10.0.0.1")
+        self.assertEqual(state.fails, total)
+        self.assertTrue(state.blocked)
+        # Only the last failure reached the limit
+        self.assertEqual(blocked_at, [total])
@@ -1,11 +1,10 @@
-from datetime import timedelta
 from django.conf import settings
 from django.utils.timezone import now
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .models import Task
+from .services_escalation import escalation_candidates
 
 
 class DebugPriorityEscalationView(APIView):
@@ -15,12 +14,7 @@ class DebugPriorityEscalationView(APIView):
         if not settings.DEBUG:
             return Response({"detail": "Not found."}, status=404)
 
-        cutoff = now() + timedelta(hours=24)
-
-        tasks = Task.objects.filter(
-            deadline__lte=cutoff,
-            priority_escalated=False,
-        ).exclude(status="completed")
+        tasks = escalation_candidates()
 
         result = []
 
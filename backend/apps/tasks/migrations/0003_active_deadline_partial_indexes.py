@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_tasks_task_deadlin_ab25e9_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_deadlin_ab25e9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'in_progress', 'blocked'))), fields=['deadline'], name='task_active_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('priority_escalated', False), ('status__in', ('pending', 'in_progress', 'blocked'))), fields=['deadline'], name='task_escalation_due_idx'),
+        ),
+    ]
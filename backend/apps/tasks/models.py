@@ -38,8 +38,24 @@ class Task(models.Model):
     )
 
     class Meta:
+        # Deadline queries only ever look at active tasks, so completed
+        # tasks (the bulk of the table) are kept out of these indexes.
         indexes = [
-            models.Index(fields=["deadline", "priority_escalated", "status"]),
+            # Deadline warnings, "overdue" admin filter
+            models.Index(
+                fields=["deadline"],
+                name="task_active_deadline_idx",
+                condition=models.Q(status__in=("pending", "in_progress", "blocked")),
+            ),
+            # Priority escalation, DebugPriorityEscalationView
+            models.Index(
+                fields=["deadline"],
+                name="task_escalation_due_idx",
+                condition=models.Q(
+                    status__in=("pending", "in_progress", "blocked"),
+                    priority_escalated=False,
+                ),
+            ),
         ]
 
     title = models.CharField(max_length=255)
@@ -1,6 +1,6 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from django.utils import timezone
-import pytz
+
+from .policy import can_modify_task, is_working_time
 
 class TaskAccessPermission(BasePermission):
     """
@@ -15,38 +15,12 @@ class TaskAccessPermission(BasePermission):
             return True
 
         #Now this covers all requests other than safe method
-
-        # Auditors can never WRITE
-        if user.is_auditor():
-            return False
-
-        # Managers have no restrictions
-        if user.is_manager():
-            return True
-
-        # Developers logic
-        if user.is_developer():
-            # Critical tasks can be updated anytime
-            if obj.priority == "critical":
-                return True
-
-            # Time-based restriction
-            user_tz = pytz.timezone(user.timezone)  #Converts the user’s timezone string (e.g. "Asia/Kolkata") Into a timezone object
-            now_local = timezone.now().astimezone(user_tz)
-            """
-            timezone.now() → current UTC time
-            .astimezone(user_tz) → converts to user’s local time
-            
-            Now you know:
-                “What time is it for THIS user?”
-            """
-
-            start_hour = 9
-            end_hour = 18
-
-            return start_hour <= now_local.hour < end_hour
-
-        return False #deny by default
+        """
+        Auditors can never WRITE, managers have no restrictions, developers
+        can update their own tasks: critical ones anytime and others only
+        during working hours in their timezone (see apps.tasks.policy)
+        """
+        return can_modify_task(user, obj)
 
 class TaskCreatePermission(BasePermission):
     """
@@ -68,15 +42,9 @@ class TaskCreatePermission(BasePermission):
             return True
 
         if user.is_developer():
-            user_tz = pytz.timezone(user.timezone)  # Converts the user’s timezone string (e.g. "Asia/Kolkata") Into a timezone object
-            now_local = timezone.now().astimezone(user_tz)
-
-            start_hour = 9
-            end_hour = 18
-
             # Developers can create tasks only for themselves
             assigned_to = request.data.get("assigned_to")  # Reads the assigned_to field from POST body
 
-            return start_hour <= now_local.hour < end_hour and str(user.id) == str(assigned_to)
+            return is_working_time(user) and str(user.id) == str(assigned_to)
 
         return False #     Deny for: Auditors, Unknown roles, Malformed requests
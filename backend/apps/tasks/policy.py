@@ -0,0 +1,140 @@
+import threading
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.db.models import BooleanField, Case, Value, When
+from django.utils import timezone
+
+"""
+Task write policy, shared by TaskAccessPermission, TaskCreatePermission,
+bulk updates and the ``can_edit`` flag of task lists:
+
+- auditors never write
+- managers always write
+- developers write their own tasks: critical ones any time, others only
+  during working hours (WORK_START_HOUR to WORK_END_HOUR in their timezone)
+
+Whether a timezone is inside working hours only changes twice a day, so
+each timezone's state is kept as a WorkingWindow ("open until T" or
+"closed until T", T in UTC) and reused until T. A check is then one
+comparison with now() instead of a pytz lookup and a local-time
+conversion, and a list of tasks is decided with the same window.
+"""
+
+WORK_START_HOUR = 9
+WORK_END_HOUR = 18
+
+
+class WorkingWindow:
+    __slots__ = ("is_open", "until")
+
+    def __init__(self, is_open, until):
+        self.is_open = is_open
+        # Next transition (aware, UTC)
+        self.until = until
+
+    def __repr__(self):
+        state = "open" if self.is_open else "closed"
+        return f"WorkingWindow({state} until {self.until.isoformat()})"
+
+
+def compute_window(tz_name, at):
+    """
+    Working-hours state of timezone ``tz_name`` at aware datetime ``at``.
+    """
+    tz = pytz.timezone(tz_name)
+    local = at.astimezone(tz)
+    day = local.date()
+
+    def boundary(date, hour):
+        return tz.localize(datetime.combine(date, time(hour))).astimezone(pytz.utc)
+
+    if WORK_START_HOUR <= local.hour < WORK_END_HOUR:
+        return WorkingWindow(True, boundary(day, WORK_END_HOUR))
+    if local.hour < WORK_START_HOUR:
+        return WorkingWindow(False, boundary(day, WORK_START_HOUR))
+    return WorkingWindow(False, boundary(day + timedelta(days=1), WORK_START_HOUR))
+
+
+class WorkingWindowCache:
+    """
+    Timezone name → (computed_at, WorkingWindow), reused for any time from
+    computed_at until the window's transition.
+    """
+
+    def __init__(self):
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def get(self, tz_name, at=None):
+        at = at or timezone.now()
+
+        entry = self._windows.get(tz_name)
+        if entry is not None and entry[0] <= at < entry[1].until:
+            return entry[1]
+
+        window = compute_window(tz_name, at)
+        with self._lock:
+            self._windows[tz_name] = (at, window)
+        return window
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+working_windows = WorkingWindowCache()
+
+
+def is_working_time(user, at=None):
+    return working_windows.get(user.timezone, at).is_open
+
+
+def can_modify_tasks(user, tasks, at=None):
+    """
+    One bool per task in ``tasks``: may ``user`` write it now? The role and
+    the working window are looked up once for the whole list.
+    """
+    if user.is_auditor():
+        return [False] * len(tasks)
+
+    if user.is_manager():
+        return [True] * len(tasks)
+
+    if user.is_developer():
+        open_now = is_working_time(user, at)
+        return [
+            task.assigned_to_id == user.id and (open_now or task.priority == "critical")
+            for task in tasks
+        ]
+
+    return [False] * len(tasks)
+
+
+def can_modify_task(user, task, at=None):
+    return can_modify_tasks(user, [task], at)[0]
+
+
+def annotate_can_edit(queryset, user, at=None):
+    """
+    Add a ``can_edit`` column to a Task queryset, computed by the database
+    from the same rules.
+    """
+    if user.is_manager():
+        can_edit = Value(True, output_field=BooleanField())
+    elif user.is_developer() and is_working_time(user, at):
+        can_edit = Case(
+            When(assigned_to_id=user.id, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    elif user.is_developer():
+        can_edit = Case(
+            When(assigned_to_id=user.id, priority="critical", then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    else:
+        can_edit = Value(False, output_field=BooleanField())
+
+    return queryset.annotate(can_edit=can_edit)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Task
+from .policy import can_modify_task
 from .services import complete_parent_task, block_child_task
 from apps.users.models import User
 
@@ -19,6 +20,7 @@ class TaskSerializer(serializers.ModelSerializer):
         source="created_by.username",
         read_only=True
     )
+    can_edit = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -40,7 +42,19 @@ class TaskSerializer(serializers.ModelSerializer):
             "created_by_user",
             "parent_task",
             "tags",
+            "can_edit",
         ]
+
+    def get_can_edit(self, obj):
+        # Annotated by TaskViewSet.get_queryset; computed for other instances
+        can_edit = getattr(obj, "can_edit", None)
+        if can_edit is not None:
+            return can_edit
+
+        request = self.context.get("request")
+        if request is None or not request.user.is_authenticated:
+            return None
+        return can_modify_task(request.user, obj)
     def update(self, instance, validated_data):
         old_status = instance.status
         new_status = validated_data.get("status", old_status)  #e.g {"status": "completed"}
@@ -2,6 +2,7 @@ from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
 from apps.tasks.models import Task, TaskHistory
+from apps.tasks.policy import can_modify_tasks
 from apps.tasks.services import complete_parent_task, block_child_task
 
 
@@ -16,16 +17,19 @@ def bulk_update_tasks(task_ids, new_status, user):
     if len(tasks) != len(task_ids):
         raise ValidationError("One or more task IDs are invalid.")
 
-    # 🔐 PERMISSION VALIDATION (MISSING PART)
-    for task in tasks:
-        # Auditors never allowed
-        if user.is_auditor():
-            raise ValidationError("Auditors cannot update tasks.")
+    # 🔐 PERMISSION VALIDATION
+    # Auditors never allowed
+    if user.is_auditor():
+        raise ValidationError("Auditors cannot update tasks.")
+
+    # Same rules as single-task updates, decided for the whole list at once
+    allowed = can_modify_tasks(user, tasks)
 
-        # Developers can update ONLY their own tasks
-        if user.is_developer() and task.assigned_to_id != user.id:
+    # Developers: only their own tasks, non-critical ones during working hours
+    for task, can_modify in zip(tasks, allowed):
+        if not can_modify:
             raise ValidationError(
-                f"You do not have permission to update task '{task.title}'."
+                f"You do not have permission to update task '{task.title}' now."
             )
 
     task_map = {task.id: task for task in tasks}
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.tasks.models import Task
+from apps.notifications.models import Notification
+from apps.notifications.counters import notifications_created
+from apps.notifications.signals import send_notifications_to_users
+
+ACTIVE_STATUSES = ("pending", "in_progress", "blocked")
+
+ESCALATION_WINDOW = timedelta(hours=24)
+
+
+"""
+Escalation rules:
+
+Active task (pending / in_progress / blocked) with deadline within 24 hours
+and not escalated yet → priority goes up one step, once.
+
+Critical tasks are left alone (already at the top).
+
+All eligible tasks are escalated by ONE UPDATE ... RETURNING statement and
+their notifications are written with ONE bulk INSERT.
+"""
+
+ESCALATE_SQL = f"""
+    UPDATE {Task._meta.db_table}
+    SET priority = CASE priority
+            WHEN 'low' THEN 'medium'
+            WHEN 'medium' THEN 'high'
+            WHEN 'high' THEN 'critical'
+        END,
+        priority_escalated = TRUE
+    WHERE status IN (%s, %s, %s)
+      AND deadline <= %s
+      AND NOT priority_escalated
+      AND priority IN ('low', 'medium', 'high')
+      {{task_filter}}
+    RETURNING id, title, priority, assigned_to_id
+"""
+
+
+def escalation_candidates(now=None):
+    """
+    Active, not yet escalated tasks due within ESCALATION_WINDOW.
+    Served by the partial ``task_escalation_due_idx`` index.
+    """
+    now = now or timezone.now()
+
+    return Task.objects.filter(
+        deadline__lte=now + ESCALATION_WINDOW,
+        status__in=ACTIVE_STATUSES,
+        priority_escalated=False,
+    )
+
+
+def escalate_due_tasks(now=None, task_ids=None):
+    """
+    Escalate every eligible task in one statement. The WHERE clause matches
+    the predicate of ``task_escalation_due_idx``.
+
+    ``task_ids`` restricts escalation to those tasks (exact-time scheduler);
+    the eligibility rules still apply. Returns the list of
+    ``(task_id, title, new_priority, assigned_to_id)`` rows that were
+    escalated.
+    """
+    now = now or timezone.now()
+    threshold = now + ESCALATION_WINDOW
+
+    params = [*ACTIVE_STATUSES, threshold]
+    task_filter = ""
+
+    if task_ids is not None:
+        if not task_ids:
+            return []
+        task_filter = f"AND id IN ({', '.join(['%s'] * len(task_ids))})"
+        params += list(task_ids)
+
+    sql = ESCALATE_SQL.format(task_filter=task_filter)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            escalated = cursor.fetchall()
+
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=assigned_to_id,
+                task_id=task_id,
+                message=f"Task '{title}' priority escalated to {new_priority.upper()} due to upcoming deadline.",
+            )
+            for task_id, title, new_priority, assigned_to_id in escalated
+        ])
+
+        notifications_created([n.user_id for n in notifications])
+
+    send_notifications_to_users(notifications)
+
+    return escalated
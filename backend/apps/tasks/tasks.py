@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from .services_escalation import escalate_due_tasks
+
+
+@shared_task
+def escalate_task_priorities():
+    """
+    Celery task to escalate priority of tasks due within 24 hours.
+    Replaces the per-request PriorityEscalationMiddleware.
+
+    Escalation normally fires on time from the run_deadline_scheduler
+    worker; this sweep is an hourly safety net, or the only trigger (every
+    10 minutes) when DEADLINE_SCHEDULER_URL is not set.
+    """
+    escalated = escalate_due_tasks()
+
+    return f"Escalated {len(escalated)} tasks"
@@ -1,3 +1,301 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.contrib import admin
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.notifications.models import Notification
+from apps.notifications.services import deadline_warning_candidates
+from apps.users.models import User
+
+from .admin_filters import TasksNeedingAttentionFilter
+from .models import Task
+from .policy import annotate_can_edit, can_modify_tasks, compute_window, working_windows
+from .services_bulk import bulk_update_tasks
+from . import services_escalation
+from .services_escalation import ACTIVE_STATUSES, ESCALATE_SQL, escalate_due_tasks, escalation_candidates
+from .tasks import escalate_task_priorities
+
+
+PARTIAL_INDEXES = ("task_active_deadline_idx", "task_escalation_due_idx")
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN checks need PostgreSQL")
+class ActiveDeadlineIndexTests(TestCase):
+    """
+    Every deadline query on active tasks must be answered from one of the
+    partial indexes instead of scanning completed tasks.
+
+    PostgreSQL only: SQLite cannot match bound parameters against a partial
+    index predicate.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="dev", password="x")
+        now = timezone.now()
+
+        Task.objects.bulk_create([
+            Task(
+                title=f"Task {i}",
+                status="completed" if i % 10 else "pending",
+                assigned_to=user,
+                created_by=user,
+                estimated_hours=1,
+                deadline=now + timedelta(hours=i - 100),
+            )
+            for i in range(200)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Task._meta.db_table}")
+
+    def setUp(self):
+        # A test table is tiny, so force the planner to show whether it
+        # *can* use the index
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesPartialIndex(self, plan):
+        self.assertTrue(
+            any(index in plan for index in PARTIAL_INDEXES),
+            msg=f"Expected a partial deadline index in plan:\n{plan}",
+        )
+        self.assertNotIn(f"Seq Scan on {Task._meta.db_table}", plan)
+
+    def test_escalation_uses_partial_index(self):
+        sql = ESCALATE_SQL.format(task_filter="")
+        params = [*ACTIVE_STATUSES, timezone.now() + timedelta(hours=24)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        self.assertUsesPartialIndex(plan)
+
+    def test_debug_escalation_view_uses_partial_index(self):
+        self.assertUsesPartialIndex(escalation_candidates().explain())
+
+    def test_deadline_warnings_use_partial_index(self):
+        self.assertUsesPartialIndex(deadline_warning_candidates().explain())
+
+    def test_overdue_filter_uses_partial_index(self):
+        list_filter = TasksNeedingAttentionFilter(
+            None,
+            {"needs_attention": ["overdue"]},
+            Task,
+            admin.site._registry[Task],
+        )
+        queryset = list_filter.queryset(None, Task.objects.all())
+
+        self.assertUsesPartialIndex(queryset.explain())
+
+
+class TaskPolicyTests(TestCase):
+    """
+    Working windows are cached per timezone until their next transition and
+    drive single, list and bulk permission checks alike.
+    """
+
+    # 20:00 in Asia/Kolkata (UTC+5:30): outside working hours
+    EVENING = datetime(2026, 3, 2, 14, 30, tzinfo=dt_timezone.utc)
+    # 12:00 in Asia/Kolkata
+    NOON = datetime(2026, 3, 2, 6, 30, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.developer = User.objects.create_user(
+            username="policy-dev", password="x", role=User.Role.DEVELOPER, timezone="Asia/Kolkata"
+        )
+        cls.manager = User.objects.create_user(
+            username="policy-manager", password="x", role=User.Role.MANAGER, timezone="Asia/Kolkata"
+        )
+        cls.tasks = Task.objects.bulk_create([
+            Task(
+                title=f"Task {priority}",
+                priority=priority,
+                assigned_to=cls.developer,
+                created_by=cls.manager,
+                estimated_hours=1,
+                deadline=timezone.now() + timedelta(days=7),
+            )
+            for priority in ("low", "critical")
+        ])
+        cls.other_task = Task.objects.create(
+            title="Someone else's",
+            priority="critical",
+            assigned_to=cls.manager,
+            created_by=cls.manager,
+            estimated_hours=1,
+            deadline=timezone.now() + timedelta(days=7),
+        )
+
+    def setUp(self):
+        working_windows.clear()
+        self.addCleanup(working_windows.clear)
+
+    def test_window_transitions(self):
+        window = compute_window("Asia/Kolkata", self.NOON)
+        self.assertTrue(window.is_open)
+        self.assertEqual(window.until, datetime(2026, 3, 2, 12, 30, tzinfo=dt_timezone.utc))
+
+        window = compute_window("Asia/Kolkata", self.EVENING)
+        self.assertFalse(window.is_open)
+        self.assertEqual(window.until, datetime(2026, 3, 3, 3, 30, tzinfo=dt_timezone.utc))
+
+    def test_window_cached_until_transition(self):
+        with mock.patch("apps.tasks.policy.compute_window", wraps=compute_window) as computed:
+            for minutes in range(0, 300, 30):
+                working_windows.get("Asia/Kolkata", self.NOON + timedelta(minutes=minutes))
+            self.assertEqual(computed.call_count, 1)
+
+            self.assertFalse(working_windows.get("Asia/Kolkata", self.NOON + timedelta(hours=6)).is_open)
+            self.assertEqual(computed.call_count, 2)
+
+    def test_list_and_annotation_agree(self):
+        ids = [task.id for task in self.tasks] + [self.other_task.id]
+        queryset = Task.objects.filter(id__in=ids).order_by("id")
+
+        for user in (self.developer, self.manager):
+            for at in (self.NOON, self.EVENING):
+                tasks = list(annotate_can_edit(queryset, user, at))
+                self.assertEqual([task.can_edit for task in tasks], can_modify_tasks(user, tasks, at))
+
+        self.assertEqual(can_modify_tasks(self.developer, self.tasks, self.EVENING), [False, True])
+
+    def test_developers_only_modify_own_tasks(self):
+        self.assertEqual(can_modify_tasks(self.developer, [self.other_task], self.NOON), [False])
+        self.assertEqual(can_modify_tasks(self.manager, [self.other_task], self.EVENING), [True])
+
+        with mock.patch("apps.tasks.policy.timezone.now", return_value=self.NOON):
+            with self.assertRaises(ValidationError):
+                bulk_update_tasks([self.tasks[0].id, self.other_task.id], "in_progress", self.developer)
+
+    def test_bulk_update_outside_working_hours(self):
+        with mock.patch("apps.tasks.policy.timezone.now", return_value=self.EVENING):
+            with self.assertRaises(ValidationError):
+                bulk_update_tasks([task.id for task in self.tasks], "in_progress", self.developer)
+
+            bulk_update_tasks([self.tasks[1].id], "in_progress", self.developer)
+
+        self.assertEqual(
+            list(Task.objects.filter(id__in=[task.id for task in self.tasks]).order_by("id")
+                 .values_list("status", flat=True)),
+            ["pending", "in_progress"],
+        )
+
+
+class EscalateDueTasksTests(TestCase):
+    """
+    ESCALATE_SQL raises each eligible task one priority step, once, and
+    the job writes one notification per escalated task in one INSERT.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.user = User.objects.create_user(username="escalated", password="x")
+
+        def task(title, priority, hours=12, status="pending", escalated=False):
+            return Task(
+                title=title,
+                priority=priority,
+                status=status,
+                priority_escalated=escalated,
+                assigned_to=cls.user,
+                created_by=cls.user,
+                estimated_hours=1,
+                deadline=cls.now + timedelta(hours=hours),
+            )
+
+        cls.tasks = {
+            task.title: task
+            for task in Task.objects.bulk_create([
+                task("low", "low"),
+                task("medium", "medium", status="in_progress"),
+                task("high", "high", status="blocked"),
+                task("overdue", "low", hours=-3),
+                # Left alone
+                task("critical", "critical"),
+                task("completed", "low", status="completed"),
+                task("already", "medium", escalated=True),
+                task("later", "low", hours=30),
+            ])
+        }
+
+    def setUp(self):
+        self.pushed = []
+        self.counted = []
+        for patcher in (
+            mock.patch.object(services_escalation, "send_notifications_to_users", side_effect=self.pushed.append),
+            mock.patch.object(services_escalation, "notifications_created", side_effect=self.counted.append),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def priorities(self):
+        return dict(Task.objects.values_list("title", "priority"))
+
+    def test_priority_steps(self):
+        escalated = escalate_due_tasks(now=self.now)
+
+        self.assertEqual(
+            sorted((title, priority) for _, title, priority, _ in escalated),
+            [("high", "critical"), ("low", "medium"), ("medium", "high"), ("overdue", "medium")],
+        )
+        self.assertEqual(self.priorities(), {
+            "low": "medium",
+            "medium": "high",
+            "high": "critical",
+            "overdue": "medium",
+            "critical": "critical",
+            "completed": "low",
+            "already": "medium",
+            "later": "low",
+        })
+        self.assertEqual(
+            set(Task.objects.filter(priority_escalated=True).values_list("title", flat=True)),
+            {"low", "medium", "high", "overdue", "already"},
+        )
+
+    def test_escalates_once(self):
+        escalate_due_tasks(now=self.now)
+        self.assertEqual(escalate_due_tasks(now=self.now), [])
+        self.assertEqual(self.priorities()["low"], "medium")
+
+    def test_one_notification_per_escalated_task(self):
+        with CaptureQueriesContext(connection) as queries:
+            escalated = escalate_due_tasks(now=self.now)
+
+        notifications = Notification.objects.order_by("task_id")
+        self.assertEqual(
+            [notification.task_id for notification in notifications],
+            sorted(task_id for task_id, _, _, _ in escalated),
+        )
+        self.assertIn(
+            "Task 'high' priority escalated to CRITICAL due to upcoming deadline.",
+            [notification.message for notification in notifications],
+        )
+
+        inserts = [q for q in queries.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(self.pushed), 1)
+        self.assertEqual(len(self.pushed[0]), 4)
+        self.assertEqual(self.counted, [[self.user.pk] * 4])
+
+    def test_restricted_to_task_ids(self):
+        ids = [self.tasks["low"].id, self.tasks["critical"].id, self.tasks["later"].id]
+
+        escalated = escalate_due_tasks(now=self.now, task_ids=ids)
+
+        self.assertEqual([row[0] for row in escalated], [self.tasks["low"].id])
+        self.assertEqual(escalate_due_tasks(now=self.now, task_ids=[]), [])
+        self.assertEqual(self.priorities()["medium"], "medium")
 
-# Create your tests here.
+    def test_celery_job(self):
+        self.assertEqual(escalate_task_priorities(), "Escalated 4 tasks")
+        self.assertEqual(Notification.objects.count(), 4)
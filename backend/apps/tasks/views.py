@@ -2,6 +2,7 @@ from rest_framework.viewsets import ModelViewSet
 from .models import Task
 from .serializers import TaskSerializer
 from .permissions import TaskAccessPermission, TaskCreatePermission
+from .policy import annotate_can_edit
 from apps.users.permissions import AuditorReadOnly
 
 
@@ -22,6 +23,9 @@ class TaskViewSet(ModelViewSet):
             "parent_task",
         ).prefetch_related("child_tasks", "tags")
 
+        # can_edit for every row, from one working-window lookup
+        qs = annotate_can_edit(qs, user)
+
         # Auditors see everything (read-only)
         if user.is_auditor():
             return qs
@@ -1,16 +1,132 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework.exceptions import AuthenticationFailed
 
+from .cache import get_auth_user
+from .models import User
+
+"""
+Request-scoped JWT authentication.
+
+JWTAutoRefreshMiddleware, SmartRateLimitMiddleware and DRF all need the
+caller's token and user. The first of them to ask builds an AuthContext and
+attaches it to the request; the others reuse it, so the token signature is
+verified once and the user is loaded (at most) once per request.
+"""
+
+
+class AuthContext:
+    """
+    Outcome of authenticating one request.
+
+    ``validated_token`` is None when the request carries no bearer token.
+    ``error`` holds the AuthenticationFailed raised for a bad token or user,
+    so every consumer reports the same failure. The user is only loaded
+    when first asked for.
+    """
+
+    _UNSET = object()
+
+    def __init__(self, authenticator, validated_token=None, error=None):
+        self._authenticator = authenticator
+        self.validated_token = validated_token
+        self.error = error
+        self._user = self._UNSET
+
+    @property
+    def has_token(self):
+        return self.validated_token is not None or self.error is not None
+
+    def get_user(self):
+        """
+        The token's user, or None without a token. Raises the cached
+        AuthenticationFailed for an invalid token or unknown/inactive user.
+        """
+        if self._user is self._UNSET:
+            self._user = None
+            if self.error is None and self.validated_token is not None:
+                try:
+                    self._user = self._authenticator.get_user(self.validated_token)
+                except AuthenticationFailed as e:
+                    self.error = e
+
+        if self.error is not None:
+            raise self.error
+
+        return self._user
+
+
+def get_auth_context(request, authenticator=None):
+    """
+    AuthContext of this request, computed on first use. Accepts a Django
+    HttpRequest or a DRF Request.
+
+    ``authenticator`` validates the token and loads the user (default: the
+    shared CustomJWTAuthentication). A context built by an authenticator of
+    another class is not reused, so subclass overrides always apply.
+    """
+    request = getattr(request, "_request", request)
+    authenticator = authenticator or _authenticator
+
+    context = getattr(request, "_auth_context", None)
+    if context is not None and type(context._authenticator) is type(authenticator):
+        return context
+
+    context = AuthContext(authenticator)
+
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+
+    if raw_token is not None:
+        try:
+            context.validated_token = authenticator.get_validated_token(raw_token)
+        except AuthenticationFailed as e:
+            # InvalidToken: expired, bad signature, wrong type...
+            context.error = e
+
+    request._auth_context = context
+    return context
+
+
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
-        result = super().authenticate(request)
+        context = get_auth_context(request, self)
 
-        if result is None:
+        if not context.has_token:
             return None
 
-        user, token = result
+        user = context.get_user()
+        token = context.validated_token
 
         if not user.email_verified:
             raise AuthenticationFailed("Email not verified")
 
         return (user, token)
+
+    def get_user(self, validated_token):
+        """
+        The token's user from the two-tier user cache (apps.users.cache)
+        instead of a query per request.
+        """
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which the cache doesn't hold
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        try:
+            user = get_auth_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        return user
+
+
+_authenticator = CustomJWTAuthentication()
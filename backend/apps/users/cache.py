@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.cache import default_cache_is_shared
+
+from .models import User
+
+"""
+Two-tier cache of the user fields JWT authentication needs.
+
+    per-process LRU  →  default cache (shared)  →  database
+
+Entries are keyed by a per-user version held in the shared cache:
+
+    user-auth-version:<id>        current version (never expires)
+    user-auth:<id>:<version>      (id, is_active, role, timezone, email_verified)
+
+Saving or deleting a user bumps its version, which makes every tier's
+entries for it unreachable at once: each process compares its LRU entry
+with the shared version before using it, so a role change or deactivation
+is seen on the next request, without a database query on cache hits.
+
+A per-process default cache (LocMemCache) can't carry a version bump to
+other workers. The middle tier is then skipped and LRU entries live only
+USER_CACHE_LOCAL_TTL seconds, so other workers see a change within that
+delay.
+
+get_auth_user() returns a real User with the other fields deferred; they
+are loaded (together) only if a view touches them.
+"""
+
+_AUTH_FIELD_NAMES = {"id", "role", "is_active", "email_verified", "timezone"}
+
+# In model field order, as Model.from_db expects
+AUTH_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in _AUTH_FIELD_NAMES
+)
+
+VERSION_KEY = "user-auth-version:{}"
+ENTRY_KEY = "user-auth:{}:{}"
+
+
+class LocalUserCache:
+    """
+    Thread-safe LRU of user id → (version, expires_at, auth field values).
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        # None: entries live until their version changes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[2]
+
+    def put(self, user_id, version, values):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[user_id] = (version, expires_at, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def get_local_cache():
+    global _local
+
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                ttl = None if default_cache_is_shared() else settings.USER_CACHE_LOCAL_TTL
+                _local = LocalUserCache(settings.USER_CACHE_LOCAL_SIZE, ttl)
+    return _local
+
+
+def get_user_version(user_id):
+    key = VERSION_KEY.format(user_id)
+
+    version = cache.get(key)
+    if version is None:
+        # Fresh numbers never collide with one an evicted key used to hold
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_auth_user(user_id):
+    """
+    User ``user_id`` with only AUTH_FIELDS loaded, from the cache when
+    possible. Raises User.DoesNotExist.
+    """
+    if settings.USER_CACHE_LOCAL_SIZE <= 0:
+        return User.objects.get(pk=user_id)
+
+    local = get_local_cache()
+    version = get_user_version(user_id)
+
+    values = local.get(user_id, version)
+    if values is None:
+        # Per-process default cache: its copy would outlive the LRU's
+        shared = default_cache_is_shared()
+        key = ENTRY_KEY.format(user_id, version)
+        values = cache.get(key) if shared else None
+
+        if values is None:
+            values = (
+                User.objects.filter(pk=user_id)
+                .values_list(*AUTH_FIELDS)
+                .first()
+            )
+            if values is None:
+                raise User.DoesNotExist(f"User {user_id} does not exist")
+            if shared:
+                cache.set(key, values, settings.USER_CACHE_TIMEOUT)
+
+        local.put(user_id, version, values)
+
+    # A new instance per request: callers may modify it
+    return User.from_db(User.objects.db, AUTH_FIELDS, values)
+
+
+def invalidate_user(user_id):
+    """
+    Drop every cached copy of the user: at once in this process and, with
+    a shared default cache, in all others (else within
+    USER_CACHE_LOCAL_TTL seconds).
+    """
+    get_local_cache().discard(user_id)
+
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,86 @@
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.models import User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Send authenticated requests through the full middleware + DRF stack "
+        "and report JWT verifications and user queries per request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--path", default="/api/notifications/")
+        # Auditors have unlimited reads, so rate limiting never cuts in
+        parser.add_argument("--role", default=User.Role.AUDITOR)
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        user_table = User._meta.db_table
+
+        decodes = 0
+        real_decode = TokenBackend.decode
+
+        def counting_decode(backend, token, verify=True):
+            nonlocal decodes
+            if verify:
+                decodes += 1
+            return real_decode(backend, token, verify)
+
+        # Everything (the benchmark user included) is rolled back; audit rows
+        # are written synchronously so they are rolled back with it
+        try:
+            with override_settings(AUDIT_BUFFER_SIZE=0), transaction.atomic():
+                user = User.objects.create_user(
+                    username="benchmark-auth",
+                    password="benchmark-auth",
+                    role=options["role"],
+                    email_verified=True,
+                )
+                token = str(AccessToken.for_user(user))
+                client = Client(HTTP_HOST="localhost")
+
+                statuses = set()
+                with mock.patch.object(TokenBackend, "decode", counting_decode), \
+                        CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        response = client.get(
+                            options["path"], HTTP_AUTHORIZATION=f"Bearer {token}"
+                        )
+                        statuses.add(response.status_code)
+                    elapsed = time.perf_counter() - started
+
+                raise Rollback
+        except Rollback:
+            pass
+
+        user_queries = sum(
+            1 for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and f'FROM "{user_table}"' in query["sql"]
+        )
+
+        self.stdout.write(f"Requests:              {count} (status {sorted(statuses)})")
+        self.stdout.write(f"Signature checks/req:  {decodes / count:.2f}")
+        self.stdout.write(f"User queries/req:      {user_queries / count:.2f}")
+        self.stdout.write(f"Total queries/req:     {len(queries.captured_queries) / count:.2f}")
+        self.stdout.write(f"Mean latency:          {elapsed / count * 1000:.2f} ms")
+
+        if decodes > count or user_queries > count:
+            self.stdout.write(self.style.WARNING("More than one JWT verification or user query per request."))
+        else:
+            self.stdout.write(self.style.SUCCESS("One JWT verification and at most one user query per request."))
@@ -0,0 +1,116 @@
+import multiprocessing
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.security.ratelimit import LeasedRateLimiter, RedisRateLimiter
+
+
+def run_worker(url, key, limit, period, fraction, lease_seconds, count, barrier, results):
+    limiter = RedisRateLimiter(url)
+    if fraction > 0:
+        limiter = LeasedRateLimiter(limiter, fraction, lease_seconds)
+
+    allowed = 0
+    barrier.wait()
+    started = time.perf_counter()
+    for _ in range(count):
+        if limiter.hit(key, limit, period).allowed:
+            allowed += 1
+    elapsed = time.perf_counter() - started
+
+    if fraction > 0:
+        # Unspent units go back to Redis, as at worker shutdown
+        limiter.close()
+        shared_calls = limiter.counters["shared"]
+    else:
+        shared_calls = count
+
+    results.put((allowed, elapsed, shared_calls))
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one rate-limit key from several processes against Redis and "
+        "report admitted requests vs. the limit, throughput and Redis calls "
+        "per request, with and without per-worker leases"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=5000, help="Per process")
+        parser.add_argument("--limit", type=int, default=2000)
+        parser.add_argument("--period", type=int, default=3600)
+        parser.add_argument(
+            "--fractions", default="0,0.01,0.05",
+            help="Comma-separated lease fractions to compare (0 = no leases)",
+        )
+        parser.add_argument("--lease-seconds", type=float, default=settings.RATE_LIMIT_LEASE_SECONDS)
+        parser.add_argument("--redis-url", default=settings.RATE_LIMIT_REDIS_URL)
+
+    def handle(self, *args, **options):
+        url = options["redis_url"]
+        if not url:
+            raise CommandError("Needs Redis: set RATE_LIMIT_REDIS_URL or pass --redis-url")
+
+        processes = options["processes"]
+        limit = options["limit"]
+        period = options["period"]
+
+        self.stdout.write(
+            f"{processes} processes × {options['requests']} requests, "
+            f"limit {limit} per {period}s"
+        )
+        self.stdout.write(
+            f"{'fraction':>8}  {'admitted':>8}  {'expected':>8}  {'error':>7}  "
+            f"{'req/s':>9}  {'redis/req':>9}  {'unreturned':>10}"
+        )
+
+        for fraction in (float(value) for value in options["fractions"].split(",")):
+            self.run(url, fraction, options)
+
+    def run(self, url, fraction, options):
+        processes = options["processes"]
+        limit = options["limit"]
+        period = options["period"]
+        key = f"rate:benchmark:{uuid.uuid4().hex}"
+
+        # fork: children inherit the configured Django settings
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+
+        workers = [
+            context.Process(
+                target=run_worker,
+                args=(url, key, limit, period, fraction, options["lease_seconds"],
+                      options["requests"], barrier, results),
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        admitted = sum(allowed for allowed, _, _ in outcomes)
+        wall = max(elapsed for _, elapsed, _ in outcomes)
+        shared_calls = sum(calls for _, _, calls in outcomes)
+        total = processes * options["requests"]
+
+        # The budget refills continuously while the benchmark runs
+        expected = min(total, limit + int(wall * limit / period))
+
+        shared = RedisRateLimiter(url)
+        used = limit - shared.peek(key, limit, period).remaining
+        shared._redis.delete(key)
+
+        self.stdout.write(
+            f"{fraction:>8.3f}  {admitted:>8}  {expected:>8}  "
+            f"{(admitted - expected) / expected:>+7.2%}  "
+            f"{total / wall:>9.0f}  {shared_calls / total:>9.3f}  "
+            f"{max(used - admitted, 0):>10}"
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.revocation import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding refresh tokens and their blacklist rows "
+        "in small batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.5)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        def report(batch_number, rows, seconds):
+            self.stdout.write(
+                f"Batch {batch_number}: deleted {rows} rows in {seconds:.3f}s"
+            )
+
+        deleted = purge_expired_tokens(
+            batch_size=options["batch_size"],
+            sleep_seconds=options["sleep"],
+            dry_run=options["dry_run"],
+            on_batch=report,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would delete {deleted} expired outstanding tokens.")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired token rows.")
+        )
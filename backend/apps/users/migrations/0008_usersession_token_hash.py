@@ -0,0 +1,57 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_token_hashes(apps, schema_editor):
+    """
+    Hash every existing session's refresh token. Rows repeating a token
+    (which the unique index would reject) are dropped.
+    """
+    UserSession = apps.get_model("users", "UserSession")
+
+    seen = set()
+    duplicates = []
+    batch = []
+
+    for session in UserSession.objects.only("id", "refresh_token").order_by("-last_used").iterator():
+        token_hash = hashlib.sha256(session.refresh_token.encode()).hexdigest()
+        if token_hash in seen:
+            duplicates.append(session.id)
+            continue
+        seen.add(token_hash)
+
+        session.token_hash = token_hash
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            UserSession.objects.bulk_update(batch, ["token_hash"])
+            batch = []
+
+    if batch:
+        UserSession.objects.bulk_update(batch, ["token_hash"])
+    if duplicates:
+        UserSession.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_alter_user_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='token_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_token_hashes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='usersession',
+            name='token_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
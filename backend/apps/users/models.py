@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+import hashlib
 import uuid
 from zoneinfo import available_timezones
 
@@ -34,10 +35,28 @@ class User(AbstractUser):
     def is_auditor(self):
         return self.role == self.Role.AUDITOR
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users rebuilt from the auth cache (apps.users.cache) defer everything
+        # but the auth fields: load all of them on first access, not one
+        # query per field
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+
+
+def hash_refresh_token(token):
+    """
+    Fixed-width lookup key of a refresh token (SHA-256, hex).
+    """
+    return hashlib.sha256(str(token).encode()).hexdigest()
+
 
 class UserSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     refresh_token = models.TextField()
+    # Sessions are looked up by this (unique index), never by the token text
+    token_hash = models.CharField(max_length=64, unique=True, editable=False)
     device_id = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     last_used = models.DateTimeField(auto_now=True)
@@ -45,6 +64,15 @@ class UserSession(models.Model):
     class Meta:
         ordering = ["last_used"]
 
+    def save(self, *args, **kwargs):
+        self.token_hash = hash_refresh_token(self.refresh_token)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "refresh_token" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "token_hash"}
+
+        super().save(*args, **kwargs)
+
 
 class EmailVerificationToken(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
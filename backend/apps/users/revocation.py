@@ -0,0 +1,284 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+"""
+Refresh-token revocation.
+
+simplejwt checks every refresh token against BlacklistedToken with a
+query. RevocationFilter keeps a Bloom filter of the blacklisted JTIs in each
+process instead: a token that was never revoked (nearly all of them) is
+cleared without touching the database, and only "maybe revoked" answers
+(revoked tokens plus ~JWT_REVOCATION_ERROR_RATE false positives) run the
+query.
+
+The filter follows the blacklist:
+
+- caught up with blacklist rows whose blacklisted_at is at most
+  CATCH_UP_MARGIN before its previous sync whenever the revocation version
+  in the default cache changes (bumped by every revocation), and at least
+  every JWT_REVOCATION_SYNC_INTERVAL seconds. Ids are not a safe cursor: a
+  row with a lower id can commit after one with a higher id was seen
+- rebuilt from the unexpired blacklist every
+  JWT_REVOCATION_REBUILD_INTERVAL seconds, or once it outgrows its capacity
+
+With a per-process default cache, another worker's revocation is seen
+within JWT_REVOCATION_SYNC_INTERVAL. Rotation itself never accepts a
+token twice: AuthRefreshViewSet rejects a token whose blacklist row
+already existed.
+"""
+
+VERSION_KEY = "jwt-revocation-version"
+
+# Smallest filter built, so a short blacklist still has room to grow
+MIN_CAPACITY = 1024
+
+# How far back each catch-up looks before the previous sync: covers
+# revocations committed late and clock differences between servers
+CATCH_UP_MARGIN = timedelta(seconds=10)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter of strings: no false negatives, about
+    ``error_rate`` false positives while it holds at most ``capacity``
+    items.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def _positions(self, item):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+
+class RevocationFilter:
+    """
+    Per-process Bloom filter of blacklisted JTIs, kept in sync with the
+    BlacklistedToken table (see module docstring).
+    """
+
+    def __init__(self, sync_interval, rebuild_interval, error_rate=0.01):
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.error_rate = error_rate
+
+        self._bloom = None
+        self._synced_until = None
+        self._recent_ids = frozenset()
+        self._version = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def might_be_revoked(self, jti):
+        """
+        False only if ``jti`` is certainly not blacklisted (as of the last
+        sync).
+        """
+        self._sync()
+        return jti in self._bloom
+
+    def add(self, jti):
+        """
+        Record a revocation made by this process right away.
+        """
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def clear(self):
+        with self._lock:
+            self._bloom = None
+
+    def _sync(self):
+        version = cache.get(VERSION_KEY)
+        current = time.monotonic()
+
+        if (
+            self._bloom is not None
+            and version == self._version
+            and current - self._synced_at < self.sync_interval
+        ):
+            return
+
+        with self._lock:
+            if (
+                self._bloom is None
+                or current - self._built_at >= self.rebuild_interval
+                or self._bloom.count > self._bloom.capacity
+            ):
+                self._rebuild()
+                self._built_at = current
+            else:
+                self._catch_up()
+
+            self._version = version
+            self._synced_at = current
+
+    def _rebuild(self):
+        started = now()
+        revoked = BlacklistedToken.objects.filter(token__expires_at__gt=started)
+
+        bloom = BloomFilter(max(2 * revoked.count(), MIN_CAPACITY), self.error_rate)
+        recent_ids = set()
+        rows = revoked.values_list("id", "token__jti", "blacklisted_at")
+        for row_id, jti, blacklisted_at in rows.iterator(chunk_size=5000):
+            bloom.add(jti)
+            if blacklisted_at >= started - CATCH_UP_MARGIN:
+                recent_ids.add(row_id)
+
+        self._bloom = bloom
+        self._synced_until = started
+        self._recent_ids = frozenset(recent_ids)
+
+    def _catch_up(self):
+        started = now()
+        rows = BlacklistedToken.objects.filter(
+            blacklisted_at__gte=self._synced_until - CATCH_UP_MARGIN
+        ).values_list("id", "token__jti")
+
+        recent_ids = set()
+        for row_id, jti in rows:
+            # Rows seen by the previous catch-up are in the filter already
+            # (adding them again would only inflate its count)
+            if row_id not in self._recent_ids:
+                self._bloom.add(jti)
+            recent_ids.add(row_id)
+
+        self._synced_until = started
+        self._recent_ids = frozenset(recent_ids)
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_revocation_filter():
+    global _filter
+
+    if _filter is None:
+        with _filter_lock:
+            if _filter is None:
+                _filter = RevocationFilter(
+                    sync_interval=settings.JWT_REVOCATION_SYNC_INTERVAL,
+                    rebuild_interval=settings.JWT_REVOCATION_REBUILD_INTERVAL,
+                    error_rate=settings.JWT_REVOCATION_ERROR_RATE,
+                )
+    return _filter
+
+
+def bump_revocation_version():
+    """
+    Tell every process's filter to catch up (once the revocation commits).
+    """
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def revoke_user_tokens(user_id):
+    """
+    Blacklist every unexpired outstanding refresh token of the user with a
+    single INSERT ... SELECT. Returns the number of tokens blacklisted.
+    """
+    outstanding = OutstandingToken._meta.db_table
+    blacklisted = BlacklistedToken._meta.db_table
+    current = now()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {blacklisted} (token_id, blacklisted_at)
+            SELECT o.id, %s FROM {outstanding} o
+            WHERE o.user_id = %s AND o.expires_at > %s
+              AND NOT EXISTS (SELECT 1 FROM {blacklisted} b WHERE b.token_id = o.id)
+            """,
+            [current, user_id, current],
+        )
+        revoked = cursor.rowcount
+
+    if revoked:
+        bump_revocation_version()
+    return revoked
+
+
+def purge_expired_tokens(cutoff=None, batch_size=1000, sleep_seconds=0.5,
+                         dry_run=False, on_batch=None):
+    """
+    Delete outstanding tokens that expired before ``cutoff`` (default: now),
+    with their blacklist rows, in id-range batches of ``batch_size``.
+
+    An expired token fails validation on its own, so neither row is needed
+    any more. ``on_batch(batch_number, rows, seconds)`` is called after
+    every batch; with ``dry_run`` only the expired outstanding tokens are
+    counted. Returns the total number of rows (to be) deleted.
+    """
+    expired = OutstandingToken.objects.filter(expires_at__lt=cutoff or now())
+
+    if dry_run:
+        return expired.count()
+
+    total = 0
+    batch_number = 0
+    last_id = 0
+
+    while True:
+        ids = list(
+            expired.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        started = time.monotonic()
+        # Blacklist rows go in the same cascade
+        deleted, _ = OutstandingToken.objects.filter(id__in=ids).only("id").delete()
+        elapsed = time.monotonic() - started
+
+        batch_number += 1
+        total += deleted
+        last_id = ids[-1]
+
+        if on_batch:
+            on_batch(batch_number, deleted, elapsed)
+
+        if len(ids) < batch_size:
+            break
+
+        time.sleep(sleep_seconds)
+
+    return total
@@ -0,0 +1,353 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils.timezone import now
+
+from .models import UserSession, hash_refresh_token
+
+"""
+Login sessions (one per refresh token and device), behind one interface:
+
+    create(user_id, refresh_token, device_id, max_sessions)
+    get(refresh_token)                     → SessionInfo or None
+    rotate(old_token, new_token, user_id)  → False when the old session is gone
+    revoke(refresh_token, user_id)
+    revoke_all(user_id)
+
+A session lives as long as its refresh token: ``ttl`` seconds after it was
+created or last rotated. Expired sessions are never returned and don't
+count against ``max_sessions``. Sessions are keyed by the SHA-256 of the
+refresh token (hash_refresh_token), never by the token itself.
+
+AUTH_SESSION_STORE picks the backend:
+
+- "database": the UserSession table; expired rows of a user are deleted
+  when that user logs in
+- "redis": a hash per session with a TTL plus a sorted set of each user's
+  sessions; one Lua script per create / rotate / revoke and a WATCH
+  transaction for revoke_all (AUTH_SESSION_REDIS_URL)
+- "locmem": per-process dicts for local dev and tests
+"""
+
+
+class SessionInfo:
+    __slots__ = ("user_id", "device_id")
+
+    def __init__(self, user_id, device_id):
+        self.user_id = user_id
+        self.device_id = device_id
+
+    def __repr__(self):
+        return f"SessionInfo(user_id={self.user_id!r}, device_id={self.device_id!r})"
+
+
+class SessionLimitReached(Exception):
+    """
+    The user already has ``max_sessions`` live sessions, on ``devices``.
+    """
+
+    def __init__(self, devices):
+        super().__init__("Maximum login limit reached.")
+        self.devices = devices
+
+
+class DatabaseSessionStore:
+    """
+    UserSession rows; a row is live while ``last_used`` (bumped by every
+    rotation) is less than ``ttl`` seconds old.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def create(self, user_id, refresh_token, device_id, max_sessions):
+        cutoff = self._cutoff()
+        UserSession.objects.filter(user_id=user_id, last_used__lte=cutoff).delete()
+
+        devices = list(
+            UserSession.objects.filter(user_id=user_id).values_list("device_id", flat=True)
+        )
+        if len(devices) >= max_sessions:
+            raise SessionLimitReached(devices)
+
+        UserSession.objects.create(
+            user_id=user_id,
+            refresh_token=refresh_token,
+            device_id=device_id,
+        )
+
+    def get(self, refresh_token):
+        row = (
+            UserSession.objects.filter(
+                token_hash=hash_refresh_token(refresh_token),
+                last_used__gt=self._cutoff(),
+            )
+            .values_list("user_id", "device_id")
+            .first()
+        )
+        return SessionInfo(*row) if row else None
+
+    def rotate(self, old_token, new_token, user_id):
+        updated = UserSession.objects.filter(
+            token_hash=hash_refresh_token(old_token),
+            user_id=user_id,
+            last_used__gt=self._cutoff(),
+        ).update(
+            refresh_token=new_token,
+            token_hash=hash_refresh_token(new_token),
+            last_used=now(),
+        )
+        return bool(updated)
+
+    def revoke(self, refresh_token, user_id):
+        UserSession.objects.filter(
+            token_hash=hash_refresh_token(refresh_token),
+            user_id=user_id,
+        ).delete()
+
+    def revoke_all(self, user_id):
+        UserSession.objects.filter(user_id=user_id).delete()
+
+    def _cutoff(self):
+        return now() - timedelta(seconds=self.ttl)
+
+
+class InMemorySessionStore:
+    """
+    Dict of token hash → [user_id, device_id, expires_at] and of user_id →
+    set of token hashes, behind a lock.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._sessions = {}
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id, refresh_token, device_id, max_sessions):
+        with self._lock:
+            current = time.time()
+            hashes = self._by_user.setdefault(user_id, set())
+
+            for token_hash in [h for h in hashes if self._sessions[h][2] <= current]:
+                hashes.discard(token_hash)
+                del self._sessions[token_hash]
+
+            if len(hashes) >= max_sessions:
+                raise SessionLimitReached([self._sessions[h][1] for h in hashes])
+
+            token_hash = hash_refresh_token(refresh_token)
+            self._sessions[token_hash] = [user_id, device_id, current + self.ttl]
+            hashes.add(token_hash)
+
+    def get(self, refresh_token):
+        with self._lock:
+            record = self._live(hash_refresh_token(refresh_token))
+            return SessionInfo(record[0], record[1]) if record else None
+
+    def rotate(self, old_token, new_token, user_id):
+        with self._lock:
+            old_hash = hash_refresh_token(old_token)
+            record = self._live(old_hash)
+            if record is None or record[0] != user_id:
+                return False
+
+            new_hash = hash_refresh_token(new_token)
+            del self._sessions[old_hash]
+            self._sessions[new_hash] = [record[0], record[1], time.time() + self.ttl]
+
+            hashes = self._by_user[record[0]]
+            hashes.discard(old_hash)
+            hashes.add(new_hash)
+            return True
+
+    def revoke(self, refresh_token, user_id):
+        with self._lock:
+            token_hash = hash_refresh_token(refresh_token)
+            record = self._sessions.get(token_hash)
+            if record is not None and record[0] == user_id:
+                del self._sessions[token_hash]
+                self._by_user[user_id].discard(token_hash)
+
+    def revoke_all(self, user_id):
+        with self._lock:
+            for token_hash in self._by_user.pop(user_id, ()):
+                del self._sessions[token_hash]
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._by_user.clear()
+
+    def _live(self, token_hash):
+        record = self._sessions.get(token_hash)
+        if record is None:
+            return None
+        if record[2] <= time.time():
+            del self._sessions[token_hash]
+            self._by_user[record[0]].discard(token_hash)
+            return None
+        return record
+
+
+class RedisSessionStore:
+    """
+    Shared store: ``session:{hash}`` hashes (fields u, d) that expire with
+    their refresh token, and a ``user-sessions:{user_id}`` sorted set of
+    token hashes scored by expiry (ms). Expired members are trimmed from
+    the set before it is counted.
+
+    Every key a script touches is passed in KEYS (built by session_key()
+    and user_key() only); revoke_all() deletes keys read from the set, so
+    it runs as a WATCH/MULTI transaction instead of a script.
+    """
+
+    SESSION_KEY = "session:{}"
+    USER_KEY = "user-sessions:{}"
+
+    # KEYS: user set, session. ARGV: user_id, device_id, ttl (ms),
+    # max_sessions, token hash.
+    # Returns {1} when created, else {0, token hash, ...} of live sessions
+    CREATE_SCRIPT = """
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+        local ttl = tonumber(ARGV[3])
+
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+        local hashes = redis.call('ZRANGE', KEYS[1], 0, -1)
+        if #hashes >= tonumber(ARGV[4]) then
+            table.insert(hashes, 1, 0)
+            return hashes
+        end
+
+        redis.call('HSET', KEYS[2], 'u', ARGV[1], 'd', ARGV[2])
+        redis.call('PEXPIRE', KEYS[2], ttl)
+        redis.call('ZADD', KEYS[1], now + ttl, ARGV[5])
+        redis.call('PEXPIRE', KEYS[1], ttl)
+        return {1}
+    """
+
+    # KEYS: user set, old session, new session.
+    # ARGV: user_id, old hash, new hash, ttl (ms).
+    # Returns 1, or 0 when the old session is gone (or someone else's)
+    ROTATE_SCRIPT = """
+        local record = redis.call('HMGET', KEYS[2], 'u', 'd')
+        if record[1] ~= ARGV[1] then return 0 end
+
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+        local ttl = tonumber(ARGV[4])
+
+        redis.call('DEL', KEYS[2])
+        redis.call('HSET', KEYS[3], 'u', record[1], 'd', record[2])
+        redis.call('PEXPIRE', KEYS[3], ttl)
+        redis.call('ZREM', KEYS[1], ARGV[2])
+        redis.call('ZADD', KEYS[1], now + ttl, ARGV[3])
+        redis.call('PEXPIRE', KEYS[1], ttl)
+        return 1
+    """
+
+    # KEYS: user set, session. ARGV: user_id, token hash
+    REVOKE_SCRIPT = """
+        if redis.call('HGET', KEYS[2], 'u') ~= ARGV[1] then return 0 end
+        redis.call('DEL', KEYS[2])
+        redis.call('ZREM', KEYS[1], ARGV[2])
+        return 1
+    """
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+        self._create = self._redis.register_script(self.CREATE_SCRIPT)
+        self._rotate = self._redis.register_script(self.ROTATE_SCRIPT)
+        self._revoke = self._redis.register_script(self.REVOKE_SCRIPT)
+
+    @classmethod
+    def session_key(cls, token_hash):
+        return cls.SESSION_KEY.format(token_hash)
+
+    @classmethod
+    def user_key(cls, user_id):
+        return cls.USER_KEY.format(user_id)
+
+    def create(self, user_id, refresh_token, device_id, max_sessions):
+        token_hash = hash_refresh_token(refresh_token)
+        reply = self._create(
+            keys=[self.user_key(user_id), self.session_key(token_hash)],
+            args=[user_id, device_id, int(self.ttl * 1000), max_sessions, token_hash],
+        )
+        if not reply[0]:
+            raise SessionLimitReached(self._devices(reply[1:]))
+
+    def get(self, refresh_token):
+        user_id, device_id = self._redis.hmget(
+            self.session_key(hash_refresh_token(refresh_token)), "u", "d"
+        )
+        if user_id is None:
+            return None
+        return SessionInfo(int(user_id), device_id.decode())
+
+    def rotate(self, old_token, new_token, user_id):
+        old_hash = hash_refresh_token(old_token)
+        new_hash = hash_refresh_token(new_token)
+        return bool(self._rotate(
+            keys=[
+                self.user_key(user_id),
+                self.session_key(old_hash),
+                self.session_key(new_hash),
+            ],
+            args=[user_id, old_hash, new_hash, int(self.ttl * 1000)],
+        ))
+
+    def revoke(self, refresh_token, user_id):
+        token_hash = hash_refresh_token(refresh_token)
+        self._revoke(
+            keys=[self.user_key(user_id), self.session_key(token_hash)],
+            args=[user_id, token_hash],
+        )
+
+    def revoke_all(self, user_id):
+        user_key = self.user_key(user_id)
+
+        def revoke(pipe):
+            hashes = pipe.zrange(user_key, 0, -1)
+            pipe.multi()
+            pipe.delete(user_key, *(self.session_key(h.decode()) for h in hashes))
+
+        # Retried if a session is created or rotated meanwhile
+        self._redis.transaction(revoke, user_key)
+
+    def _devices(self, token_hashes):
+        # Only for the error message: a session gone meanwhile shows as ""
+        pipe = self._redis.pipeline(transaction=False)
+        for token_hash in token_hashes:
+            pipe.hget(self.session_key(token_hash.decode()), "d")
+        return [(device or b"").decode() for device in pipe.execute()]
+
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_session_store():
+    global _store
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                ttl = settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds()
+                backend = settings.AUTH_SESSION_STORE
+
+                if backend == "redis":
+                    _store = RedisSessionStore(settings.AUTH_SESSION_REDIS_URL, ttl)
+                elif backend == "locmem":
+                    _store = InMemorySessionStore(ttl)
+                elif backend == "database":
+                    _store = DatabaseSessionStore(ttl)
+                else:
+                    raise ValueError(f"Unknown AUTH_SESSION_STORE: {backend!r}")
+    return _store
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import AUTH_FIELDS, invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Role changes, deactivation, email verification... bump the user's cache
+    version. Saves that only touch other fields (e.g. last_login) don't.
+    """
+    if update_fields is not None and not set(update_fields) & set(AUTH_FIELDS):
+        return
+
+    # Now, and again once committed: a request between the two may have
+    # cached the old row
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
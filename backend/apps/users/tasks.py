@@ -0,0 +1,23 @@
+from celery import shared_task
+
+from .revocation import purge_expired_tokens
+
+
+@shared_task
+def purge_expired_jwt_tokens(batch_size=1000, sleep_seconds=0.5):
+    """
+    Celery task to delete expired outstanding refresh tokens and their
+    blacklist rows, in batches of ``batch_size``.
+
+    This should be scheduled to run daily via Celery Beat.
+    """
+    def report(batch_number, rows, seconds):
+        print(f"Token purge batch {batch_number}: {rows} rows in {seconds:.3f}s")
+
+    deleted = purge_expired_tokens(
+        batch_size=batch_size,
+        sleep_seconds=sleep_seconds,
+        on_batch=report,
+    )
+
+    return f"Deleted {deleted} expired token rows"
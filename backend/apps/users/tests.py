@@ -1,3 +1,440 @@
-from django.test import TestCase
+import os
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from django.utils.timezone import now
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CustomJWTAuthentication, get_auth_context
+from . import cache as user_cache
+from .cache import get_auth_user, invalidate_user
+from .models import User, UserSession, hash_refresh_token
+from .revocation import CATCH_UP_MARGIN, RevocationFilter, get_revocation_filter, purge_expired_tokens
+from .session_store import (
+    DatabaseSessionStore,
+    InMemorySessionStore,
+    RedisSessionStore,
+    SessionLimitReached,
+)
+from .tokens import RefreshToken
+
+
+# Audit rows written inline, inside each test's transaction
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class SharedAuthContextTests(TestCase):
+    """
+    JWTAutoRefreshMiddleware, SmartRateLimitMiddleware and DRF share one
+    AuthContext per request.
+    """
+
+    ME_URL = "/api/auth/users/me/"
+    LIST_URL = "/api/notifications/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="auditor",
+            password="x",
+            role=User.Role.AUDITOR,
+            email_verified=True,
+        )
+
+    def get(self, token, url=ME_URL):
+        return self.client.get(
+            url, HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def user_queries(self, queries):
+        return [
+            query for query in queries.captured_queries
+            if f'FROM "{User._meta.db_table}"' in query["sql"]
+        ]
+
+    def test_token_verified_and_user_loaded_once(self):
+        token = AccessToken.for_user(self.user)
+        invalidate_user(self.user.pk)
+
+        with mock.patch.object(TokenBackend, "decode", autospec=True,
+                               side_effect=TokenBackend.decode) as decode, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.get(token, self.LIST_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(len(self.user_queries(queries)), 1)
+
+    def test_subclass_overrides_apply(self):
+        class RejectingAuthentication(CustomJWTAuthentication):
+            def get_user(self, validated_token):
+                raise AuthenticationFailed("Rejected")
+
+        token = AccessToken.for_user(self.user)
+        request = RequestFactory().get(self.ME_URL, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        # Built by the middlewares before DRF authenticates
+        self.assertEqual(get_auth_context(request).get_user(), self.user)
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Rejected"):
+            RejectingAuthentication().authenticate(request)
+
+    def test_invalid_token_rejected_by_drf(self):
+        response = self.get("not-a-token")
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_expiring_token_is_refreshed(self):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(seconds=60))
+
+        response = self.get(token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-New-Access-Token", response)
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class AuthUserCacheTests(TestCase):
+    """
+    apps.users.cache: zero queries on hits, never a stale role.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="dev",
+            password="x",
+            role=User.Role.DEVELOPER,
+            email_verified=True,
+        )
+
+    def get(self, token):
+        return self.client.get(
+            "/api/notifications/",
+            HTTP_HOST="localhost",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+    def test_cache_hit_costs_no_user_query(self):
+        token = AccessToken.for_user(self.user)
+        self.get(token)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(
+            f'FROM "{User._meta.db_table}"' in query["sql"]
+            for query in queries.captured_queries
+        ))
+
+    def test_role_change_is_seen_immediately(self):
+        self.assertEqual(get_auth_user(self.user.pk).role, User.Role.DEVELOPER)
+
+        self.user.role = User.Role.MANAGER
+        self.user.save()
+
+        self.assertEqual(get_auth_user(self.user.pk).role, User.Role.MANAGER)
+
+    def test_deactivated_user_is_rejected(self):
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.get(token).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_other_process_sees_change_after_local_ttl(self):
+        # This process's LRU, with a clock the test moves
+        now = [1000.0]
+        clock = mock.Mock(monotonic=lambda: now[0], time_ns=time.time_ns)
+        for patcher in (
+            mock.patch.object(user_cache, "time", clock),
+            mock.patch.object(user_cache, "_local", None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.assertEqual(get_auth_user(self.user.pk).role, User.Role.DEVELOPER)
+
+        # Saved by another worker: its version bump stays in that worker's
+        # LocMemCache and never reaches this one
+        User.objects.filter(pk=self.user.pk).update(role=User.Role.MANAGER, is_active=False)
+
+        now[0] += settings.USER_CACHE_LOCAL_TTL - 1
+        self.assertEqual(get_auth_user(self.user.pk).role, User.Role.DEVELOPER)
+
+        now[0] += 2
+        user = get_auth_user(self.user.pk)
+        self.assertEqual(user.role, User.Role.MANAGER)
+        self.assertFalse(user.is_active)
+
+    def test_deferred_fields_load_in_one_query(self):
+        user = get_auth_user(self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, "dev")
+            self.assertTrue(user.check_password("x"))
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class SessionLookupTests(TestCase):
+    """
+    Sessions are found by the SHA-256 of their refresh token.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="session",
+            password="x",
+            role=User.Role.DEVELOPER,
+            email_verified=True,
+        )
+
+    def post(self, url, **extra):
+        return self.client.post(url, content_type="application/json", HTTP_HOST="localhost", **extra)
+
+    def login(self):
+        response = self.client.post(
+            "/api/auth/login/",
+            {"username": "session", "password": "x"},
+            content_type="application/json",
+            HTTP_HOST="localhost",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_refresh_rotates_token_hash(self):
+        self.login()
+        old_token = self.client.cookies["refresh_token"].value
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post("/api/auth/refresh/")
+
+        self.assertEqual(response.status_code, 200)
+        new_token = self.client.cookies["refresh_token"].value
+        session = UserSession.objects.get(user=self.user)
+        self.assertEqual(session.token_hash, hash_refresh_token(new_token))
+        self.assertFalse(UserSession.objects.filter(token_hash=hash_refresh_token(old_token)).exists())
+        self.assertTrue(any(
+            '"users_usersession"."token_hash" =' in query["sql"]
+            for query in queries.captured_queries
+        ))
+
+    def test_logout_deletes_session(self):
+        access = self.login().json()["access"]
+
+        response = self.post("/api/auth/logout/", HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(UserSession.objects.filter(user=self.user).exists())
+
+
+@override_settings(AUDIT_BUFFER_SIZE=0)
+class TokenRevocationTests(TestCase):
+    """
+    Blacklist checks go through the revocation Bloom filter; logout-all
+    revokes in one statement.
+    """
+
+    BLACKLIST_TABLE = BlacklistedToken._meta.db_table
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="revoked",
+            password="x",
+            role=User.Role.DEVELOPER,
+            email_verified=True,
+        )
+
+    def setUp(self):
+        get_revocation_filter().clear()
+        self.addCleanup(get_revocation_filter().clear)
+
+    def blacklist_queries(self, queries):
+        return [
+            query["sql"] for query in queries.captured_queries
+            if self.BLACKLIST_TABLE in query["sql"]
+        ]
+
+    def test_clean_token_skips_blacklist_query(self):
+        token = str(RefreshToken.for_user(self.user))
+        RefreshToken(token)  # builds the filter
+
+        with CaptureQueriesContext(connection) as queries:
+            RefreshToken(token)
+
+        self.assertEqual(self.blacklist_queries(queries), [])
+
+    def test_rotated_token_is_rejected(self):
+        self.client.post(
+            "/api/auth/login/",
+            {"username": "revoked", "password": "x"},
+            content_type="application/json",
+            HTTP_HOST="localhost",
+        )
+        old_token = self.client.cookies["refresh_token"].value
+
+        response = self.client.post("/api/auth/refresh/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 200)
+
+        self.client.cookies["refresh_token"] = old_token
+        response = self.client.post("/api/auth/refresh/", HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_all_revokes_in_one_statement(self):
+        tokens = [str(RefreshToken.for_user(self.user)) for _ in range(3)]
+        RefreshToken(tokens[0])  # builds the filter
+        access = str(AccessToken.for_user(self.user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    "/api/auth/logout-all/",
+                    HTTP_HOST="localhost",
+                    HTTP_AUTHORIZATION=f"Bearer {access}",
+                )
+
+        self.assertEqual(response.status_code, 200)
+        inserts = [sql for sql in self.blacklist_queries(queries) if sql.lstrip().startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(BlacklistedToken.objects.filter(token__user=self.user).count(), 3)
+
+        for token in tokens:
+            with self.assertRaises(TokenError):
+                RefreshToken(token)
+
+    def test_catch_up_sees_late_commits_with_lower_ids(self):
+        def blacklist(row_id, jti, age):
+            outstanding = OutstandingToken.objects.create(
+                user=self.user, jti=jti, token="x", expires_at=now() + timedelta(days=1)
+            )
+            BlacklistedToken.objects.create(id=row_id, token=outstanding)
+            BlacklistedToken.objects.filter(id=row_id).update(blacklisted_at=now() - age)
+
+        revocations = RevocationFilter(sync_interval=0, rebuild_interval=3600)
+        blacklist(50, "seen", timedelta(0))
+        self.assertTrue(revocations.might_be_revoked("seen"))
+        count = revocations._bloom.count
+
+        # Blacklisted before that sync, but committed after it
+        blacklist(10, "late", timedelta(seconds=2))
+        blacklist(11, "too-late", CATCH_UP_MARGIN + timedelta(seconds=5))
+
+        self.assertTrue(revocations.might_be_revoked("late"))
+        self.assertFalse(revocations.might_be_revoked("too-late"))
+        # Rows already in the filter are not added again
+        revocations.might_be_revoked("seen")
+        self.assertEqual(revocations._bloom.count, count + 1)
+
+    def test_purge_expired_tokens(self):
+        expired_at = now() - timedelta(days=1)
+        for i in range(5):
+            outstanding = OutstandingToken.objects.create(
+                user=self.user, jti=f"expired-{i}", token="x", expires_at=expired_at
+            )
+            BlacklistedToken.objects.create(token=outstanding)
+        live = RefreshToken.for_user(self.user)
+
+        batches = []
+        deleted = purge_expired_tokens(
+            batch_size=2,
+            sleep_seconds=0,
+            on_batch=lambda number, rows, seconds: batches.append(rows),
+        )
+
+        self.assertEqual(deleted, 10)
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(
+            list(OutstandingToken.objects.values_list("jti", flat=True)),
+            [live["jti"]],
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class SessionStoreTests(TestCase):
+    """
+    Database and locmem session stores behave the same; expired sessions
+    don't count against the limit.
+    """
+
+    TTL = 3600
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="stored",
+            password="x",
+            role=User.Role.DEVELOPER,
+            email_verified=True,
+        )
+
+    def check_store(self, store, expire):
+        user_id = self.user.pk
+        store.create(user_id, "token-a", "laptop", max_sessions=2)
+        store.create(user_id, "token-b", "phone", max_sessions=2)
+
+        with self.assertRaises(SessionLimitReached) as raised:
+            store.create(user_id, "token-c", "tablet", max_sessions=2)
+        self.assertCountEqual(raised.exception.devices, ["laptop", "phone"])
+
+        self.assertFalse(store.rotate("token-a", "token-a2", user_id + 1))
+        self.assertTrue(store.rotate("token-a", "token-a2", user_id))
+        self.assertIsNone(store.get("token-a"))
+        self.assertFalse(store.rotate("token-a", "token-a3", user_id))
+        session = store.get("token-a2")
+        self.assertEqual((session.user_id, session.device_id), (user_id, "laptop"))
+
+        store.revoke("token-b", user_id + 1)  # someone else's logout
+        self.assertIsNotNone(store.get("token-b"))
+        store.revoke("token-b", user_id)
+        self.assertIsNone(store.get("token-b"))
+
+        expire()
+        self.assertIsNone(store.get("token-a2"))
+        store.create(user_id, "token-d", "tablet", max_sessions=1)
+
+        store.revoke_all(user_id)
+        self.assertIsNone(store.get("token-d"))
+
+    def test_database_store(self):
+        store = DatabaseSessionStore(self.TTL)
+        self.check_store(
+            store,
+            lambda: UserSession.objects.update(last_used=now() - timedelta(seconds=self.TTL)),
+        )
+        self.assertFalse(UserSession.objects.exists())
+
+    def test_locmem_store(self):
+        store = InMemorySessionStore(self.TTL)
+        clock = mock.patch("time.time", return_value=time.time() + 2 * self.TTL)
+        self.addCleanup(clock.stop)
+        self.check_store(store, clock.start)
+
+    @skipUnless(os.getenv("TEST_REDIS_URL"), "set TEST_REDIS_URL to test the Redis store")
+    def test_redis_store(self):
+        store = RedisSessionStore(os.environ["TEST_REDIS_URL"], self.TTL)
+        store.revoke_all(self.user.pk)
+        self.addCleanup(store.revoke_all, self.user.pk)
+
+        def expire():
+            user_key = store.user_key(self.user.pk)
+            for token_hash in store._redis.zrange(user_key, 0, -1):
+                store._redis.delete(store.session_key(token_hash.decode()))
+            store._redis.delete(user_key)
+
+        self.check_store(store, expire)
+        self.assertFalse(store._redis.exists(store.user_key(self.user.pk)))
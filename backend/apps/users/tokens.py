@@ -0,0 +1,28 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .revocation import bump_revocation_version, get_revocation_filter
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token whose blacklist check asks the process's revocation
+    Bloom filter first (apps.users.revocation): the query only runs for
+    JTIs the filter may contain.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+
+        if get_revocation_filter().might_be_revoked(jti):
+            super().check_blacklist()
+
+    def blacklist(self):
+        """
+        Blacklist the token; returns ``(BlacklistedToken, created)``.
+        """
+        result = super().blacklist()
+
+        get_revocation_filter().add(self.payload[api_settings.JTI_CLAIM])
+        bump_revocation_version()
+        return result
@@ -6,11 +6,15 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.exceptions import AuthenticationFailed, ValidationError
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.decorators import action
+from rest_framework_simplejwt.settings import api_settings
+from .cache import get_auth_user
 from .models import User, UserSession, EmailVerificationToken
+from .revocation import revoke_user_tokens
+from .session_store import SessionLimitReached, get_session_store
+from .tokens import RefreshToken
 from .serializers import UserSerializer
 from .permissions import UserAccessPermission
 
@@ -109,18 +113,6 @@ class AuthLoginViewSet(viewsets.ModelViewSet):
 
         user = serializer.validated_data["user"]
 
-        # Enforce max sessions
-        active_sessions = UserSession.objects.filter(user=user)
-        if active_sessions.count() >= MAX_SESSIONS:
-            devices = list(active_sessions.values_list("device_id", flat=True))
-            raise ValidationError({
-                "detail": "Maximum login limit reached.",
-                "active_devices": devices,
-            })
-
-        user.last_login = now()
-        user.save(update_fields=["last_login"])
-
         # Server-generated device ID
         device_id = request.COOKIES.get("device_id")
         if not device_id:
@@ -128,11 +120,17 @@ class AuthLoginViewSet(viewsets.ModelViewSet):
 
         refresh = RefreshToken.for_user(user)
 
-        UserSession.objects.create(
-            user=user,
-            refresh_token=str(refresh),
-            device_id=device_id,
-        )
+        # Enforce max sessions (expired sessions don't count)
+        try:
+            get_session_store().create(user.pk, str(refresh), device_id, MAX_SESSIONS)
+        except SessionLimitReached as exc:
+            raise ValidationError({
+                "detail": "Maximum login limit reached.",
+                "active_devices": exc.devices,
+            })
+
+        user.last_login = now()
+        user.save(update_fields=["last_login"])
 
         response = Response({
             "access": str(refresh.access_token),
@@ -177,16 +175,21 @@ class AuthRefreshViewSet(viewsets.ModelViewSet):
         except Exception:
             raise AuthenticationFailed("Invalid refresh token")
 
-        old_refresh.blacklist()
+        # Another worker's filter may not know yet that this token was
+        # rotated: an existing blacklist row still rejects it
+        _, created = old_refresh.blacklist()
+        if not created:
+            raise AuthenticationFailed("Invalid refresh token")
 
-        session = UserSession.objects.filter(refresh_token=refresh_token).first()
-        if not session:
+        try:
+            user = get_auth_user(old_refresh[api_settings.USER_ID_CLAIM])
+        except User.DoesNotExist:
             raise AuthenticationFailed("Session not found")
 
-        new_refresh = RefreshToken.for_user(session.user)
+        new_refresh = RefreshToken.for_user(user)
 
-        session.refresh_token = str(new_refresh)
-        session.save(update_fields=["refresh_token"])
+        if not get_session_store().rotate(refresh_token, str(new_refresh), user.pk):
+            raise AuthenticationFailed("Session not found")
 
         response = Response({
             "access": str(new_refresh.access_token),
@@ -221,10 +224,7 @@ class AuthLogoutViewSet(viewsets.ModelViewSet):
             except Exception:
                 pass
 
-            UserSession.objects.filter(
-                refresh_token=refresh_token,
-                user=request.user
-            ).delete()
+            get_session_store().revoke(refresh_token, request.user.pk)
 
         response = Response({"detail": "Logged out successfully"})
         response.delete_cookie("refresh_token")
@@ -240,15 +240,10 @@ class AuthLogoutAllViewSet(viewsets.ModelViewSet):
     http_method_names = ["post"]
 
     def create(self, request, *args, **kwargs):
-        sessions = UserSession.objects.filter(user=request.user)
-
-        for session in sessions:
-            try:
-                RefreshToken(session.refresh_token).blacklist()
-            except Exception:
-                pass
+        # Every outstanding refresh token of the user, in one statement
+        revoke_user_tokens(request.user.pk)
 
-        sessions.delete()
+        get_session_store().revoke_all(request.user.pk)
 
         response = Response({"detail": "Logged out from all devices"})
         response.delete_cookie("refresh_token")
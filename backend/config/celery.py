@@ -15,17 +15,53 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
 # Celery Beat schedule for periodic tasks
+# (deadline sweeps are added in schedule_deadline_sweeps below)
 app.conf.beat_schedule = {
-    'check-deadline-warnings-every-10-minutes': {
-        'task': 'apps.notifications.tasks.check_deadline_warnings',
-        'schedule': crontab(minute='*/10'),  # Every 10 minutes
-    },
     'cleanup-old-notifications-daily': {
         'task': 'apps.notifications.tasks.cleanup_old_notifications',
         'schedule': crontab(hour=2, minute=0),  # Daily at 2 AM
     },
+    'maintain-audit-partitions-daily': {
+        'task': 'apps.audit.tasks.maintain_audit_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Daily at 1 AM
+    },
+    'purge-expired-jwt-tokens-daily': {
+        'task': 'apps.users.tasks.purge_expired_jwt_tokens',
+        'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
+    },
+    'reconcile-unread-notification-counts-hourly': {
+        'task': 'apps.notifications.tasks.reconcile_unread_notification_counts',
+        'schedule': crontab(minute=30),  # Every hour at :30
+    },
 }
 
+
+
+@app.on_after_configure.connect
+def schedule_deadline_sweeps(sender, **kwargs):
+    """
+    With a shared DEADLINE_SCHEDULER_URL, the run_deadline_scheduler worker
+    fires deadline warnings and escalation on time and these sweeps are an
+    hourly safety net. Without it, timers live in each process's memory and
+    never reach the worker, so the sweeps are what fires them: every 10
+    minutes.
+    """
+    from django.conf import settings
+
+    minute = '0' if settings.DEADLINE_SCHEDULER_URL else '*/10'
+
+    sender.add_periodic_task(
+        crontab(minute=minute),
+        sender.signature('apps.tasks.tasks.escalate_task_priorities'),
+        name='escalate-task-priorities',
+    )
+    sender.add_periodic_task(
+        crontab(minute=minute),
+        sender.signature('apps.notifications.tasks.check_deadline_warnings'),
+        name='check-deadline-warnings',
+    )
+
+
 # Celery configuration
 app.conf.update(
     task_serializer='json',
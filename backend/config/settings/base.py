@@ -126,8 +126,7 @@ MIDDLEWARE = [
     # Rate limiting AFTER auth
     "apps.security.middleware.smart_rate_limit.SmartRateLimitMiddleware",
 
-    # Priority escalation AFTER request is processed
-    "apps.common.middleware.priority_escalation.PriorityEscalationMiddleware",
+    # Priority escalation runs as a Celery Beat job (apps.tasks.tasks)
 
     # --- Remaining Django middleware ---
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -169,6 +168,124 @@ CHANNEL_LAYERS = {
 }
 
 
+# Notifications
+# Repeated notifications of the same type for the same (user, task) within
+# this many seconds update the pending undelivered row instead of adding one.
+# 0 disables coalescing.
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv("NOTIFICATION_COALESCE_WINDOW", "60"))
+
+# Sorted set holding exact-time deadline events (warnings, escalation),
+# shared by web processes and the run_deadline_scheduler worker.
+# Empty → per-process in-memory stand-in (local dev / tests): timers never
+# reach the worker, so Celery Beat sweeps for due warnings and escalation
+# every 10 minutes instead of hourly (config/celery.py).
+DEADLINE_SCHEDULER_URL = os.getenv("DEADLINE_SCHEDULER_URL", "")
+
+
+# Audit logging
+# Audit entries are buffered in-process and written with bulk_create by a
+# background flusher. 0 disables buffering (one INSERT per request).
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "5000"))
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+# What to do when the buffer is full: "block", "drop_oldest" or "spill"
+AUDIT_BACKPRESSURE = os.getenv("AUDIT_BACKPRESSURE", "block")
+# Longest a request waits for room in "block" mode before its entry is dropped
+AUDIT_BLOCK_TIMEOUT = float(os.getenv("AUDIT_BLOCK_TIMEOUT", "0.5"))
+# JSON-lines overflow file for "spill" mode, replayed when the buffer drains
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", str(BASE_DIR / "audit_spill.jsonl"))
+# Audit payloads: bodies larger than these caps are replaced by a
+# {"_truncated": true, "bytes": n} marker (and never parsed or masked);
+# stored bodies of at least AUDIT_COMPRESS_MIN_BYTES are zlib-compressed.
+# 0 disables compression.
+AUDIT_REQUEST_BODY_MAX_BYTES = int(os.getenv("AUDIT_REQUEST_BODY_MAX_BYTES", "16384"))
+AUDIT_RESPONSE_BODY_MAX_BYTES = int(os.getenv("AUDIT_RESPONSE_BODY_MAX_BYTES", "4096"))
+AUDIT_COMPRESS_MIN_BYTES = int(os.getenv("AUDIT_COMPRESS_MIN_BYTES", "1024"))
+# Audit sampling policy (compiled once by AuditLoggingMiddleware).
+# The first rule whose "path" regex and "methods" match a request decides;
+# unmatched requests use "default". Writes and 4xx/5xx responses are always
+# logged unless a rule sets always_log_writes / always_log_errors to False.
+# "role_rates" overrides sample_rate per user role ("anonymous" when logged out).
+AUDIT_POLICY = {
+    "default": {"sample_rate": 1.0},
+    "always_log_writes": True,
+    "always_log_errors": True,
+    "rules": [
+        {"path": r"^/api/tasks/analytics/", "sample_rate": 0.0},
+        {"path": r"^/api/notifications/unread_count/$", "methods": ["GET"], "sample_rate": 0.01},
+        {"path": r"^/api/notifications/", "methods": ["GET"], "sample_rate": 0.1},
+        {"path": r"^/api/auth/users/me/$", "methods": ["GET"], "sample_rate": 0.05},
+        {
+            "path": r"^/api/tasks/",
+            "methods": ["GET"],
+            "sample_rate": 0.1,
+            # Everything auditors look at stays on record
+            "role_rates": {"auditor": 1.0},
+        },
+        {"path": r"^/api/audit/", "methods": ["GET"], "sample_rate": 1.0},
+    ],
+}
+
+# APIAuditLog is range-partitioned by timestamp on PostgreSQL ("day" or
+# "month" partitions); expired partitions are dropped whole.
+AUDIT_PARTITION_INTERVAL = os.getenv("AUDIT_PARTITION_INTERVAL", "day")
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "7"))
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "30"))
+# Cold-tier archive of expiring audit rows (gzip JSONL segments + index).
+# Empty disables archiving before retention drops/deletes rows.
+AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "")
+AUDIT_ARCHIVE_SEGMENT_ROWS = int(os.getenv("AUDIT_ARCHIVE_SEGMENT_ROWS", "100000"))
+
+# Rate limiting
+# Redis holding the GCRA state of SmartRateLimitMiddleware (one Lua call per
+# request). Empty → per-process in-memory stand-in (local dev / tests).
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+# With Redis, each worker leases RATE_LIMIT_LEASE_FRACTION of a limit at a
+# time and admits requests from it in-process (0 → one Redis call per
+# request). The limit is never exceeded; N workers may hold back up to
+# N × fraction of it, returned after RATE_LIMIT_LEASE_SECONDS unused.
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.05"))
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "5"))
+
+# IP security
+# Redis holding IPSecurityMiddleware's per-IP record (failures, block,
+# captcha; one Lua call per read or update). Empty → per-process in-memory
+# stand-in (local dev / tests).
+IP_SECURITY_REDIS_URL = os.getenv("IP_SECURITY_REDIS_URL", "")
+# IPs seen unblocked skip the store for IP_SECURITY_CLEAN_TTL seconds (the
+# delay before a new block reaches other workers); the per-process cache
+# holds up to IP_SECURITY_CLEAN_CACHE_SIZE IPs. 0 → look up every request.
+IP_SECURITY_CLEAN_TTL = float(os.getenv("IP_SECURITY_CLEAN_TTL", "5"))
+IP_SECURITY_CLEAN_CACHE_SIZE = int(os.getenv("IP_SECURITY_CLEAN_CACHE_SIZE", "10000"))
+
+# Login sessions
+# Where apps.users.session_store keeps login sessions (one per refresh
+# token, expiring with it): "database" (UserSession table), "redis"
+# (AUTH_SESSION_REDIS_URL, TTL per session) or "locmem" (per-process, tests).
+AUTH_SESSION_STORE = os.getenv("AUTH_SESSION_STORE", "database")
+AUTH_SESSION_REDIS_URL = os.getenv("AUTH_SESSION_REDIS_URL", "")
+
+# JWT revocation
+# Refresh-token blacklist checks first ask a per-process Bloom filter of
+# revoked JTIs (apps.users.revocation): it catches up with new blacklist rows
+# when a revocation bumps the version in the default cache, and at least
+# every JWT_REVOCATION_SYNC_INTERVAL seconds; it is rebuilt every
+# JWT_REVOCATION_REBUILD_INTERVAL seconds. JWT_REVOCATION_ERROR_RATE is the
+# share of unrevoked tokens that still need the blacklist query.
+JWT_REVOCATION_SYNC_INTERVAL = float(os.getenv("JWT_REVOCATION_SYNC_INTERVAL", "5"))
+JWT_REVOCATION_REBUILD_INTERVAL = float(os.getenv("JWT_REVOCATION_REBUILD_INTERVAL", "3600"))
+JWT_REVOCATION_ERROR_RATE = float(os.getenv("JWT_REVOCATION_ERROR_RATE", "0.01"))
+
+# Authentication user cache
+# JWT authentication reads the user's auth fields from a per-process LRU of
+# USER_CACHE_LOCAL_SIZE entries, backed by the default cache for
+# USER_CACHE_TIMEOUT seconds. 0 disables the cache (one query per request).
+USER_CACHE_LOCAL_SIZE = int(os.getenv("USER_CACHE_LOCAL_SIZE", "1024"))
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", "300"))
+# With a per-process default cache (LocMemCache) versions can't reach other
+# workers: their entries then expire after USER_CACHE_LOCAL_TTL seconds.
+USER_CACHE_LOCAL_TTL = int(os.getenv("USER_CACHE_LOCAL_TTL", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -11,6 +11,7 @@ urlpatterns = [
     path("api/", include("apps.analytics.urls")),
     path("api/tasks/", include("apps.tasks.urls")),
     path("api/", include("apps.notifications.urls")),
+    path("api/audit/", include("apps.audit.urls")),
 
     # Swagger/OpenAPI documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -4,19 +4,36 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import Optional
 from app.core.database import get_db
+from app.core.policy import is_working_time
 from app.core.security import decode_token
+from app.core.user_cache import AuthUser, user_cache
 from app.models.user import User, UserRole
-from datetime import datetime
-import pytz
 
 security = HTTPBearer()
 
 
+def _user_id_from_payload(payload: dict) -> Optional[int]:
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def load_auth_user(db: AsyncSession, user_id: int) -> Optional[AuthUser]:
+    """Load the auth fields of a user (cache miss)"""
+    result = await db.execute(
+        select(User.id, User.role, User.is_active, User.email_verified, User.timezone)
+        .where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    return AuthUser(*row) if row else None
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+) -> AuthUser:
+    """Get current authenticated user from JWT token (via the user cache)"""
     token = credentials.credentials
     
     # Decode token
@@ -36,8 +53,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
-    user_id: int = payload.get("sub")
+    # Get user from the user cache (database on a miss)
+    user_id = _user_id_from_payload(payload)
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,8 +62,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await user_cache.get(user_id, lambda user_id: load_auth_user(db, user_id))
     
     if user is None:
         raise HTTPException(
@@ -65,8 +81,8 @@ async def get_current_user(
 
 
 async def get_current_verified_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: AuthUser = Depends(get_current_user)
+) -> AuthUser:
     """Get current user only if email is verified"""
     if not current_user.email_verified:
         raise HTTPException(
@@ -78,7 +94,7 @@ async def get_current_verified_user(
 
 def require_role(allowed_roles: list[UserRole]):
     """Dependency to check if user has required role"""
-    async def role_checker(current_user: User = Depends(get_current_verified_user)) -> User:
+    async def role_checker(current_user: AuthUser = Depends(get_current_verified_user)) -> AuthUser:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -88,17 +104,14 @@ def require_role(allowed_roles: list[UserRole]):
     return role_checker
 
 
-def check_working_hours(current_user: User) -> bool:
+def check_working_hours(current_user: AuthUser) -> bool:
     """Check if current time is within working hours (9 AM - 6 PM) in user's timezone"""
-    user_tz = pytz.timezone(current_user.timezone)
-    current_time = datetime.now(user_tz)
-    hour = current_time.hour
-    return 9 <= hour < 18
+    return is_working_time(current_user)
 
 
 async def require_working_hours_for_developers(
-    current_user: User = Depends(get_current_verified_user)
-) -> User:
+    current_user: AuthUser = Depends(get_current_verified_user)
+) -> AuthUser:
     """Dependency to check working hours for developers"""
     if current_user.is_developer() and not check_working_hours(current_user):
         raise HTTPException(
@@ -112,7 +125,7 @@ async def require_working_hours_for_developers(
 async def get_current_user_optional(
     request: Request,
     db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[AuthUser]:
     """Get current user if authenticated, otherwise return None"""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
@@ -123,11 +136,10 @@ async def get_current_user_optional(
     if not payload:
         return None
     
-    user_id = payload.get("sub")
+    user_id = _user_id_from_payload(payload)
     if user_id is None:
         return None
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = await user_cache.get(user_id, lambda user_id: load_auth_user(db, user_id))
     
     return user if user and user.is_active else None
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.core.database import get_db
-from app.models.user import User
+from app.core.user_cache import AuthUser
 from app.models.task import Task, TaskStatus
 from app.schemas.analytics import AnalyticsResponse, TaskAnalytics
 from app.api.dependencies import get_current_verified_user
@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/", response_model=AnalyticsResponse)
 async def get_analytics(
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get task analytics and metrics"""
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token, decode_token
+from app.core.security import password_hasher, create_access_token, create_refresh_token, decode_token, hash_token
+from app.core.user_cache import AuthUser
 from app.models.user import User, UserSession, EmailVerificationToken
 from app.schemas.user import (
     UserCreate,
@@ -43,7 +44,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
     
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -103,6 +104,7 @@ async def verify_email(data: EmailVerificationRequest, db: AsyncSession = Depend
     
     # Delete verification token
     await db.delete(token_obj)
+    # Commits invalidate the user's cached auth fields (app.core.user_cache)
     await db.commit()
     
     return EmailVerificationResponse(message="Email verified successfully")
@@ -120,13 +122,23 @@ async def login(
     result = await db.execute(select(User).where(User.username == user_data.username))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(
+            user_data.password, user.hashed_password
+        )
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash uses an old work factor: replace it (committed with the session)
+    if new_hash:
+        user.hashed_password = new_hash
+    
     if not user.email_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -163,6 +175,7 @@ async def login(
     session = UserSession(
         user_id=user.id,
         refresh_token=refresh_token,
+        token_hash=hash_token(refresh_token),
         device_id=device_id,
     )
     db.add(session)
@@ -219,8 +232,8 @@ async def refresh_token(
     # Find session
     result = await db.execute(
         select(UserSession).where(
+            UserSession.token_hash == hash_token(refresh_token),
             UserSession.user_id == user_id,
-            UserSession.refresh_token == refresh_token,
             UserSession.device_id == device_id,
         )
     )
@@ -238,6 +251,7 @@ async def refresh_token(
     
     # Update session
     session.refresh_token = new_refresh_token
+    session.token_hash = hash_token(new_refresh_token)
     session.last_used = datetime.utcnow()
     await db.commit()
     
@@ -258,7 +272,7 @@ async def refresh_token(
 async def logout(
     request: Request,
     response: Response,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Logout current session"""
@@ -270,8 +284,8 @@ async def logout(
         # Delete session
         await db.execute(
             delete(UserSession).where(
+                UserSession.token_hash == hash_token(refresh_token),
                 UserSession.user_id == current_user.id,
-                UserSession.refresh_token == refresh_token,
                 UserSession.device_id == device_id,
             )
         )
@@ -287,7 +301,7 @@ async def logout(
 @router.post("/logout-all")
 async def logout_all(
     response: Response,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Logout from all sessions"""
@@ -306,14 +320,18 @@ async def logout_all(
 
 
 @router.get("/users/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_verified_user)):
+async def get_current_user_profile(
+    current_user: AuthUser = Depends(get_current_verified_user),
+    db: AsyncSession = Depends(get_db)
+):
     """Get current user profile"""
-    return current_user
+    # The cached auth user only holds auth fields
+    return await db.get(User, current_user.id)
 
 
 @router.get("/users", response_model=list[UserResponse])
 async def list_users(
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List users based on role permissions"""
@@ -332,6 +350,6 @@ async def list_users(
         users = result.scalars().all()
     else:
         # Developers can only see themselves
-        users = [current_user]
+        users = [await db.get(User, current_user.id)]
     
     return users
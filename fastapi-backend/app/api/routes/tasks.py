@@ -2,10 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
+from app.core.policy import can_modify_tasks
+from app.core.user_cache import AuthUser
 from app.models.user import User, UserRole
-from app.models.task import Task, Tag, TaskStatus, TaskPriority
+from app.models.task import Task, Tag, TaskStatus
 from app.schemas.task import (
     TaskCreate,
     TaskUpdate,
@@ -16,14 +18,13 @@ from app.schemas.task import (
 from app.api.dependencies import (
     get_current_verified_user,
     require_working_hours_for_developers,
-    check_working_hours,
 )
 from datetime import datetime
 
 router = APIRouter()
 
 
-def can_access_task(user: User, task: Task) -> bool:
+def can_access_task(user: AuthUser, task: Task) -> bool:
     """Check if user can access a task"""
     if user.is_auditor() or user.is_manager():
         return True
@@ -32,30 +33,12 @@ def can_access_task(user: User, task: Task) -> bool:
     return False
 
 
-def can_modify_task(user: User, task: Task) -> bool:
-    """Check if user can modify a task (considering time restrictions)"""
-    if user.is_auditor():
-        return False  # Auditors are read-only
-    
-    if user.is_manager():
-        return True  # Managers can modify anytime
-    
-    if user.is_developer():
-        # Check if task is assigned to user
-        if task.assigned_to_id != user.id:
-            return False
-        
-        # Critical tasks can be modified anytime
-        if task.priority == TaskPriority.CRITICAL:
-            return True
-        
-        # Otherwise, check working hours
-        return check_working_hours(user)
-    
-    return False
+def can_modify_task(user: AuthUser, task: Task) -> bool:
+    """Check if user can modify a task (considering time restrictions, see app.core.policy)"""
+    return can_modify_tasks(user, [task])[0]
 
 
-async def build_task_response(task: Task, db: AsyncSession) -> dict:
+async def build_task_response(task: Task, db: AsyncSession, can_edit: Optional[bool] = None) -> dict:
     """Build task response with additional fields"""
     # Load relationships if not already loaded
     await db.refresh(task, ["assigned_to_user", "created_by_user", "tags"])
@@ -78,12 +61,13 @@ async def build_task_response(task: Task, db: AsyncSession) -> dict:
         "tags": [tag.id for tag in task.tags],
         "created_at": task.created_at,
         "updated_at": task.updated_at,
+        "can_edit": can_edit,
     }
 
 
 @router.get("/", response_model=List[TaskResponse])
 async def list_tasks(
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """List tasks based on role permissions"""
@@ -102,10 +86,10 @@ async def list_tasks(
     result = await db.execute(query)
     tasks = result.scalars().all()
     
-    # Build responses
+    # Build responses (edit rights for the whole list in one pass)
     task_responses = []
-    for task in tasks:
-        task_data = await build_task_response(task, db)
+    for task, can_edit in zip(tasks, can_modify_tasks(current_user, tasks)):
+        task_data = await build_task_response(task, db, can_edit)
         task_responses.append(task_data)
     
     return task_responses
@@ -114,7 +98,7 @@ async def list_tasks(
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific task"""
@@ -142,13 +126,13 @@ async def get_task(
             detail="You do not have permission to access this task"
         )
     
-    return await build_task_response(task, db)
+    return await build_task_response(task, db, can_modify_task(current_user, task))
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
-    current_user: User = Depends(require_working_hours_for_developers),
+    current_user: AuthUser = Depends(require_working_hours_for_developers),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new task"""
@@ -218,7 +202,7 @@ async def create_task(
 async def update_task(
     task_id: int,
     task_data: TaskUpdate,
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update a task"""
@@ -296,7 +280,7 @@ async def update_task(
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a task"""
@@ -332,7 +316,7 @@ async def delete_task(
 @router.post("/bulk-update", response_model=BulkUpdateResponse)
 async def bulk_update_tasks(
     bulk_data: BulkUpdateRequest,
-    current_user: User = Depends(get_current_verified_user),
+    current_user: AuthUser = Depends(get_current_verified_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Bulk update task status"""
@@ -349,16 +333,16 @@ async def bulk_update_tasks(
             detail="Some tasks not found"
         )
     
-    # Check permissions for all tasks
+    # Check permissions for all tasks (one working-window lookup for the batch)
     updated_count = 0
-    for task in tasks:
+    for task, can_modify in zip(tasks, can_modify_tasks(current_user, tasks)):
         if not can_access_task(current_user, task):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"You do not have permission to access task {task.id}"
             )
         
-        if not can_modify_task(current_user, task):
+        if not can_modify:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"You do not have permission to modify task {task.id} at this time"
@@ -0,0 +1,279 @@
+"""
+API audit logging.
+
+AuditLogMiddleware is a pure ASGI middleware: it records method, path,
+status code, user id and the (masked) request body of every /api/ request.
+Request bodies are copied as the app reads them and response bodies are
+passed through untouched, so streaming responses are never buffered (only
+the first AUDIT_RESPONSE_BODY_MAX_BYTES of error responses are kept).
+
+Entries are put on a bounded asyncio queue; AuditLogWriter, started and
+stopped by the application lifespan, drains it with one multi-row INSERT
+per batch. When the queue is full the oldest entry is dropped, and whatever
+is still queued on shutdown is flushed before the process exits.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.security import decode_token
+from app.models.audit import APIAuditLog
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+SENSITIVE_KEYS = {"password", "token", "secret", "refresh_token", "access_token"}
+
+WRITE_METHODS = ("POST", "PUT", "PATCH")
+
+
+def mask_sensitive_data(data: Any) -> Any:
+    """Recursively mask sensitive fields in dicts/lists"""
+    if isinstance(data, dict):
+        return {
+            key: ("******" if key.lower() in SENSITIVE_KEYS else mask_sensitive_data(value))
+            for key, value in data.items()
+        }
+
+    if isinstance(data, list):
+        return [mask_sensitive_data(item) for item in data]
+
+    return data
+
+
+def parse_body(body: bytes, size: int, max_bytes: int) -> Optional[Any]:
+    """Decode a captured JSON body; bodies over the cap become a marker"""
+    if size > max_bytes:
+        return {"_truncated": True, "bytes": size}
+
+    if not body:
+        return None
+
+    try:
+        return mask_sensitive_data(json.loads(body))
+    except ValueError:
+        return None
+
+
+class AuditLogWriter:
+    """Drains queued audit entries into api_audit_logs in batches"""
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Entries taken off the queue but not written yet
+        self._batch: List[Dict[str, Any]] = []
+        self._writing: Optional[asyncio.Future] = None
+
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def enqueue(self, entry: Dict[str, Any]) -> None:
+        """Queue one entry; never waits. Drops the oldest entry when full."""
+        if not self.running:
+            # No lifespan (e.g. a bare test client): nothing would drain it
+            self.counters["dropped"] += 1
+            return
+
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.counters["dropped"] += 1
+
+        self._queue.put_nowait(entry)
+        self.counters["enqueued"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return {**self.counters, "pending": pending}
+
+    async def start(self) -> None:
+        """Start the drain task (application startup)"""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run(), name="audit-log-writer")
+
+    async def stop(self) -> None:
+        """Stop the drain task and flush what is left (application shutdown)"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Finish the batch the drain task was working on, then the queue
+        if self._writing is not None:
+            await self._writing
+            self._writing = None
+        if self._batch:
+            batch, self._batch = self._batch, []
+            await self._write(batch)
+        await self.flush()
+
+        stats = self.stats()
+        if stats["dropped"] or stats["failed"]:
+            logger.warning(f"Audit log stats on shutdown: {stats}")
+
+    async def flush(self) -> int:
+        """Write everything currently queued. Returns the number of rows written."""
+        written = 0
+        while True:
+            batch = self._take(self.batch_size)
+            if not batch:
+                return written
+            written += await self._write(batch)
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for the first entry, then give the batch up to
+            # flush_interval to fill before writing it
+            self._batch.append(await self._queue.get())
+            self._batch += self._take(self.batch_size - 1)
+
+            if len(self._batch) < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+                self._batch += self._take(self.batch_size - len(self._batch))
+
+            batch, self._batch = self._batch, []
+            # Shielded: cancelling the task on shutdown must not lose a write
+            self._writing = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._writing)
+            self._writing = None
+
+    def _take(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit and self._queue is not None and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> int:
+        try:
+            async with AsyncSessionLocal() as session:
+                # One INSERT ... VALUES (...), (...) statement per batch
+                await session.execute(insert(APIAuditLog.__table__).values(batch))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Audit log write failed, {len(batch)} entries lost: {e}")
+            self.counters["failed"] += len(batch)
+            return 0
+
+        self.counters["written"] += len(batch)
+        return len(batch)
+
+
+audit_log_writer = AuditLogWriter(
+    max_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+)
+
+
+class AuditLogMiddleware:
+    """ASGI middleware that records API requests for the audit log"""
+
+    def __init__(self, app, writer: AuditLogWriter = audit_log_writer, path_prefix: str = "/api/"):
+        self.app = app
+        self.writer = writer
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.AUDIT_ENABLED
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        request_max = settings.AUDIT_REQUEST_BODY_MAX_BYTES
+        response_max = settings.AUDIT_RESPONSE_BODY_MAX_BYTES
+
+        request_body = bytearray()
+        request_size = 0
+        response_body = bytearray()
+        response_size = 0
+        status_code = 500
+
+        async def receive_wrapper():
+            nonlocal request_size
+            message = await receive()
+
+            if message["type"] == "http.request" and method in WRITE_METHODS:
+                chunk = message.get("body", b"")
+                request_size += len(chunk)
+                if request_size <= request_max:
+                    request_body.extend(chunk)
+
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+            elif message["type"] == "http.response.body" and status_code >= 400:
+                # Copy the head of error bodies as they pass; never hold them back
+                chunk = message.get("body", b"")
+                response_size += len(chunk)
+                if response_size <= response_max:
+                    response_body.extend(chunk)
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.writer.enqueue({
+                "user_id": self._user_id(scope),
+                "endpoint": scope["path"][:255],
+                "method": method,
+                "status_code": status_code,
+                "request_body": parse_body(bytes(request_body), request_size, request_max),
+                "response_body": parse_body(bytes(response_body), response_size, response_max),
+                "timestamp": datetime.utcnow(),
+            })
+
+    @staticmethod
+    def _user_id(scope) -> Optional[int]:
+        """User id from the access token in the Authorization header, if valid"""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+
+                payload = decode_token(token)
+                if not payload or payload.get("type") != "access":
+                    return None
+
+                try:
+                    return int(payload.get("sub"))
+                except (TypeError, ValueError):
+                    return None
+        return None
@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 20
     REFRESH_TOKEN_EXPIRE_DAYS: int = 3
     
+    # Password hashing (bcrypt cost; stored hashes with another cost are
+    # rehashed on the next login). Hashing runs on PASSWORD_HASH_WORKERS
+    # threads with up to PASSWORD_HASH_MAX_PENDING more calls waiting;
+    # beyond that, logins get 503 after PASSWORD_HASH_QUEUE_TIMEOUT seconds.
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 5.0
+    
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:3000"
     
@@ -51,6 +60,20 @@ class Settings(BaseSettings):
     # Session
     MAX_SESSIONS_PER_USER: int = 3
     
+    # Authentication user cache (USER_CACHE_URL empty = per-process only)
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: int = 300
+    USER_CACHE_URL: str = ""
+    USER_CACHE_LOCAL_TTL: int = 5  # entry lifetime when USER_CACHE_URL is empty
+    
+    # Audit Logging
+    AUDIT_ENABLED: bool = True
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL: float = 1.0
+    AUDIT_REQUEST_BODY_MAX_BYTES: int = 16384
+    AUDIT_RESPONSE_BODY_MAX_BYTES: int = 4096
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
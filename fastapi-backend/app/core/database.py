@@ -1,6 +1,8 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import get_settings
+from app.core.security import hash_token
 
 settings = get_settings()
 
@@ -43,3 +45,44 @@ async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_session_token_hash)
+
+
+def add_session_token_hash(conn):
+    """
+    Upgrade user_sessions tables created before token_hash: add the column,
+    fill it from refresh_token and build its unique index. Sessions
+    repeating a token (which the index would reject) are dropped.
+    """
+    columns = {column["name"] for column in inspect(conn).get_columns("user_sessions")}
+    if "token_hash" in columns:
+        return
+
+    conn.execute(text("ALTER TABLE user_sessions ADD COLUMN token_hash VARCHAR(64)"))
+
+    rows = conn.execute(
+        text("SELECT id, refresh_token FROM user_sessions ORDER BY last_used DESC")
+    ).all()
+
+    seen = set()
+    updates = []
+    duplicates = []
+    for session_id, refresh_token in rows:
+        token_hash = hash_token(refresh_token)
+        if token_hash in seen:
+            duplicates.append({"id": session_id})
+        else:
+            seen.add(token_hash)
+            updates.append({"id": session_id, "token_hash": token_hash})
+
+    if duplicates:
+        conn.execute(text("DELETE FROM user_sessions WHERE id = :id"), duplicates)
+    if updates:
+        conn.execute(
+            text("UPDATE user_sessions SET token_hash = :token_hash WHERE id = :id"),
+            updates,
+        )
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX ix_user_sessions_token_hash ON user_sessions (token_hash)"
+    ))
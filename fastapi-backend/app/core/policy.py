@@ -0,0 +1,97 @@
+"""
+Task write policy shared by can_modify_task(), check_working_hours(), bulk
+updates and the ``can_edit`` flag of task lists:
+
+- auditors never write
+- managers always write
+- developers write their own tasks: critical ones any time, others only
+  during working hours (WORK_START_HOUR to WORK_END_HOUR in their timezone)
+
+Whether a timezone is inside working hours only changes twice a day, so
+each timezone's state is kept as a WorkingWindow ("open until T" or
+"closed until T", T in UTC) and reused until T. A check is one comparison
+with the current time instead of a pytz lookup and a conversion, and a
+whole list of tasks is decided with a single window lookup.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pytz
+
+from app.core.user_cache import AuthUser
+from app.models.task import Task, TaskPriority
+
+WORK_START_HOUR = 9
+WORK_END_HOUR = 18
+
+
+@dataclass(frozen=True)
+class WorkingWindow:
+    is_open: bool
+    until: datetime  # next transition (aware, UTC)
+
+
+def compute_window(tz_name: str, at: datetime) -> WorkingWindow:
+    """Working-hours state of timezone ``tz_name`` at aware datetime ``at``"""
+    tz = pytz.timezone(tz_name)
+    local = at.astimezone(tz)
+    day = local.date()
+
+    def boundary(date, hour: int) -> datetime:
+        return tz.localize(datetime.combine(date, time(hour))).astimezone(timezone.utc)
+
+    if WORK_START_HOUR <= local.hour < WORK_END_HOUR:
+        return WorkingWindow(True, boundary(day, WORK_END_HOUR))
+    if local.hour < WORK_START_HOUR:
+        return WorkingWindow(False, boundary(day, WORK_START_HOUR))
+    return WorkingWindow(False, boundary(day + timedelta(days=1), WORK_START_HOUR))
+
+
+class WorkingWindowCache:
+    """Timezone name → (computed_at, WorkingWindow), reused until the transition"""
+
+    def __init__(self):
+        self._windows: Dict[str, Tuple[datetime, WorkingWindow]] = {}
+
+    def get(self, tz_name: str, at: Optional[datetime] = None) -> WorkingWindow:
+        at = at or datetime.now(timezone.utc)
+
+        entry = self._windows.get(tz_name)
+        if entry is not None and entry[0] <= at < entry[1].until:
+            return entry[1]
+
+        window = compute_window(tz_name, at)
+        self._windows[tz_name] = (at, window)
+        return window
+
+    def clear(self) -> None:
+        self._windows.clear()
+
+
+working_windows = WorkingWindowCache()
+
+
+def is_working_time(user: AuthUser, at: Optional[datetime] = None) -> bool:
+    return working_windows.get(user.timezone, at).is_open
+
+
+def can_modify_tasks(
+    user: AuthUser, tasks: Sequence[Task], at: Optional[datetime] = None
+) -> List[bool]:
+    """One flag per task: may ``user`` modify it now? Role and window are looked up once."""
+    if user.is_auditor():
+        return [False] * len(tasks)
+
+    if user.is_manager():
+        return [True] * len(tasks)
+
+    if user.is_developer():
+        open_now = is_working_time(user, at)
+        return [
+            task.assigned_to_id == user.id
+            and (open_now or task.priority == TaskPriority.CRITICAL)
+            for task in tasks
+        ]
+
+    return [False] * len(tasks)
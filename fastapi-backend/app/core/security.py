@@ -1,25 +1,114 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import get_settings
 
 settings = get_settings()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Password hashing. Hashes whose cost differs from PASSWORD_HASH_ROUNDS
+# (in either direction) are flagged for rehashing by verify_and_update().
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_HASH_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
+    """Verify a password against a hash (blocking; use password_hasher in routes)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking; use password_hasher in routes)"""
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already running or waiting"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated thread pool so it never blocks the event loop.
+
+    At most ``max_workers`` hashes run at once (bcrypt releases the GIL) and
+    at most ``max_pending`` more wait for a thread. A call that finds no free
+    slot within ``queue_timeout`` seconds raises PasswordHasherBusy, so a
+    login storm is shed instead of queueing without bound.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext,
+        max_workers: int,
+        max_pending: int,
+        queue_timeout: float,
+    ):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; on success also return a new hash when the stored
+        one was made with other parameters (else None).
+        """
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hash",
+            )
+        if self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_pending)
+            self._loop = loop
+
+        slots = self._slots
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusy() from None
+
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            slots.release()
+
+
+password_hasher = PasswordHasher(
+    pwd_context,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -43,6 +132,11 @@ def create_refresh_token(data: dict) -> str:
     return encoded_jwt
 
 
+def hash_token(token: str) -> str:
+    """Fixed-width lookup key of a token (SHA-256, hex)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def decode_token(token: str) -> Optional[dict]:
     """Decode and verify JWT token"""
     try:
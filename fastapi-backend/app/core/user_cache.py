@@ -0,0 +1,221 @@
+"""
+Two-tier cache of the user fields authentication needs.
+
+    per-process LRU  →  Redis (USER_CACHE_URL, optional)  →  database
+
+get_current_user() resolves the token's user to an AuthUser (id, role,
+is_active, email_verified, timezone) through this cache, so authenticated
+requests cost no user query on cache hits.
+
+Entries are versioned per user:
+
+    user-auth-version:<id>        current version (never expires)
+    user-auth:<id>:<version>      JSON of the AuthUser
+
+invalidate() bumps the version, which makes every process's copy
+unreachable at once: each request compares its LRU entry with the current
+version before using it, so a role change or deactivation is seen on the
+next request. It runs by itself after any commit that changes or deletes
+a User through the ORM (see _track_user_changes); bulk UPDATE/DELETE
+statements on users must call it explicitly.
+
+Without USER_CACHE_URL versions live in-process, so other workers can't
+see a bump: entries then live at most USER_CACHE_LOCAL_TTL seconds (a few
+seconds by default) instead of USER_CACHE_TTL.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+VERSION_KEY = "user-auth-version:{}"
+ENTRY_KEY = "user-auth:{}:{}"
+
+# User columns copied into AuthUser
+AUTH_FIELDS = ("role", "is_active", "email_verified", "timezone")
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """The authenticated user, as cached (not attached to a session)"""
+    id: int
+    role: UserRole
+    is_active: bool
+    email_verified: bool
+    timezone: str
+
+    def is_manager(self) -> bool:
+        return self.role == UserRole.MANAGER
+
+    def is_developer(self) -> bool:
+        return self.role == UserRole.DEVELOPER
+
+    def is_auditor(self) -> bool:
+        return self.role == UserRole.AUDITOR
+
+    def to_json(self) -> str:
+        return json.dumps(astuple(self))
+
+    @classmethod
+    def from_json(cls, raw) -> "AuthUser":
+        user_id, role, is_active, email_verified, timezone = json.loads(raw)
+        return cls(user_id, UserRole(role), is_active, email_verified, timezone)
+
+
+class UserCache:
+    """Per-process LRU in front of an optional Redis tier"""
+
+    def __init__(self, max_size: int, ttl: int, redis_url: str = "", local_ttl: Optional[int] = None):
+        self.max_size = max_size
+        # Per-process versions can't reach other workers: keep entries short-lived
+        self.ttl = ttl if redis_url or local_ttl is None else min(ttl, local_ttl)
+
+        # user id -> (version, expires at, AuthUser)
+        self._local: "OrderedDict[int, Tuple[int, float, AuthUser]]" = OrderedDict()
+        # In-process versions, used when there is no Redis tier
+        self._versions: Dict[int, int] = {}
+
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url)
+
+    async def get(
+        self,
+        user_id: int,
+        loader: Callable[[int], Awaitable[Optional[AuthUser]]],
+    ) -> Optional[AuthUser]:
+        """Cached AuthUser, or ``await loader(user_id)`` on a miss"""
+        if self.max_size <= 0:
+            return await loader(user_id)
+
+        try:
+            version = await self._version(user_id)
+        except Exception as e:
+            # Can't tell whether a cached copy is current: go to the database
+            logger.warning(f"User cache unavailable: {e}")
+            return await loader(user_id)
+
+        entry = self._local.get(user_id)
+        if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+            self._local.move_to_end(user_id)
+            return entry[2]
+
+        user = await self._get_shared(user_id, version)
+        if user is None:
+            user = await loader(user_id)
+            if user is None:
+                return None
+            await self._set_shared(user_id, version, user)
+
+        self._local[user_id] = (version, time.monotonic() + self.ttl, user)
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+        return user
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop every cached copy of the user (call after committing changes)"""
+        self.invalidate_local(user_id)
+        await self._invalidate_shared(user_id)
+
+    def invalidate_local(self, user_id: int) -> None:
+        self._local.pop(user_id, None)
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    async def _invalidate_shared(self, user_id: int) -> None:
+        if self._redis is not None:
+            try:
+                await self._redis.incr(VERSION_KEY.format(user_id))
+            except Exception as e:
+                logger.error(f"User cache invalidation failed for user {user_id}: {e}")
+
+    async def _version(self, user_id: int) -> int:
+        if self._redis is None:
+            return self._versions.setdefault(user_id, 0)
+
+        key = VERSION_KEY.format(user_id)
+        version = await self._redis.get(key)
+        if version is None:
+            # Fresh numbers never collide with one an evicted key used to hold
+            await self._redis.set(key, time.time_ns(), nx=True)
+            version = await self._redis.get(key)
+        return int(version)
+
+    async def _get_shared(self, user_id: int, version: int) -> Optional[AuthUser]:
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(ENTRY_KEY.format(user_id, version))
+        except Exception as e:
+            logger.warning(f"User cache read failed: {e}")
+            return None
+        return AuthUser.from_json(raw) if raw is not None else None
+
+    async def _set_shared(self, user_id: int, version: int, user: AuthUser) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(ENTRY_KEY.format(user_id, version), user.to_json(), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"User cache write failed: {e}")
+
+
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL,
+    redis_url=settings.USER_CACHE_URL,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session: Session, flush_context) -> None:
+    """Remember users whose cached fields were changed or who were deleted"""
+    changed: Set[int] = session.info.setdefault("auth_users_changed", set())
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in AUTH_FIELDS):
+                changed.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    changed = session.info.pop("auth_users_changed", None)
+    if not changed:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    for user_id in changed:
+        user_cache.invalidate_local(user_id)
+        if loop is not None:
+            loop.create_task(user_cache._invalidate_shared(user_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session: Session) -> None:
+    session.info.pop("auth_users_changed", None)
\ No newline at end of file
@@ -6,6 +6,8 @@ import time
 import logging
 from app.core.config import get_settings
 from app.core.database import init_db
+from app.core.audit import AuditLogMiddleware, audit_log_writer
+from app.core.security import PasswordHasherBusy, password_hasher
 from app.api.router import api_router
 
 # Configure logging
@@ -25,9 +27,13 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up application...")
     await init_db()
     logger.info("Database initialized")
+    await audit_log_writer.start()
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    await audit_log_writer.stop()
+    logger.info("Audit log flushed")
+    password_hasher.shutdown()
 
 
 # Create FastAPI application
@@ -49,6 +55,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Audit logging middleware (batched writes, see app/core/audit.py)
+app.add_middleware(AuditLogMiddleware)
+
 
 # Request timing middleware
 @app.middleware("http")
@@ -61,6 +70,16 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# Password hashing pool saturated (login storm): ask the client to retry
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
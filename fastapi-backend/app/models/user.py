@@ -52,6 +52,8 @@ class UserSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
     refresh_token = Column(String(500), nullable=False)
+    # Sessions are looked up by this, never by the token text
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
     device_id = Column(String(255), nullable=False)
     
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -77,6 +77,7 @@ class TaskResponse(BaseModel):
     tags: List[int]
     created_at: datetime
     updated_at: datetime
+    can_edit: Optional[bool] = None  # set on list and detail responses
     
     class Config:
         from_attributes = True
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Login-storm benchmark: latency of an unrelated endpoint while many clients
+log in at once, with bcrypt run inline on the event loop vs on the
+password hashing pool (app.core.security.password_hasher).
+
+Each scenario serves a small app in-process: POST /login verifies a bcrypt
+hash, GET /ping returns at once. A probe is due to call /ping every
+--probe-interval seconds during the storm; each call's latency counts from
+when it was due, so time the event loop spends blocked shows up (every
+slot missed while blocked is counted too).
+
+    python benchmark_login_storm.py --clients 50 --duration 5 --rounds 12
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+from passlib.context import CryptContext
+
+from app.core.security import PasswordHasher, PasswordHasherBusy
+
+PASSWORD = "SecurePass123!"
+
+
+def build_app(context: CryptContext, hashed: str, hasher=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if hasher is None:
+            valid = context.verify(PASSWORD, hashed)
+        else:
+            try:
+                valid, _ = await hasher.verify_and_update(PASSWORD, hashed)
+            except PasswordHasherBusy:
+                return {"busy": True}
+        return {"valid": valid}
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    return app
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_scenario(app: FastAPI, clients: int, duration: float, probe_interval: float):
+    deadline = time.perf_counter() + duration
+    logins = 0
+    latencies = []
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        async def storm():
+            nonlocal logins
+            while time.perf_counter() < deadline:
+                await client.post("/login")
+                logins += 1
+
+        async def probe():
+            due = time.perf_counter()
+            while due < deadline:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                await client.get("/ping")
+                finished = time.perf_counter()
+                while due <= finished and due < deadline:
+                    latencies.append(finished - due)
+                    due += probe_interval
+
+        await asyncio.gather(probe(), *(storm() for _ in range(clients)))
+
+    return logins / duration, latencies
+
+
+async def main(options):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=options.rounds)
+    hashed = context.hash(PASSWORD)
+
+    hasher = PasswordHasher(
+        context,
+        max_workers=options.workers,
+        max_pending=options.max_pending,
+        queue_timeout=options.queue_timeout,
+    )
+    scenarios = [
+        ("idle", build_app(context, hashed), 0),
+        ("inline", build_app(context, hashed), options.clients),
+        ("executor", build_app(context, hashed, hasher), options.clients),
+    ]
+
+    print(
+        f"{options.clients} clients, {options.duration}s, bcrypt rounds={options.rounds}, "
+        f"workers={options.workers}"
+    )
+    print(f"{'scenario':<10} {'logins/s':>9} {'ping p50':>10} {'ping p99':>10} {'ping max':>10}")
+
+    try:
+        for name, app, clients in scenarios:
+            rate, latencies = await run_scenario(
+                app, clients, options.duration, options.probe_interval
+            )
+            print(
+                f"{name:<10} {rate:>9.1f} "
+                f"{percentile(latencies, 0.5) * 1000:>8.1f}ms "
+                f"{percentile(latencies, 0.99) * 1000:>8.1f}ms "
+                f"{max(latencies) * 1000:>8.1f}ms"
+            )
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--queue-timeout", type=float, default=5.0)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,20 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
 import pytest
 from httpx import AsyncClient
+from passlib.context import CryptContext
 from app.main import app
+from sqlalchemy import create_engine, text
+from app.core.audit import AuditLogWriter, mask_sensitive_data, parse_body
+from app.core.database import add_session_token_hash
+from app.core import policy
+from app.core.security import PasswordHasher, PasswordHasherBusy, hash_token
+from app.core import user_cache as user_cache_module
+from app.core.user_cache import AuthUser, UserCache
+from app.models.task import TaskPriority
+from app.models.user import UserRole
 
 
 @pytest.mark.asyncio
@@ -162,4 +176,198 @@ async def test_invalid_token():
         assert response.status_code == 401
 
 
+def test_audit_masks_sensitive_fields():
+    """Test audit bodies are masked and capped"""
+    body = b'{"username": "a", "password": "p", "items": [{"token": "t"}]}'
+    assert parse_body(body, len(body), 1024) == {
+        "username": "a",
+        "password": "******",
+        "items": [{"token": "******"}],
+    }
+    assert parse_body(b"", 5000, 1024) == {"_truncated": True, "bytes": 5000}
+    assert mask_sensitive_data("plain") == "plain"
+
+
+@pytest.mark.asyncio
+async def test_audit_queue_is_bounded():
+    """Test the audit queue drops the oldest entries when full"""
+    writer = AuditLogWriter(max_size=2, batch_size=10, flush_interval=60)
+    written = []
+
+    async def write(batch):
+        written.extend(entry["endpoint"] for entry in batch)
+        return len(batch)
+
+    writer._write = write
+    await writer.start()
+    try:
+        # No await in between: the drain task can't take anything yet
+        for i in range(5):
+            writer.enqueue({"endpoint": f"/api/{i}"})
+        stats = writer.stats()
+        assert stats["pending"] == 2
+        assert stats["dropped"] == 3
+        assert stats["enqueued"] == 5
+    finally:
+        await writer.stop()
+
+    assert written == ["/api/3", "/api/4"]
+
+
+@pytest.mark.asyncio
+async def test_user_cache_hits_and_invalidation():
+    """Test cached auth users are reused until invalidated"""
+    cache = UserCache(max_size=10, ttl=60)
+    loads = []
+
+    async def loader(user_id):
+        loads.append(user_id)
+        role = UserRole.MANAGER if len(loads) > 1 else UserRole.DEVELOPER
+        return AuthUser(user_id, role, True, True, "Asia/Kolkata")
+
+    assert (await cache.get(1, loader)).is_developer()
+    assert (await cache.get(1, loader)).is_developer()
+    assert loads == [1]
+
+    await cache.invalidate(1)
+    assert (await cache.get(1, loader)).is_manager()
+    assert loads == [1, 1]
+
+
+
+@pytest.mark.asyncio
+async def test_user_cache_without_redis_is_short_lived():
+    """Test per-process entries expire after local_ttl, not the shared TTL"""
+    assert UserCache(max_size=10, ttl=300, local_ttl=5).ttl == 5
+    assert UserCache(max_size=10, ttl=2, local_ttl=5).ttl == 2
+
+    cache = UserCache(max_size=10, ttl=300, local_ttl=5)
+    loads = []
+
+    async def loader(user_id):
+        loads.append(user_id)
+        return AuthUser(user_id, UserRole.DEVELOPER, True, True, "Asia/Kolkata")
+
+    now = 1000.0
+    with mock.patch.object(user_cache_module.time, "monotonic", lambda: now):
+        await cache.get(1, loader)
+        now += 4
+        await cache.get(1, loader)
+        assert loads == [1]
+        now += 2
+        await cache.get(1, loader)
+        assert loads == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidated_after_commit():
+    """Test users changed in a committed session are dropped from the cache"""
+    cache = UserCache(max_size=10, ttl=60)
+    loads = []
+
+    async def loader(user_id):
+        loads.append(user_id)
+        return AuthUser(user_id, UserRole.DEVELOPER, True, True, "Asia/Kolkata")
+
+    await cache.get(1, loader)
+    await cache.get(2, loader)
+
+    with mock.patch.object(user_cache_module, "user_cache", cache):
+        session = SimpleNamespace(info={"auth_users_changed": {1}})
+        user_cache_module._invalidate_changed_users(session)
+        assert "auth_users_changed" not in session.info
+
+    await cache.get(1, loader)
+    await cache.get(2, loader)
+    assert loads == [1, 2, 1]
+
+def test_session_token_hash_backfill():
+    """Test old session tables get hashed, uniquely indexed tokens"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE user_sessions (id INTEGER PRIMARY KEY, user_id INTEGER, "
+            "refresh_token VARCHAR(500), device_id VARCHAR(255), last_used DATETIME)"
+        ))
+        conn.execute(
+            text("INSERT INTO user_sessions VALUES (:id, 1, :token, 'd', :last_used)"),
+            [
+                {"id": 1, "token": "a", "last_used": "2026-01-01"},
+                {"id": 2, "token": "b", "last_used": "2026-01-02"},
+                {"id": 3, "token": "a", "last_used": "2026-01-03"},
+            ],
+        )
+
+        add_session_token_hash(conn)
+        add_session_token_hash(conn)
+
+        rows = conn.execute(text("SELECT id, token_hash FROM user_sessions ORDER BY id")).all()
+        assert rows == [(2, hash_token("b")), (3, hash_token("a"))]
+
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM user_sessions WHERE token_hash = 'x'"
+        )).all()
+        assert "ix_user_sessions_token_hash" in str(plan)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rehashes_old_work_factor():
+    """Test verification runs off the event loop and flags old-cost hashes"""
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("pw")
+    context = CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__default_rounds=5, bcrypt__min_rounds=5, bcrypt__max_rounds=5,
+    )
+    hasher = PasswordHasher(context, max_workers=1, max_pending=0, queue_timeout=1)
+    try:
+        assert await hasher.verify_and_update("wrong", old_hash) == (False, None)
+
+        valid, new_hash = await hasher.verify_and_update("pw", old_hash)
+        assert valid and new_hash.startswith("$2b$05$")
+        assert await hasher.verify_and_update("pw", new_hash) == (True, None)
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_sheds_excess_load():
+    """Test calls beyond the worker and queue limits get PasswordHasherBusy"""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10)
+    hasher = PasswordHasher(context, max_workers=1, max_pending=1, queue_timeout=0.01)
+    try:
+        results = await asyncio.gather(
+            *(hasher.hash("pw") for _ in range(3)), return_exceptions=True
+        )
+        busy = [result for result in results if isinstance(result, PasswordHasherBusy)]
+        assert len(busy) == 1
+    finally:
+        hasher.shutdown()
+
+
+def test_task_policy_caches_working_window():
+    """Test working windows are reused until their transition and decide whole lists"""
+    policy.working_windows.clear()
+    noon = datetime(2026, 3, 2, 6, 30, tzinfo=timezone.utc)  # 12:00 in Asia/Kolkata
+    developer = AuthUser(1, UserRole.DEVELOPER, True, True, "Asia/Kolkata")
+    tasks = [
+        SimpleNamespace(assigned_to_id=1, priority=TaskPriority.LOW),
+        SimpleNamespace(assigned_to_id=1, priority=TaskPriority.CRITICAL),
+        SimpleNamespace(assigned_to_id=2, priority=TaskPriority.CRITICAL),
+    ]
+
+    with mock.patch.object(policy, "compute_window", wraps=policy.compute_window) as computed:
+        assert policy.can_modify_tasks(developer, tasks, noon) == [True, True, False]
+        assert policy.can_modify_tasks(developer, tasks, noon + timedelta(hours=5)) == [True, True, False]
+        assert computed.call_count == 1
+
+        evening = noon + timedelta(hours=8)
+        assert policy.can_modify_tasks(developer, tasks, evening) == [False, True, False]
+        assert computed.call_count == 2
+
+    assert policy.working_windows.get("Asia/Kolkata", evening).until == datetime(
+        2026, 3, 3, 3, 30, tzinfo=timezone.utc
+    )
+    policy.working_windows.clear()
+
+
 # Run tests with: pytest tests/test_api.py -v
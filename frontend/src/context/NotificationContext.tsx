@@ -75,8 +75,14 @@ export function NotificationProvider({ children }: { children: React.ReactNode }
                     addNotification(notification);
                 });
 
+                // The server pushes the authoritative unread count
+                const unsubscribeCount = wsService.subscribeUnreadCount((count) => {
+                    setUnreadCount(count);
+                });
+
                 return () => {
                     unsubscribe();
+                    unsubscribeCount();
                     wsService.disconnect();
                     setIsConnected(false);
                 };
@@ -93,9 +99,7 @@ export function NotificationProvider({ children }: { children: React.ReactNode }
             if (prev.some(n => n.id === notification.id)) return prev;
             return [notification, ...prev];
         });
-        if (!notification.read) {
-            setUnreadCount(prev => prev + 1);
-        }
+        // Unread count is pushed separately as an `unread_count` event
     }, []);
 
     /**
@@ -20,6 +20,7 @@ export interface Notification {
 }
 
 type NotificationCallback = (notification: Notification) => void;
+type UnreadCountCallback = (count: number) => void;
 
 class WebSocketService {
     private ws: WebSocket | null = null;
@@ -27,6 +28,7 @@ class WebSocketService {
     private maxReconnectAttempts = 5;
     private reconnectDelay = 3000; // 3 seconds
     private listeners: NotificationCallback[] = [];
+    private unreadCountListeners: UnreadCountCallback[] = [];
     private isConnecting = false;
     private token: string | null = null;
     private processedIds = new Set<number>();
@@ -61,6 +63,8 @@ class WebSocketService {
 
                     if (data.type === 'notification') {
                         this.handleNotification(data.notification);
+                    } else if (data.type === 'unread_count') {
+                        this.unreadCountListeners.forEach(callback => callback(data.count));
                     } else if (data.type === 'read_confirmation') {
                         console.log('Notification marked as read:', data.notification_id);
                     } else if (data.type === 'all_read_confirmation') {
@@ -178,6 +182,18 @@ class WebSocketService {
         };
     }
 
+    /**
+     * Subscribe to server-pushed unread count changes
+     */
+    subscribeUnreadCount(callback: UnreadCountCallback) {
+        this.unreadCountListeners.push(callback);
+
+        // Return unsubscribe function
+        return () => {
+            this.unreadCountListeners = this.unreadCountListeners.filter(cb => cb !== callback);
+        };
+    }
+
     /**
      * Mark notification as read
      */